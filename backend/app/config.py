@@ -0,0 +1,109 @@
+# config.py
+
+import os
+import pathlib
+
+
+def _env_int(name: str, default: int) -> int:
+    """Reads an integer setting from the environment, falling back to `default`."""
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        return default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    """Reads a true/false setting from the environment, falling back to `default`."""
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# --- Upload Storage ---
+# Content-addressed store of uploaded files (services/storage.py), shared by
+# the API and app.ingest so both keep one copy of the same bytes.
+UPLOADS_DIR = str(pathlib.Path(__file__).parent.parent / "uploads")
+# Uploads larger than this are rejected with 413 Payload Too Large.
+MAX_UPLOAD_BYTES = _env_int("RECEIPT_MAX_UPLOAD_BYTES", 25 * 1024 * 1024)
+# The same for the whole request of a batch upload, whatever its number of files.
+MAX_BATCH_UPLOAD_BYTES = _env_int("RECEIPT_MAX_BATCH_UPLOAD_BYTES", 256 * 1024 * 1024)
+# Store uploaded .txt receipts gzip-compressed.
+COMPRESS_TEXT_UPLOADS = _env_bool("RECEIPT_COMPRESS_TEXT_UPLOADS", False)
+
+# --- Extraction Workers ---
+# Number of long-lived worker processes that run OCR and parsing for uploads,
+# batch uploads and background jobs, outside the API process.
+BATCH_WORKERS = _env_int("RECEIPT_BATCH_WORKERS", os.cpu_count() or 1)
+# Wall-clock limit per file; a worker that runs over is killed and replaced (0 for none).
+WORKER_TIMEOUT_SECONDS = _env_int("RECEIPT_WORKER_TIMEOUT_SECONDS", 60)
+# Resident memory limit per worker in MB, including the processes it starts; a worker that grows past it is killed and replaced (0 for none).
+WORKER_MAX_RSS_MB = _env_int("RECEIPT_WORKER_MAX_RSS_MB", 1024)
+# Workers are replaced after this many tasks (0 for never).
+WORKER_MAX_TASKS = _env_int("RECEIPT_WORKER_MAX_TASKS", 500)
+# Images whose header declares more pixels than this are rejected before extraction.
+MAX_IMAGE_PIXELS = _env_int("RECEIPT_MAX_IMAGE_PIXELS", 40_000_000)
+
+# --- Parse Cache ---
+# Upper bound on the text + parse results kept in the parse cache, in bytes.
+# Least recently used entries are evicted once the cache grows past it.
+PARSE_CACHE_MAX_BYTES = _env_int("RECEIPT_PARSE_CACHE_MAX_BYTES", 64 * 1024 * 1024)
+
+# --- Parsing Dictionary ---
+# JSON file listing the vendors and category sub-total keywords the parser looks for.
+RECEIPT_DICTIONARY_PATH = os.getenv(
+    "RECEIPT_DICTIONARY_PATH",
+    str(pathlib.Path(__file__).parent / "services" / "receipt_dictionary.json"),
+)
+
+# --- Background Ingestion Jobs ---
+# Number of background threads that pick up jobs created by POST /upload/async/.
+JOB_WORKERS = _env_int("RECEIPT_JOB_WORKERS", 2)
+# Wall-clock limit for extracting one job's file; the extraction is killed past it.
+JOB_TIMEOUT_SECONDS = _env_int("RECEIPT_JOB_TIMEOUT_SECONDS", 120)
+
+# --- OCR ---
+# Preprocessing applied to images before OCR, in order: any of grayscale,
+# downscale, deskew and binarize (comma separated; empty for none).
+OCR_PREPROCESS = [step.strip() for step in os.getenv("RECEIPT_OCR_PREPROCESS", "grayscale,downscale").split(",") if step.strip()]
+# Images above this resolution are scaled down to it before OCR.
+OCR_TARGET_DPI = _env_int("RECEIPT_OCR_TARGET_DPI", 300)
+# Tesseract page segmentation mode (--psm), e.g. "4" or "6"; empty keeps tesseract's default.
+OCR_PSM = os.getenv("RECEIPT_OCR_PSM", "").strip()
+# Images sent to one tesseract run by batch uploads and the ingest CLI; 1 turns batching off.
+# Off by default: batched runs have not yet been timed or checked for accuracy
+# against a real tesseract (python -m benchmarks.bench_ocr), so every image gets its own run.
+OCR_BATCH_SIZE = _env_int("RECEIPT_OCR_BATCH_SIZE", 1)
+
+# --- PDF Extraction ---
+# Resolution pages are rendered at before OCR. Higher is more accurate but slower.
+PDF_OCR_DPI = _env_int("RECEIPT_PDF_OCR_DPI", 200)
+# Pages whose text layer has fewer characters than this are OCR'd instead.
+PDF_TEXT_LAYER_MIN_CHARS = _env_int("RECEIPT_PDF_TEXT_LAYER_MIN_CHARS", 20)
+# Number of pages OCR'd concurrently within one PDF. Every extraction worker
+# runs its own pool, so by default the CPUs are shared out between them.
+PDF_OCR_WORKERS = _env_int("RECEIPT_PDF_OCR_WORKERS", max(1, (os.cpu_count() or 1) // max(1, BATCH_WORKERS)))
+# Stop reading a PDF once a page containing the grand total has been extracted.
+PDF_STOP_AT_GRAND_TOTAL = _env_bool("RECEIPT_PDF_STOP_AT_GRAND_TOTAL", False)
+
+# --- Database ---
+# Delete the database and uploaded files on every startup. Off by default: data
+# persists across restarts and the schema is migrated in place.
+RESET_ON_STARTUP = _env_bool("RECEIPT_RESET_ON_STARTUP", False)
+# Rows written per transaction by the bulk upsert path.
+BULK_CHUNK_SIZE = _env_int("RECEIPT_BULK_CHUNK_SIZE", 1000)
+DATABASE_URL = os.getenv("RECEIPT_DATABASE_URL", "sqlite:///./receipts.db")
+# "production" enables WAL journaling, a busy timeout and tuned pragmas on every
+# connection; "basic" is a bare engine.
+DB_MODE = os.getenv("RECEIPT_DB_MODE", "production")
+# How long a connection waits on a locked database before raising "database is locked".
+DB_BUSY_TIMEOUT_MS = _env_int("RECEIPT_DB_BUSY_TIMEOUT_MS", 5000)
+# Page cache per connection, in KiB, and memory-mapped I/O window, in bytes.
+DB_CACHE_SIZE_KIB = _env_int("RECEIPT_DB_CACHE_SIZE_KIB", 64 * 1024)
+DB_MMAP_SIZE = _env_int("RECEIPT_DB_MMAP_SIZE", 256 * 1024 * 1024)
+# Connections kept open by the pool, plus extra ones allowed under bursts.
+DB_POOL_SIZE = _env_int("RECEIPT_DB_POOL_SIZE", 10)
+DB_MAX_OVERFLOW = _env_int("RECEIPT_DB_MAX_OVERFLOW", 20)
@@ -1,11 +1,34 @@
 # crud.py
 
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, func
-from . import models, schemas
+from sqlalchemy import desc, func, update, delete, tuple_, select, table, column, text, type_coerce, String
+from sqlalchemy.dialects.sqlite import insert
+from . import config, models, schemas
+from .services import parser
+from collections import Counter
 from datetime import date
-from typing import List, Optional
-import statistics
+from typing import Dict, Iterator, List, Optional, Tuple
+import base64
+import json
+import math
+import re
+
+SPEND_TOTALS_ID = 1
+# Rows per multi-row INSERT in the bulk path, well under SQLite's bound-parameter limit.
+BULK_ROWS_PER_STATEMENT = 500
+# ReceiptCreate fields stored in their own tables rather than on the receipt row.
+RECEIPT_CHILD_FIELDS = {"line_items"}
+TOP_ITEM_ORDERS = {"spend", "quantity", "receipts"}
+# First day of the bucket each daily_spend day falls in; weeks start on Monday.
+TIMESERIES_BUCKETS = {
+    "day": lambda day: func.date(day),
+    "week": lambda day: func.date(day, "weekday 0", "-6 days"),
+    "month": lambda day: func.date(day, "start of month"),
+    "year": lambda day: func.date(day, "start of year"),
+}
+
+# A receipt's place in daily_spend: (day, vendor, category)
+RollupKey = Tuple[date, str, str]
 
 def get_receipts(db: Session, skip: int = 0, limit: int = 100, sort_by: Optional[str] = None, sort_order: str = "asc"):
     """Retrieve all receipts with pagination and sorting."""
@@ -21,70 +44,768 @@ def get_receipts(db: Session, skip: int = 0, limit: int = 100, sort_by: Optional
 
     return query.offset(skip).limit(limit).all()
 
-def search_receipts(db: Session, vendor: Optional[str] = None, start_date: Optional[date] = None, end_date: Optional[date] = None) -> List[models.Receipt]:
-    """Search receipts based on various criteria."""
+# The receipt columns the API returns, in schemas.Receipt field order.
+RECEIPT_ROW_COLUMNS = list(schemas.Receipt.model_fields)
+# Returned by the row functions as their stored text (ISO date, JSON document)
+# rather than parsed on every row; serialize writes them out as they are.
+RECEIPT_TEXT_COLUMNS = {"date", "sub_categories"}
+
+def _receipt_row_select():
+    return select(*[
+        type_coerce(getattr(models.Receipt, name), String).label(name) if name in RECEIPT_TEXT_COLUMNS
+        else getattr(models.Receipt, name)
+        for name in RECEIPT_ROW_COLUMNS
+    ])
+
+def get_receipt_rows(db: Session, skip: int = 0, limit: int = 100, sort_by: Optional[str] = None, sort_order: str = "asc") -> List:
+    """Same receipts as get_receipts, as plain rows of RECEIPT_ROW_COLUMNS without building ORM objects."""
+    statement = _receipt_row_select()
+    column = getattr(models.Receipt, sort_by, None) if sort_by else None
+    if column is not None:
+        statement = statement.order_by(desc(column) if sort_order == "desc" else column)
+    # Executed on the session's connection: Core rows, without the ORM result layer
+    return db.connection().execute(statement.offset(skip).limit(limit)).all()
+
+KEYSET_SORT_COLUMNS = ("date", "vendor", "amount")
+
+def encode_cursor(sort_by: Optional[str], sort_order: str, receipt: models.Receipt) -> str:
+    """Builds an opaque cursor pointing just past `receipt` in the given ordering."""
+    value = getattr(receipt, sort_by) if sort_by else None
+    if isinstance(value, date):
+        value = value.isoformat()
+    payload = json.dumps([sort_by, sort_order, value, receipt.id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, sort_by: Optional[str], sort_order: str) -> Tuple[object, int]:
+    """
+    Returns the (sort value, id) a cursor points past.
+    Raises ValueError if it is malformed or was issued for a different ordering.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort_by, cursor_order, value, last_id = json.loads(base64.urlsafe_b64decode(padded))
+    except Exception:
+        raise ValueError("Malformed cursor.")
+    if (cursor_sort_by, cursor_order) != (sort_by, sort_order):
+        raise ValueError("Cursor was issued for a different sort order.")
+    if sort_by == "date" and value is not None:
+        value = date.fromisoformat(value)
+    return value, int(last_id)
+
+def get_receipts_page(db: Session, limit: int = 100, sort_by: Optional[str] = None, sort_order: str = "asc",
+                      cursor: Optional[str] = None) -> Tuple[List[models.Receipt], Optional[str]]:
+    """
+    Retrieve one page of receipts with keyset pagination.
+    Rows are ordered by the sort column with id as the tiebreaker, so each page
+    starts with an index seek past the previous page instead of an OFFSET scan.
+    Returns the page and the cursor of the next one (None on the last page).
+    """
+    if sort_by is not None and sort_by not in KEYSET_SORT_COLUMNS:
+        raise ValueError(f"Cannot sort by '{sort_by}'.")
+    descending = sort_order == "desc"
+    key = [getattr(models.Receipt, sort_by), models.Receipt.id] if sort_by else [models.Receipt.id]
+
     query = db.query(models.Receipt)
+    if cursor:
+        value, last_id = decode_cursor(cursor, sort_by, sort_order)
+        position = [value, last_id] if sort_by else [last_id]
+        if len(key) == 1:
+            query = query.filter(key[0] < position[0] if descending else key[0] > position[0])
+        else:
+            query = query.filter(tuple_(*key) < tuple_(*position) if descending else tuple_(*key) > tuple_(*position))
+    query = query.order_by(*[desc(column) if descending else column for column in key])
+
+    # Fetch one extra row to learn whether another page follows
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    return page, encode_cursor(sort_by, sort_order, page[-1])
+
+def iter_receipts(db: Session, sort_by: Optional[str] = None, sort_order: str = "asc",
+                  chunk_size: int = 1000) -> Iterator[models.Receipt]:
+    """Walks the whole receipts table in keyset-paginated chunks, holding one chunk at a time."""
+    cursor = None
+    while True:
+        page, cursor = get_receipts_page(db, limit=chunk_size, sort_by=sort_by, sort_order=sort_order, cursor=cursor)
+        yield from page
+        # Drop the chunk from the identity map before fetching the next one
+        db.expunge_all()
+        if cursor is None:
+            return
+
+def _fts_terms(terms: str) -> str:
+    """
+    Turns free text into an FTS5 query: every whitespace-separated term must
+    match, as a phrase of its words with the last word used as a prefix.
+    FTS5 operators in the input are neutralised by the quoting.
+    """
+    phrases = []
+    for term in terms.split():
+        words = re.findall(r"\w+", term)
+        if words:
+            phrases.append('"' + " ".join(words) + '"*')
+    return " ".join(phrases)
+
+def _apply_search_filters(query, vendor: Optional[str] = None, start_date: Optional[date] = None,
+                          end_date: Optional[date] = None, q: Optional[str] = None, rank: bool = True):
+    """
+    Applies the search_receipts filters to a Query or select() over receipts.
+    With `rank`, full-text matches are ordered best first. Returns None when
+    the search text has no searchable words in it, so nothing can match.
+    """
     if vendor:
-        query = query.filter(models.Receipt.vendor.like(f"%{vendor}%"))
+        # LIKE on the trigram table is a substring match served by its index
+        # (a full scan of the names for patterns under three characters)
+        vendors_fts = table("receipt_vendors_fts", column("rowid"), column("vendor"))
+        vendor_matches = select(vendors_fts.c.rowid.label("id"))\
+            .where(vendors_fts.c.vendor.like(f"%{vendor}%"))\
+            .subquery()
+        query = query.join(vendor_matches, models.Receipt.id == vendor_matches.c.id)
+    if q:
+        terms = _fts_terms(q)
+        if not terms:
+            return None
+        fts = table("receipts_fts", column("rowid"), column("rank"))
+        matches = select(fts.c.rowid.label("id"), fts.c.rank.label("rank"))\
+            .where(text("receipts_fts MATCH :match").bindparams(match=terms))\
+            .subquery()
+        query = query.join(matches, models.Receipt.id == matches.c.id)
+        if rank:
+            query = query.order_by(matches.c.rank)
+
     if start_date:
         query = query.filter(models.Receipt.date >= start_date)
     if end_date:
         query = query.filter(models.Receipt.date <= end_date)
+    return query
+
+def search_receipts(db: Session, vendor: Optional[str] = None, start_date: Optional[date] = None, end_date: Optional[date] = None,
+                    q: Optional[str] = None, limit: Optional[int] = None) -> List[models.Receipt]:
+    """
+    Search receipts based on various criteria.
+    `vendor` matches any part of the vendor name, through the trigram index
+    in receipt_vendors_fts. `q` matches words in the vendor or any text on
+    the receipt through the receipts_fts index, and its results are ranked
+    by relevance (bm25).
+    """
+    query = _apply_search_filters(db.query(models.Receipt), vendor=vendor, start_date=start_date, end_date=end_date, q=q)
+    if query is None:
+        # The search text had no searchable words in it
+        return []
+    if limit:
+        query = query.limit(limit)
     return query.all()
 
-def create_receipt(db: Session, receipt: schemas.ReceiptCreate) -> models.Receipt:
+def search_receipt_rows(db: Session, vendor: Optional[str] = None, start_date: Optional[date] = None, end_date: Optional[date] = None,
+                        q: Optional[str] = None, limit: Optional[int] = None) -> List:
+    """Same results as search_receipts, as plain rows of RECEIPT_ROW_COLUMNS."""
+    statement = _apply_search_filters(_receipt_row_select(), vendor=vendor, start_date=start_date, end_date=end_date, q=q)
+    if statement is None:
+        return []
+    if limit:
+        statement = statement.limit(limit)
+    return db.connection().execute(statement).all()
+
+EXPORT_COLUMNS = ["id", "vendor", "date", "amount", "category", "sub_categories", "file_path", "original_filename"]
+
+def iter_receipt_rows(db: Session, vendor: Optional[str] = None, start_date: Optional[date] = None,
+                      end_date: Optional[date] = None, q: Optional[str] = None, batch_size: int = 1000) -> Iterator[tuple]:
     """
-    Creates a new receipt or updates an existing one based on the file_path.
-    This provides a robust "upsert" functionality.
+    Streams the receipts matching the search_receipts filters as plain rows of
+    EXPORT_COLUMNS, in id order. Rows come from a server-side cursor
+    `batch_size` at a time and no ORM objects are built.
     """
+    statement = _apply_search_filters(
+        select(*[getattr(models.Receipt, name) for name in EXPORT_COLUMNS]),
+        vendor=vendor, start_date=start_date, end_date=end_date, q=q, rank=False,
+    )
+    if statement is None:
+        return
+    statement = statement.order_by(models.Receipt.id).execution_options(yield_per=batch_size)
+    yield from db.execute(statement)
+
+def _upsert_receipt(db: Session, receipt: schemas.ReceiptCreate) -> models.Receipt:
+    """Adds or updates a receipt keyed on file_path without committing."""
     # Check if a receipt with the same file path exists
     existing_receipt = db.query(models.Receipt).filter(models.Receipt.file_path == receipt.file_path).first()
     
     if existing_receipt:
         # If it exists, update its fields with the new data
-        update_data = receipt.model_dump(exclude_unset=True)
+        old_amount = existing_receipt.amount
+        old_rollup = _rollup_entry(existing_receipt)
+        update_data = receipt.model_dump(exclude_unset=True, exclude=RECEIPT_CHILD_FIELDS)
         for key, value in update_data.items():
             setattr(existing_receipt, key, value)
-        db_receipt = existing_receipt
+        _adjust_spend_aggregates(db, old_amount, existing_receipt.amount)
+        _apply_rollup_deltas(db, removed=[old_rollup], added=[_rollup_entry(existing_receipt)])
+        _sync_receipt_categories(db, existing_receipt)
+        _sync_line_items(db, existing_receipt.id, receipt)
+        return existing_receipt
+
+    # If it doesn't exist, create a new instance
+    db_receipt = models.Receipt(**receipt.model_dump(exclude=RECEIPT_CHILD_FIELDS))
+    db.add(db_receipt)
+    _adjust_spend_aggregates(db, None, db_receipt.amount)
+    _apply_rollup_deltas(db, removed=[], added=[_rollup_entry(db_receipt)])
+    # Flush to get the receipt id for its category and line item rows
+    db.flush()
+    _sync_receipt_categories(db, db_receipt)
+    _sync_line_items(db, db_receipt.id, receipt)
+    return db_receipt
+
+def _category_rows(receipt_id: int, receipt) -> List[dict]:
+    """
+    Splits a receipt (a models.Receipt, a row with its columns, or a
+    schemas.ReceiptCreate) into
+    per-category spend: its sub-totals when it has them, otherwise its whole
+    amount under its category. Mixed receipts without sub-totals contribute
+    nothing, as there is no way to split them.
+    """
+    if receipt.sub_categories:
+        shares = receipt.sub_categories.items()
+    elif receipt.category != "Mixed":
+        shares = [(receipt.category or "Uncategorized", receipt.amount)]
     else:
-        # If it doesn't exist, create a new instance
-        db_receipt = models.Receipt(**receipt.model_dump())
-        db.add(db_receipt)
+        shares = []
+    return [
+        {"receipt_id": receipt_id, "category": category, "amount": amount, "date": receipt.date}
+        for category, amount in shares
+    ]
+
+def _sync_receipt_categories(db: Session, receipt: models.Receipt):
+    """Replaces the category rows of a receipt, inside the caller's transaction."""
+    db.execute(delete(models.ReceiptCategory).where(models.ReceiptCategory.receipt_id == receipt.id))
+    rows = _category_rows(receipt.id, receipt)
+    if rows:
+        db.execute(insert(models.ReceiptCategory), rows)
+
+def _line_item_rows(receipt_id: int, receipt: schemas.ReceiptCreate) -> List[dict]:
+    return [
+        {"receipt_id": receipt_id, "position": position, "vendor": receipt.vendor, "date": receipt.date, **item.model_dump()}
+        for position, item in enumerate(receipt.line_items)
+    ]
+
+def _sync_line_items(db: Session, receipt_id: int, receipt: schemas.ReceiptCreate):
+    """Replaces the line items of a receipt with one bulk insert, inside the caller's transaction."""
+    db.execute(delete(models.LineItem).where(models.LineItem.receipt_id == receipt_id))
+    rows = _line_item_rows(receipt_id, receipt)
+    if rows:
+        db.execute(insert(models.LineItem), rows)
+
+def backfill_line_items(db: Session, chunk_size: int = 1000) -> int:
+    """
+    Creates line items for receipts that have none yet by parsing their stored
+    text once. Returns the number of receipts that got items.
+    """
+    has_rows = db.query(models.LineItem.receipt_id)\
+        .filter(models.LineItem.receipt_id == models.Receipt.id).exists()
+    missing = db.query(models.Receipt.id, models.Receipt.vendor, models.Receipt.date, models.Receipt.raw_text)\
+        .filter(~has_rows, models.Receipt.raw_text.isnot(None)).order_by(models.Receipt.id)
+
+    backfilled = 0
+    rows = []
+    for receipt_id, vendor, receipt_date, raw_text in missing.yield_per(chunk_size):
+        items = parser.parse_receipt_text(raw_text)["line_items"]
+        rows.extend(
+            {"receipt_id": receipt_id, "position": position, "vendor": vendor, "date": receipt_date, **item}
+            for position, item in enumerate(items)
+        )
+        backfilled += bool(items)
+        if len(rows) >= chunk_size:
+            db.execute(insert(models.LineItem), rows)
+            rows = []
+    if rows:
+        db.execute(insert(models.LineItem), rows)
+    db.commit()
+    return backfilled
+
+def backfill_receipt_categories(db: Session, chunk_size: int = 1000) -> int:
+    """
+    Creates category rows for receipts that have none yet, from their
+    sub_categories JSON. Returns the number of receipts backfilled.
+    """
+    has_rows = db.query(models.ReceiptCategory.receipt_id)\
+        .filter(models.ReceiptCategory.receipt_id == models.Receipt.id).exists()
+    # Explicit columns, not the entity: migrations run this before later ones
+    # have added the newer receipt columns
+    missing = db.query(models.Receipt.id, models.Receipt.category, models.Receipt.sub_categories,
+                       models.Receipt.amount, models.Receipt.date)\
+        .filter(~has_rows).order_by(models.Receipt.id)
+
+    backfilled = 0
+    rows = []
+    for receipt in missing.yield_per(chunk_size):
+        rows.extend(_category_rows(receipt.id, receipt))
+        backfilled += 1
+        if len(rows) >= chunk_size:
+            db.execute(insert(models.ReceiptCategory), rows)
+            rows = []
+    if rows:
+        db.execute(insert(models.ReceiptCategory), rows)
+    db.commit()
+    return backfilled
+
+def create_receipt(db: Session, receipt: schemas.ReceiptCreate) -> models.Receipt:
+    """
+    Creates a new receipt or updates an existing one based on the file_path.
+    This provides a robust "upsert" functionality.
+    """
+    db_receipt = _upsert_receipt(db, receipt)
 
     # Commit the transaction (updates or adds the record)
     db.commit()
     db.refresh(db_receipt)
     return db_receipt
 
+def bulk_upsert_receipts(db: Session, receipts: List[schemas.ReceiptCreate],
+                         chunk_size: Optional[int] = None) -> List[int]:
+    """
+    Upserts many receipts with INSERT ... ON CONFLICT(file_path) DO UPDATE,
+    one multi-row statement and one commit per chunk of `chunk_size` rows.
+    The spend aggregates and category rows are maintained with set-based
+    statements in the same transactions. Returns the receipt ids in input order.
+
+    A failing chunk is rolled back and the error re-raised; earlier chunks
+    stay committed. raw_text and original_filename are only overwritten when a
+    new value is given.
+    """
+    chunk_size = chunk_size or config.BULK_CHUNK_SIZE
+    ids_by_path: Dict[str, int] = {}
+    for start in range(0, len(receipts), chunk_size):
+        chunk = receipts[start:start + chunk_size]
+        try:
+            # Statements are kept under SQLite's bound-parameter limit
+            for offset in range(0, len(chunk), BULK_ROWS_PER_STATEMENT):
+                ids_by_path.update(_bulk_upsert_rows(db, chunk[offset:offset + BULK_ROWS_PER_STATEMENT]))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+    return [ids_by_path[receipt.file_path] for receipt in receipts]
+
+def _bulk_upsert_rows(db: Session, receipts: List[schemas.ReceiptCreate]) -> Dict[str, int]:
+    # The last receipt for a file_path wins, as it would with one upsert per row
+    latest = {receipt.file_path: receipt for receipt in receipts}
+    rows = [receipt.model_dump(exclude=RECEIPT_CHILD_FIELDS) for receipt in latest.values()]
+
+    old_receipts = db.query(models.Receipt.date, models.Receipt.vendor, models.Receipt.category, models.Receipt.amount)\
+        .filter(models.Receipt.file_path.in_(list(latest)))\
+        .all()
+
+    statement = insert(models.Receipt)
+    updates = {
+        key: statement.excluded[key]
+        for key in rows[0]
+        if key not in ("file_path", "raw_text", "original_filename")
+    }
+    updates["raw_text"] = func.coalesce(statement.excluded.raw_text, models.Receipt.raw_text)
+    updates["original_filename"] = func.coalesce(statement.excluded.original_filename, models.Receipt.original_filename)
+    result = db.execute(
+        statement.values(rows)
+        .on_conflict_do_update(index_elements=[models.Receipt.file_path], set_=updates)
+        .returning(models.Receipt.id, models.Receipt.file_path)
+    )
+    ids_by_path = {file_path: receipt_id for receipt_id, file_path in result.all()}
+
+    _apply_spend_deltas(
+        db,
+        removed=[old.amount for old in old_receipts],
+        added=[receipt.amount for receipt in latest.values()],
+    )
+    _apply_rollup_deltas(
+        db,
+        removed=[_rollup_entry(old) for old in old_receipts],
+        added=[_rollup_entry(receipt) for receipt in latest.values()],
+    )
+
+    ids = list(ids_by_path.values())
+    db.execute(delete(models.ReceiptCategory).where(models.ReceiptCategory.receipt_id.in_(ids)))
+    category_rows = [
+        row
+        for file_path, receipt in latest.items()
+        for row in _category_rows(ids_by_path[file_path], receipt)
+    ]
+    if category_rows:
+        db.execute(insert(models.ReceiptCategory), category_rows)
+
+    db.execute(delete(models.LineItem).where(models.LineItem.receipt_id.in_(ids)))
+    item_rows = [
+        row
+        for file_path, receipt in latest.items()
+        for row in _line_item_rows(ids_by_path[file_path], receipt)
+    ]
+    if item_rows:
+        db.execute(insert(models.LineItem), item_rows)
+    return ids_by_path
+
+def create_receipts(db: Session, receipts: List[schemas.ReceiptCreate]) -> List[models.Receipt]:
+    """
+    Upserts several receipts in a single transaction through the bulk path.
+    Either all of them are written or, on error, none are.
+    """
+    if not receipts:
+        return []
+    ids = bulk_upsert_receipts(db, receipts, chunk_size=len(receipts))
+    by_id = {receipt.id: receipt for receipt in db.query(models.Receipt).filter(models.Receipt.id.in_(ids))}
+    return [by_id[receipt_id] for receipt_id in ids]
+
+def _adjust_spend_aggregates(db: Session, old_amount: Optional[float], new_amount: Optional[float]):
+    """
+    Moves one receipt's contribution in the spend aggregates from old_amount
+    to new_amount (None meaning absent), inside the caller's transaction.
+    Always runs, even for an unchanged amount, so the data version moves.
+    """
+    _apply_spend_deltas(
+        db,
+        removed=[old_amount] if old_amount is not None else [],
+        added=[new_amount] if new_amount is not None else [],
+    )
+
+def _amount_buckets(amounts: List[float]) -> Counter:
+    """Receipts per (level, bucket) of amount_buckets for the given amounts."""
+    return Counter(
+        (level, math.floor(amount / width))
+        for amount in amounts
+        for level, width in enumerate(models.AMOUNT_BUCKET_WIDTHS)
+    )
+
+def _apply_spend_deltas(db: Session, removed: List[float], added: List[float]):
+    """
+    Removes the `removed` amounts from the spend aggregates and adds the
+    `added` ones, with one statement per table, inside the caller's transaction.
+    """
+    frequency_deltas = Counter(added)
+    frequency_deltas.subtract(Counter(removed))
+    changed = [{"amount": amount, "count": delta} for amount, delta in frequency_deltas.items() if delta]
+    if changed:
+        statement = insert(models.AmountFrequency)
+        db.execute(
+            statement.on_conflict_do_update(
+                index_elements=[models.AmountFrequency.amount],
+                set_={"count": models.AmountFrequency.count + statement.excluded.count},
+            ),
+            changed,
+        )
+        decreased = [row["amount"] for row in changed if row["count"] < 0]
+        if decreased:
+            db.execute(
+                delete(models.AmountFrequency).where(
+                    models.AmountFrequency.amount.in_(decreased),
+                    models.AmountFrequency.count <= 0,
+                )
+            )
+    bucket_deltas = _amount_buckets(added)
+    bucket_deltas.subtract(_amount_buckets(removed))
+    changed = [{"level": level, "bucket": bucket, "count": delta} for (level, bucket), delta in bucket_deltas.items() if delta]
+    if changed:
+        statement = insert(models.AmountBucket)
+        db.execute(
+            statement.on_conflict_do_update(
+                index_elements=[models.AmountBucket.level, models.AmountBucket.bucket],
+                set_={"count": models.AmountBucket.count + statement.excluded.count},
+            ),
+            changed,
+        )
+        decreased = [(row["level"], row["bucket"]) for row in changed if row["count"] < 0]
+        if decreased:
+            db.execute(
+                delete(models.AmountBucket).where(
+                    tuple_(models.AmountBucket.level, models.AmountBucket.bucket).in_(decreased),
+                    models.AmountBucket.count <= 0,
+                )
+            )
+    db.execute(
+        update(models.SpendTotals)
+        .where(models.SpendTotals.id == SPEND_TOTALS_ID)
+        .values(
+            total=models.SpendTotals.total + (sum(added) - sum(removed)),
+            count=models.SpendTotals.count + (len(added) - len(removed)),
+            data_version=models.SpendTotals.data_version + 1,
+        )
+    )
+
+def _rollup_entry(receipt) -> Optional[Tuple[RollupKey, float]]:
+    """The daily_spend key and amount of a receipt or receipt row; None for undated receipts."""
+    if receipt.date is None:
+        return None
+    return (receipt.date, receipt.vendor or "Unknown", receipt.category or "Uncategorized"), receipt.amount
+
+def _apply_rollup_deltas(db: Session, removed: List[Optional[Tuple[RollupKey, float]]],
+                         added: List[Optional[Tuple[RollupKey, float]]]):
+    """
+    Takes the `removed` entries out of daily_spend and puts the `added` ones
+    in, with one upsert, inside the caller's transaction. Days left without
+    receipts are deleted.
+    """
+    deltas: Dict[RollupKey, List] = {}
+    for sign, entries in ((-1, removed), (1, added)):
+        for entry in entries:
+            if entry is None:
+                continue
+            key, amount = entry
+            delta = deltas.setdefault(key, [0.0, 0])
+            delta[0] += sign * amount
+            delta[1] += sign
+    changed = [
+        {"day": day, "vendor": vendor, "category": category, "total": total, "count": count}
+        for (day, vendor, category), (total, count) in deltas.items()
+        if total or count
+    ]
+    if not changed:
+        return
+    statement = insert(models.DailySpend)
+    db.execute(
+        statement.on_conflict_do_update(
+            index_elements=[models.DailySpend.day, models.DailySpend.vendor, models.DailySpend.category],
+            set_={
+                "total": models.DailySpend.total + statement.excluded.total,
+                "count": models.DailySpend.count + statement.excluded.count,
+            },
+        ),
+        changed,
+    )
+    emptied = [(row["day"], row["vendor"], row["category"]) for row in changed if row["count"] < 0]
+    if emptied:
+        db.execute(
+            delete(models.DailySpend).where(
+                tuple_(models.DailySpend.day, models.DailySpend.vendor, models.DailySpend.category).in_(emptied),
+                models.DailySpend.count <= 0,
+            )
+        )
+
+def rebuild_daily_spend(db: Session):
+    """Recomputes daily_spend from the receipts table."""
+    db.execute(delete(models.DailySpend))
+    vendor = func.coalesce(models.Receipt.vendor, "Unknown")
+    category = func.coalesce(models.Receipt.category, "Uncategorized")
+    db.execute(
+        insert(models.DailySpend).from_select(
+            ["day", "vendor", "category", "total", "count"],
+            select(models.Receipt.date, vendor, category, func.sum(models.Receipt.amount), func.count(models.Receipt.id))
+            .where(models.Receipt.date.isnot(None))
+            .group_by(models.Receipt.date, vendor, category),
+        )
+    )
+    db.commit()
+
+def rebuild_spend_aggregates(db: Session):
+    """Recomputes the spend aggregates from the receipts table."""
+    data_version = get_data_version(db)
+    db.execute(delete(models.AmountFrequency))
+    db.execute(delete(models.SpendTotals))
+    total, count = db.query(
+        func.coalesce(func.sum(models.Receipt.amount), 0.0),
+        func.count(models.Receipt.id),
+    ).one()
+    # Explicit columns: the new row gets a new epoch from its server default,
+    # and migrations run this before the epoch column exists
+    db.execute(insert(models.SpendTotals).values(id=SPEND_TOTALS_ID, total=total, count=count, data_version=data_version + 1))
+    frequencies = db.query(models.Receipt.amount, func.count(models.Receipt.id))\
+        .group_by(models.Receipt.amount).all()
+    if frequencies:
+        db.execute(
+            insert(models.AmountFrequency),
+            [{"amount": amount, "count": freq} for amount, freq in frequencies],
+        )
+    rebuild_amount_buckets(db)
+    db.commit()
+
+def rebuild_amount_buckets(db: Session):
+    """Recomputes amount_buckets from amount_frequencies inside the caller's transaction."""
+    db.execute(delete(models.AmountBucket))
+    buckets = Counter()
+    for amount, count in db.execute(select(models.AmountFrequency.amount, models.AmountFrequency.count)):
+        for key in _amount_buckets([amount]):
+            buckets[key] += count
+    if buckets:
+        db.execute(
+            insert(models.AmountBucket),
+            [{"level": level, "bucket": bucket, "count": count} for (level, bucket), count in buckets.items()],
+        )
+
+def get_data_version(db: Session) -> int:
+    """A counter that changes whenever any receipt is written."""
+    version = db.query(models.SpendTotals.data_version)\
+        .filter(models.SpendTotals.id == SPEND_TOTALS_ID).scalar()
+    return version or 0
+
+def get_data_stamp(db: Session) -> Tuple[str, int]:
+    """
+    (epoch, data_version): together they change whenever any receipt is
+    written, including after the database is wiped and the version restarts.
+    """
+    row = db.query(models.SpendTotals.epoch, models.SpendTotals.data_version)\
+        .filter(models.SpendTotals.id == SPEND_TOTALS_ID).first()
+    if row is None:
+        return "", 0
+    return row.epoch or "", row.data_version or 0
+
+def ensure_spend_aggregates(db: Session):
+    """Builds the spend aggregates if they have never been computed for this database."""
+    if db.get(models.SpendTotals, SPEND_TOTALS_ID) is None:
+        rebuild_spend_aggregates(db)
+
+def _walk_counts(rows, rank: int) -> Tuple:
+    """Walks (value, count) rows in order to the one holding the `rank`-th receipt; returns it and the rank within it."""
+    for value, count in rows:
+        if rank <= count:
+            return value, rank
+        rank -= count
+    raise ValueError("The amount counts are out of step with the receipt count.")
+
+def _amounts_at(db: Session, rank: int) -> Tuple[float, float]:
+    """
+    The amounts of the `rank`-th receipt (from 1) in amount order and of the
+    one after it. Walks the running counts down the amount_buckets levels,
+    then through the distinct amounts of one unit in amount_frequencies, so
+    it reads a few hundred rows at most however many receipts there are.
+    """
+    bucket = None
+    parent_width = None
+    for level, width in enumerate(models.AMOUNT_BUCKET_WIDTHS):
+        query = db.query(models.AmountBucket.bucket, models.AmountBucket.count)\
+            .filter(models.AmountBucket.level == level)
+        if bucket is not None:
+            children = parent_width // width
+            query = query.filter(models.AmountBucket.bucket >= bucket * children,
+                                 models.AmountBucket.bucket < (bucket + 1) * children)
+        bucket, rank = _walk_counts(query.order_by(models.AmountBucket.bucket), rank)
+        parent_width = width
+    amounts = db.query(models.AmountFrequency.amount, models.AmountFrequency.count)\
+        .filter(models.AmountFrequency.amount >= bucket * parent_width,
+                models.AmountFrequency.amount < (bucket + 1) * parent_width)\
+        .order_by(models.AmountFrequency.amount)
+    rows = iter(amounts.all())
+    for amount, count in rows:
+        if rank < count:
+            return amount, amount
+        if rank == count:
+            break
+        rank -= count
+    else:
+        raise ValueError("The amount counts are out of step with the receipt count.")
+    following = next(rows, None)
+    if following is not None:
+        return amount, following[0]
+    # The next receipt is in a later unit
+    following = db.query(func.min(models.AmountFrequency.amount)).filter(models.AmountFrequency.amount > amount).scalar()
+    return amount, amount if following is None else following
+
 def get_spend_statistics(db: Session) -> schemas.SpendStats:
-    """Calculate and return aggregate spending statistics."""
-    amounts = db.query(models.Receipt.amount).all()
-    amount_list = [a[0] for a in amounts]
+    """
+    Return aggregate spending statistics from the maintained aggregates.
+    Total, count and mode are single-row lookups; the median descends the
+    running counts of amount_buckets (see _nth_amount).
+    """
+    totals = db.get(models.SpendTotals, SPEND_TOTALS_ID)
 
-    if not amount_list:
+    if totals is None or totals.count <= 0:
         return schemas.SpendStats(total_spend=0, mean_spend=0, median_spend=0, mode_spend=0)
 
-    total = sum(amount_list)
-    mean = statistics.mean(amount_list)
-    median = statistics.median(amount_list)
-    try:
-        mode = statistics.mode(amount_list)
-    except statistics.StatisticsError:
-        mode = 0 # No unique mode
+    total = totals.total
+    mean = total / totals.count
+
+    # With an even count, the median is halfway between the two middle receipts
+    middle, following = _amounts_at(db, (totals.count + 1) // 2)
+    median = middle if totals.count % 2 else (middle + following) / 2
+
+    # Most frequent amount; ties go to the smallest amount
+    mode = db.query(models.AmountFrequency.amount)\
+        .order_by(desc(models.AmountFrequency.count), models.AmountFrequency.amount)\
+        .limit(1).scalar()
 
     return schemas.SpendStats(total_spend=total, mean_spend=mean, median_spend=median, mode_spend=mode)
 
 # MODIFIED: This function now calculates the sum of the amount, not the count.
 def get_vendor_spend(db: Session) -> List:
-    """Get the total amount spent per vendor."""
+    """Get the total amount spent per vendor, from the daily rollups."""
     return db.query(
-        models.Receipt.vendor,
-        func.sum(models.Receipt.amount).label('total_spend')
-    ).group_by(models.Receipt.vendor).order_by(desc('total_spend')).all()
+        models.DailySpend.vendor,
+        func.sum(models.DailySpend.total).label('total_spend')
+    ).group_by(models.DailySpend.vendor).order_by(desc('total_spend')).all()
+
+def get_category_spend(db: Session, start_date: Optional[date] = None, end_date: Optional[date] = None) -> List:
+    """Get the total amount spent per category, optionally within a date range."""
+    query = db.query(
+        models.ReceiptCategory.category,
+        func.sum(models.ReceiptCategory.amount).label('total_spend')
+    )
+    if start_date:
+        query = query.filter(models.ReceiptCategory.date >= start_date)
+    if end_date:
+        query = query.filter(models.ReceiptCategory.date <= end_date)
+    return query.group_by(models.ReceiptCategory.category).order_by(desc('total_spend')).all()
 
 def get_monthly_spend(db: Session) -> List:
-    """Get total spend aggregated by month."""
+    """Get total spend aggregated by month, from the daily rollups."""
     return db.query(
-        func.strftime('%Y-%m', models.Receipt.date).label('month'),
-        func.sum(models.Receipt.amount).label('total_spend')
-    ).group_by('month').order_by('month').all()
\ No newline at end of file
+        func.strftime('%Y-%m', models.DailySpend.day).label('month'),
+        func.sum(models.DailySpend.total).label('total_spend')
+    ).group_by('month').order_by('month').all()
+
+def get_spend_timeseries(db: Session, bucket: str = "month", start_date: Optional[date] = None,
+                         end_date: Optional[date] = None, vendor: Optional[str] = None) -> List:
+    """Total spend and receipt count per day, week, month or year, summed from the daily rollups."""
+    if bucket not in TIMESERIES_BUCKETS:
+        raise ValueError(f"Unknown bucket '{bucket}'.")
+    period = TIMESERIES_BUCKETS[bucket](models.DailySpend.day).label('period')
+    query = db.query(
+        period,
+        func.sum(models.DailySpend.total).label('total_spend'),
+        func.sum(models.DailySpend.count).label('receipts'),
+    )
+    if vendor:
+        query = query.filter(models.DailySpend.vendor == vendor)
+    if start_date:
+        query = query.filter(models.DailySpend.day >= start_date)
+    if end_date:
+        query = query.filter(models.DailySpend.day <= end_date)
+    return query.group_by(period).order_by(period).all()
+
+def get_top_items(db: Session, start_date: Optional[date] = None, end_date: Optional[date] = None,
+                  order_by: str = "spend", limit: int = 10) -> List:
+    """The most bought items by total spend, quantity or number of receipts, aggregated over line_items."""
+    if order_by not in TOP_ITEM_ORDERS:
+        raise ValueError(f"Cannot order items by '{order_by}'.")
+    total_spend = func.sum(models.LineItem.total).label('total_spend')
+    quantity = func.sum(models.LineItem.quantity).label('quantity')
+    receipts = func.count(func.distinct(models.LineItem.receipt_id)).label('receipts')
+    query = db.query(
+        models.LineItem.description,
+        receipts,
+        quantity,
+        total_spend,
+        func.coalesce(func.sum(models.LineItem.total) / func.nullif(func.sum(models.LineItem.quantity), 0), 0.0).label('average_unit_price'),
+    )
+    if start_date:
+        query = query.filter(models.LineItem.date >= start_date)
+    if end_date:
+        query = query.filter(models.LineItem.date <= end_date)
+    ranking = {"spend": total_spend, "quantity": quantity, "receipts": receipts}[order_by]
+    return query.group_by(models.LineItem.description)\
+        .order_by(desc(ranking), models.LineItem.description)\
+        .limit(limit).all()
+
+def get_item_price_history(db: Session, description: Optional[str] = None, item_code: Optional[str] = None,
+                           start_date: Optional[date] = None, end_date: Optional[date] = None) -> List:
+    """Every purchase of an item, by exact description and/or item code, oldest first."""
+    if not description and not item_code:
+        raise ValueError("Give a description or an item_code.")
+    query = db.query(
+        models.LineItem.receipt_id,
+        models.LineItem.date,
+        models.LineItem.vendor,
+        models.LineItem.item_code,
+        models.LineItem.quantity,
+        models.LineItem.unit_price,
+    )
+    if description:
+        query = query.filter(models.LineItem.description == description)
+    if item_code:
+        query = query.filter(models.LineItem.item_code == item_code)
+    if start_date:
+        query = query.filter(models.LineItem.date >= start_date)
+    if end_date:
+        query = query.filter(models.LineItem.date <= end_date)
+    return query.order_by(models.LineItem.date, models.LineItem.id).all()
@@ -1,16 +1,51 @@
 # database.py
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./receipts.db"
+from . import config
+
+SQLALCHEMY_DATABASE_URL = config.DATABASE_URL
+
+def _apply_production_pragmas(dbapi_connection, connection_record):
+    """
+    Tunes every new SQLite connection for concurrent use: WAL lets readers
+    run alongside the single writer, and busy_timeout makes writers wait for
+    the lock instead of failing with "database is locked".
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA busy_timeout={int(config.DB_BUSY_TIMEOUT_MS)}")
+    # NORMAL only syncs at checkpoints in WAL mode; a crash can lose the last
+    # commits but never corrupts the database.
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA cache_size=-{int(config.DB_CACHE_SIZE_KIB)}")
+    cursor.execute(f"PRAGMA mmap_size={int(config.DB_MMAP_SIZE)}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+def make_engine(url: str = SQLALCHEMY_DATABASE_URL, mode: str = config.DB_MODE):
+    """Creates an engine for `url` in the given mode ("production" or "basic")."""
+    if mode != "production":
+        # The `connect_args` are needed only for SQLite to allow multi-threaded interaction.
+        return create_engine(url, connect_args={"check_same_thread": False})
+
+    engine = create_engine(
+        url,
+        connect_args={
+            "check_same_thread": False,
+            # The driver's own lock wait, in seconds, matching busy_timeout
+            "timeout": config.DB_BUSY_TIMEOUT_MS / 1000,
+        },
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+    )
+    event.listen(engine, "connect", _apply_production_pragmas)
+    return engine
 
 # create_engine is needed for SQLAlchemy to connect to the database.
-# The `connect_args` are needed only for SQLite to allow multi-threaded interaction.
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+engine = make_engine()
 
 # Each instance of the SessionLocal class will be a new database session.
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -0,0 +1,239 @@
+# ingest.py
+#
+# Bulk-ingests a directory tree of receipts without going through the API:
+#
+#     python -m app.ingest /path/to/archive [--workers 8] [--chunk-size 1000] [--timeout 60]
+#
+# Each file is copied into the upload store (services/storage.py) like an API
+# upload, so receipts are keyed on the stored, content-addressed path: the same
+# bytes ingested twice, or ingested and uploaded, give one receipt. Files are
+# extracted and parsed on a pool of supervised worker processes
+# (services/pool.py; with RECEIPT_OCR_BATCH_SIZE above 1, images in batches
+# that share a tesseract run). A task that runs past its timeout or memory cap has
+# its worker killed and its files recorded as failed. Receipts are written
+# with the bulk upsert path, one transaction per chunk. Every finished file is recorded
+# in a manifest (JSON lines, by default <dir>/.ingest_manifest.jsonl) once its
+# chunk has committed, so rerunning after a crash skips everything already done.
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, wait
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from . import config, crud, migrations, schemas
+from .database import SessionLocal, engine
+from .services import parser, pool, storage
+
+MANIFEST_NAME = ".ingest_manifest.jsonl"
+# Seconds between progress lines.
+PROGRESS_INTERVAL_SECONDS = 5.0
+
+
+def find_receipts(directory: str) -> Iterator[str]:
+    """Yields the absolute path of every supported file under `directory`, in a stable order."""
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if os.path.splitext(name)[1].lower() in parser.SUPPORTED_EXTENSIONS:
+                yield os.path.abspath(os.path.join(root, name))
+
+
+def store_file(path: str, extension: str) -> storage.StoredFile:
+    """Copies a file into the upload store under the same rules as an API upload."""
+    async def copy(f):
+        async def read(size: int) -> bytes:
+            return f.read(size)
+        return await storage.store(read, config.UPLOADS_DIR, extension, max_bytes=config.MAX_UPLOAD_BYTES,
+                                   compress_text=config.COMPRESS_TEXT_UPLOADS)
+
+    with open(path, "rb") as f:
+        return asyncio.run(copy(f))
+
+
+def _signature(path: str) -> Tuple[int, int]:
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def load_manifest(manifest_path: str) -> Dict[str, dict]:
+    """The latest manifest entry per file path. A torn last line from a crash is ignored."""
+    entries: Dict[str, dict] = {}
+    if not os.path.exists(manifest_path):
+        return entries
+    with open(manifest_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            entries[entry["path"]] = entry
+    return entries
+
+
+def is_done(entry: dict, path: str, retry_failed: bool) -> bool:
+    """A file is skipped when it is unchanged since its manifest entry (and did not fail, with --retry-failed)."""
+    if entry is None or (entry["status"] == "error" and retry_failed):
+        return False
+    return [entry["size"], entry["mtime_ns"]] == list(_signature(path))
+
+
+class Ingest:
+    """Runs one ingest, tracking throughput and failures per format."""
+
+    def __init__(self, manifest_path: str, chunk_size: int):
+        self.manifest = open(manifest_path, "a", encoding="utf-8")
+        self.chunk_size = chunk_size
+        self.pending: List[Tuple[str, schemas.ReceiptCreate]] = []
+        self.succeeded: Counter = Counter()
+        self.failed: Counter = Counter()
+        self.errors: List[Tuple[str, str]] = []
+
+    def _record(self, path: str, status: str, **fields):
+        size, mtime_ns = _signature(path)
+        entry = {"path": path, "status": status, "size": size, "mtime_ns": mtime_ns, **fields}
+        self.manifest.write(json.dumps(entry) + "\n")
+
+    def add(self, path: str, stored_path: str, text: str, extracted_data: dict):
+        """Queues the receipt of the file at `path`, keyed on its copy in the upload store."""
+        receipt = schemas.ReceiptCreate(**extracted_data, file_path=stored_path,
+                                        original_filename=os.path.basename(path), raw_text=text)
+        self.pending.append((path, receipt))
+        if len(self.pending) >= self.chunk_size:
+            self.flush()
+
+    def fail(self, path: str, error: str):
+        self.failed[os.path.splitext(path)[1].lower()] += 1
+        self.errors.append((path, error))
+        self._record(path, "error", error=error)
+
+    def flush(self):
+        """Writes the pending receipts in one transaction, then marks them done in the manifest."""
+        if not self.pending:
+            return
+        with SessionLocal() as db:
+            ids = crud.bulk_upsert_receipts(db, [receipt for _, receipt in self.pending], chunk_size=len(self.pending))
+        for (path, _), receipt_id in zip(self.pending, ids):
+            self.succeeded[os.path.splitext(path)[1].lower()] += 1
+            self._record(path, "ok", receipt_id=receipt_id)
+        self.manifest.flush()
+        os.fsync(self.manifest.fileno())
+        self.pending = []
+
+    def close(self):
+        self.flush()
+        self.manifest.close()
+
+
+def run(directory: str, workers: int, chunk_size: int, manifest_path: str, retry_failed: bool = False,
+        timeout_seconds: Optional[float] = config.WORKER_TIMEOUT_SECONDS) -> Ingest:
+    migrations.upgrade(engine)
+    with SessionLocal() as db:
+        crud.ensure_spend_aggregates(db)
+
+    manifest = load_manifest(manifest_path)
+    found = list(find_receipts(directory))
+    paths = [path for path in found if not is_done(manifest.get(path), path, retry_failed)]
+    print(f"{len(paths)} files to ingest ({len(found) - len(paths)} already done) with {workers} workers")
+
+    ingest = Ingest(manifest_path, chunk_size)
+    started = last_report = time.perf_counter()
+    done = 0
+    # (archive path, stored copy) of every file that passes the upload checks
+    files: List[Tuple[str, storage.StoredFile]] = []
+    for path in paths:
+        extension = os.path.splitext(path)[1].lower()
+        try:
+            pool.admit(path, extension)
+            files.append((path, store_file(path, extension)))
+        except (ValueError, OSError, storage.UploadTooLarge) as e:
+            ingest.fail(path, f"{type(e).__name__}: {e}")
+            done += 1
+    # Images are grouped so each batch shares one tesseract run (one image per batch by default)
+    remaining = iter(parser.extraction_tasks([stored.extension for _, stored in files]))
+    # Keep a bounded number of tasks in flight so huge trees don't queue every future up front
+    max_in_flight = workers * 4
+    executor = pool.WorkerPool(
+        workers,
+        max_rss_bytes=config.WORKER_MAX_RSS_MB * 2 ** 20 or None,
+        max_tasks=config.WORKER_MAX_TASKS or None,
+    )
+    try:
+        in_flight = {}
+        while True:
+            while len(in_flight) < max_in_flight:
+                task = next(remaining, None)
+                if task is None:
+                    break
+                task_files = [files[index] for index in task]
+                # The limit covers every file of the task, like pool.task_timeout
+                timeout = timeout_seconds * len(task_files) if timeout_seconds else None
+                future = executor.submit(parser.extract_and_parse_many,
+                                         [(stored.path, stored.extension) for _, stored in task_files], timeout=timeout)
+                in_flight[future] = task_files
+            if not in_flight:
+                break
+
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                task_files = in_flight.pop(future)
+                try:
+                    outcomes = future.result()
+                except Exception as e:
+                    # Timeouts and memory kills fail the whole task
+                    outcomes = [e] * len(task_files)
+                for (path, stored), outcome in zip(task_files, outcomes):
+                    if isinstance(outcome, Exception):
+                        ingest.fail(path, f"{type(outcome).__name__}: {outcome}")
+                    else:
+                        ingest.add(path, stored.path, outcome.text, outcome.parsed)
+                    done += 1
+
+            now = time.perf_counter()
+            if now - last_report >= PROGRESS_INTERVAL_SECONDS:
+                print(f"  {done}/{len(paths)} files, {done / (now - started):.1f} files/sec")
+                last_report = now
+    finally:
+        executor.shutdown()
+        ingest.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"Ingested {sum(ingest.succeeded.values())} receipts, {sum(ingest.failed.values())} failed, "
+          f"in {elapsed:.1f}s ({done / elapsed if elapsed else 0:.1f} files/sec)")
+    for extension in sorted(set(ingest.succeeded) | set(ingest.failed)):
+        print(f"  {extension:<6} ok: {ingest.succeeded[extension]:>7}  failed: {ingest.failed[extension]:>7}")
+    return ingest
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Ingest a directory tree of receipts")
+    arg_parser.add_argument("directory")
+    arg_parser.add_argument("--workers", type=int, default=config.BATCH_WORKERS)
+    arg_parser.add_argument("--chunk-size", type=int, default=config.BULK_CHUNK_SIZE,
+                            help="Receipts written per transaction")
+    arg_parser.add_argument("--timeout", type=int, default=config.WORKER_TIMEOUT_SECONDS,
+                            help="Seconds allowed per file before its worker is killed and the file fails (0 for none)")
+    arg_parser.add_argument("--manifest", help=f"Progress manifest (default: <directory>/{MANIFEST_NAME})")
+    arg_parser.add_argument("--retry-failed", action="store_true",
+                            help="Process files that failed in an earlier run again")
+    arg_parser.add_argument("--show-errors", action="store_true", help="List every failed file")
+    args = arg_parser.parse_args()
+    # Shows the app's log messages, such as the migrations run before ingesting
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if not os.path.isdir(args.directory):
+        arg_parser.error(f"{args.directory} is not a directory")
+    manifest_path = args.manifest or os.path.join(args.directory, MANIFEST_NAME)
+    ingest = run(args.directory, max(1, args.workers), max(1, args.chunk_size), manifest_path, args.retry_failed,
+                 args.timeout or None)
+    if args.show_errors:
+        for path, error in ingest.errors:
+            print(f"  {path}: {error}")
+
+
+if __name__ == "__main__":
+    main()
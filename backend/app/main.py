@@ -2,9 +2,13 @@
 
 import os
 import shutil
-from fastapi import FastAPI, File, UploadFile, Depends, HTTPException, Query
+import time
+from fastapi import FastAPI, File, UploadFile, Depends, HTTPException, Query, Request
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import date
 from contextlib import asynccontextmanager
 import pathlib
@@ -12,77 +16,453 @@ import pathlib
 # --- Absolute Path Configuration ---
 APP_DIR = pathlib.Path(__file__).parent.resolve()
 BACKEND_ROOT_DIR = APP_DIR.parent
-UPLOADS_DIR = BACKEND_ROOT_DIR / "uploads"
 DB_FILE = BACKEND_ROOT_DIR / "receipts.db"
 
-from . import crud, models, schemas
-from .services import parser
-from .database import engine, get_db
+from . import config, crud, migrations, models, schemas
+from .services import parser, pool, cache, metrics, export, storage, serialize
+from .services.jobs import job_queue
+from .database import engine, get_db, SessionLocal
 
-def run_startup_logic():
-    if os.path.exists(DB_FILE):
-        os.remove(DB_FILE)
+UPLOADS_DIR = pathlib.Path(config.UPLOADS_DIR)
+ALLOWED_EXTENSIONS = parser.SUPPORTED_EXTENSIONS
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Multipart framing (boundary lines, part headers) allowed on top of the file
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+def reset_data():
+    """Deletes the database and every uploaded file."""
+    # WAL mode keeps recent commits in side files that must go with the database
+    for db_path in (DB_FILE, f"{DB_FILE}-wal", f"{DB_FILE}-shm"):
+        if os.path.exists(db_path):
+            os.remove(db_path)
     if os.path.exists(UPLOADS_DIR):
         shutil.rmtree(UPLOADS_DIR)
-    models.Base.metadata.create_all(bind=engine)
-    os.makedirs(UPLOADS_DIR)
+
+def run_startup_logic():
+    """
+    Keeps existing data and migrates the schema in place, so a restart costs
+    nothing. Set RECEIPT_RESET_ON_STARTUP=true (or run clear_data.py) to start empty.
+    """
+    if config.RESET_ON_STARTUP:
+        reset_data()
+    migrations.upgrade(engine)
+    with SessionLocal() as db:
+        crud.ensure_spend_aggregates(db)
+    os.makedirs(UPLOADS_DIR, exist_ok=True)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     run_startup_logic()
+    # Start the extraction workers now rather than on the first upload
+    pool.get_process_pool()
+    job_queue.start(workers=config.JOB_WORKERS)
     yield
+    job_queue.stop()
+    pool.shutdown_process_pool()
 
 app = FastAPI(title="Receipt Processor API", lifespan=lifespan)
 
-@app.post("/upload/", response_model=schemas.Receipt)
-def upload_and_process_receipt(file: UploadFile = File(...), db: Session = Depends(get_db)):
-    # ... (code is unchanged)
-    allowed_extensions = {'.png', '.jpg', '.jpeg', '.pdf', '.txt'}
+class RequestTooLarge(HTTPException):
+    def __init__(self, limit: int):
+        super().__init__(status_code=413, detail=f"Request body is larger than the {limit} byte limit.")
+
+class UploadBodyLimit:
+    """
+    Caps the request body of the upload routes before anything parses it.
+    Starlette reads and spools a whole multipart body before the route runs,
+    so the cap in save_upload alone would only limit what gets stored. A
+    Content-Length over the limit gets a 413 straight away, and a body sent
+    without one (chunked) is cut off with a 413 once it goes past the limit.
+    """
+
+    def __init__(self, app, limits: Dict[str, int]):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope["path"]) if scope["type"] == "http" and scope["method"] == "POST" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length", b"")
+        if content_length.isdigit() and int(content_length) > limit:
+            error = RequestTooLarge(limit)
+            response = JSONResponse({"detail": error.detail}, status_code=error.status_code, headers={"Connection": "close"})
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # FastAPI passes HTTPExceptions raised while reading the body through as they are
+                    raise RequestTooLarge(limit)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+app.add_middleware(UploadBodyLimit, limits={
+    "/upload/": config.MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES,
+    "/upload/async/": config.MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES,
+    "/upload/batch/": config.MAX_BATCH_UPLOAD_BYTES,
+})
+
+@app.middleware("http")
+async def record_request_timing(request: Request, call_next):
+    """Records per-route latency and reports the request's stage timings in a Server-Timing header."""
+    started = time.perf_counter()
+    timings = metrics.start_request()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - started
+    # Label by route template so ids in paths (/jobs/{job_id}) don't create new series
+    route = request.scope.get("route")
+    metrics.REQUEST_SECONDS.observe(
+        elapsed,
+        method=request.method,
+        route=route.path if route is not None else "unmatched",
+        status=str(response.status_code),
+    )
+    response.headers["Server-Timing"] = metrics.server_timing_header(timings, elapsed)
+    return response
+
+async def save_upload(file: UploadFile) -> storage.StoredFile:
+    """
+    Validates the file type and size, then streams the upload into the
+    content-addressed store under UPLOADS_DIR, hashing the bytes as they are
+    written. Identical bytes already stored are reused. Uploads over
+    RECEIPT_MAX_UPLOAD_BYTES get a 413. By now Starlette has spooled the
+    body, so this only limits what is stored; UploadBodyLimit protects the
+    server from oversized requests.
+    """
     file_extension = os.path.splitext(file.filename)[1].lower()
-    if file_extension not in allowed_extensions:
+    if file_extension not in ALLOWED_EXTENSIONS:
         raise HTTPException(status_code=400, detail=f"File type '{file_extension}' not supported.")
+    if file.size is not None and file.size > config.MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"Upload is larger than the {config.MAX_UPLOAD_BYTES} byte limit.")
 
-    file_path = os.path.join(UPLOADS_DIR, file.filename)
-    
     try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        with metrics.time_stage("copy", file_extension):
+            return await storage.store(
+                file.read,
+                str(UPLOADS_DIR),
+                file_extension,
+                max_bytes=config.MAX_UPLOAD_BYTES,
+                compress_text=config.COMPRESS_TEXT_UPLOADS,
+                chunk_size=UPLOAD_CHUNK_SIZE,
+            )
+    except storage.UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Could not save file: {e}")
 
+def parse_with_cache(db: Session, file_path: str, file_extension: str, content_hash: str):
+    """
+    Returns the cached (text, parse) for these bytes, or extracts and parses
+    them on the worker pool and caches the result.
+    """
+    cached = cache.lookup(db, content_hash)
+    if cached is not None:
+        return cached
+    started = time.perf_counter()
+    result = pool.extract(file_path, file_extension)
+    # The worker times its own stages; the rest of the wait was spent queued for it
+    worker_seconds = sum(seconds for _, seconds in result.stages)
+    metrics.observe_stage("queue", file_extension, max(0.0, time.perf_counter() - started - worker_seconds))
+    metrics.observe_stages(result.stages, file_extension)
+    cache.store(db, content_hash, result.text, result.parsed, result.fingerprint)
+    return result.text, result.parsed
+
+@app.post("/upload/", response_model=schemas.Receipt)
+async def upload_and_process_receipt(file: UploadFile = File(...), db: Session = Depends(get_db)):
+    stored = await save_upload(file)
+    # Extraction and the database write block, so they run off the event loop
+    return await run_in_threadpool(process_upload, db, stored, file.filename)
+
+def process_upload(db: Session, stored: storage.StoredFile, filename: str):
     try:
-        extracted_data = parser.process_file(file_path, file_extension)
+        text, extracted_data = parse_with_cache(db, stored.path, stored.extension, stored.content_hash)
         receipt_data = schemas.ReceiptCreate(
             **extracted_data,
-            file_path=str(file_path)
+            file_path=stored.path,
+            original_filename=filename,
+            raw_text=text
         )
-        return crud.create_receipt(db=db, receipt=receipt_data)
+        with metrics.time_stage("commit", stored.extension):
+            return crud.create_receipt(db=db, receipt=receipt_data)
     except ValueError as e:
         raise HTTPException(status_code=422, detail=f"Parsing error: {e}")
+    except (TimeoutError, MemoryError) as e:
+        raise HTTPException(status_code=422, detail=f"Extraction aborted: {e}")
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {e}")
 
+@app.post("/upload/async/", response_model=schemas.Job, status_code=202)
+async def upload_receipt_async(file: UploadFile = File(...), timeout_seconds: Optional[float] = Query(None, gt=0), db: Session = Depends(get_db)):
+    """
+    Saves the file and queues it for background processing.
+    Poll GET /jobs/{job_id} for the outcome.
+    """
+    stored = await save_upload(file)
+    return await run_in_threadpool(
+        job_queue.enqueue,
+        db,
+        filename=file.filename,
+        file_path=stored.path,
+        file_extension=stored.extension,
+        content_hash=stored.content_hash,
+        timeout_seconds=timeout_seconds,
+    )
+
+@app.get("/jobs/{job_id}", response_model=schemas.Job)
+def get_job(job_id: int, db: Session = Depends(get_db)):
+    job = db.get(models.IngestJob, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found.")
+    return job
+
+@app.post("/upload/batch/", response_model=schemas.BatchUploadResult)
+async def upload_and_process_batch(files: List[UploadFile] = File(...), db: Session = Depends(get_db)):
+    """
+    Parses many receipts in parallel across the process pool and
+    writes all successfully parsed receipts in one transaction.
+    """
+    started = time.perf_counter()
+    results = [schemas.BatchFileResult(filename=file.filename, status="pending") for file in files]
+
+    # Save every file first, then fan the CPU-bound parsing of cache misses out to the pool
+    saved = []
+    for index, file in enumerate(files):
+        try:
+            saved.append((index, await save_upload(file)))
+        except HTTPException as e:
+            results[index].status = "error"
+            results[index].error = e.detail
+    return await run_in_threadpool(process_batch, db, saved, results, started)
+
+def process_batch(db: Session, saved: List, results: List[schemas.BatchFileResult], started: float):
+    misses = []
+    parsed = {}
+    executor = pool.get_process_pool()
+    for index, stored in saved:
+        cached = cache.lookup(db, stored.content_hash)
+        if cached is not None:
+            text, extracted_data = cached
+            parsed[index] = schemas.ReceiptCreate(**extracted_data, file_path=stored.path,
+                                                  original_filename=results[index].filename, raw_text=text)
+            continue
+        try:
+            pool.admit(stored.path, stored.extension)
+        except ValueError as e:
+            results[index].status = "error"
+            results[index].error = f"Parsing error: {e}"
+            continue
+        misses.append((index, stored.path, stored.extension, stored.content_hash))
+
+    # Images go to the pool in batches that share one tesseract run (one image per batch by
+    # default, see config.OCR_BATCH_SIZE); other files go one per task
+    tasks = []
+    for group in parser.extraction_tasks([file_extension for _, _, file_extension, _ in misses]):
+        task = [misses[position] for position in group]
+        future = executor.submit(parser.extract_and_parse_many, [(file_path, file_extension) for _, file_path, file_extension, _ in task],
+                                 timeout=pool.task_timeout(len(task)))
+        tasks.append((task, future))
+
+    for task, future in tasks:
+        try:
+            outcomes = future.result()
+        except Exception as e:
+            outcomes = [e] * len(task)
+        for (index, file_path, file_extension, content_hash), outcome in zip(task, outcomes):
+            try:
+                if isinstance(outcome, Exception):
+                    raise outcome
+                metrics.observe_stages(outcome.stages, file_extension)
+                cache.store(db, content_hash, outcome.text, outcome.parsed, outcome.fingerprint)
+                parsed[index] = schemas.ReceiptCreate(**outcome.parsed, file_path=file_path,
+                                                      original_filename=results[index].filename, raw_text=outcome.text)
+            except ValueError as e:
+                results[index].status = "error"
+                results[index].error = f"Parsing error: {e}"
+            except Exception as e:
+                results[index].status = "error"
+                results[index].error = f"An unexpected error occurred: {e}"
+
+    if parsed:
+        try:
+            with metrics.time_stage("commit", "batch"):
+                db_receipts = crud.create_receipts(db=db, receipts=list(parsed.values()))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Could not save receipts: {e}")
+        for index, db_receipt in zip(parsed.keys(), db_receipts):
+            results[index].status = "ok"
+            results[index].receipt = schemas.Receipt.model_validate(db_receipt)
+
+    failed = sum(1 for result in results if result.status == "error")
+    return schemas.BatchUploadResult(
+        results=results,
+        processed=len(results) - failed,
+        failed=failed,
+        workers=pool.pool_size(),
+        wall_time_seconds=round(time.perf_counter() - started, 4),
+    )
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against our ETag."""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or (tag[2:] if tag.startswith("W/") else tag) == etag:
+            return True
+    return False
+
+@app.get("/dashboard/", response_model=schemas.Dashboard, responses={304: {"description": "Not Modified"}})
+def get_dashboard(request: Request, response: Response, limit: int = Query(1000, ge=1, le=10000), db: Session = Depends(get_db)):
+    """
+    Receipts and every aggregate the dashboard shows. The ETag is the data
+    epoch and version, so clients sending it back in If-None-Match get 304
+    until something is written or the database is replaced.
+    """
+    # Read before the payload: a write in between only makes the next request refetch
+    epoch, data_version = crud.get_data_stamp(db)
+    etag = f'"{epoch}-{data_version}-{limit}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return schemas.Dashboard.model_validate({
+        "data_version": data_version,
+        "receipts": crud.get_receipts(db, limit=limit),
+        "summary": crud.get_spend_statistics(db),
+        "vendor_spend": crud.get_vendor_spend(db),
+        "category_spend": crud.get_category_spend(db),
+        "monthly_spend": crud.get_monthly_spend(db),
+    }, from_attributes=True)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Stage and request latency histograms in the Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/workers/stats/", response_model=schemas.WorkerPoolStats)
+def get_worker_stats():
+    """Per-worker utilization of the extraction pool, and how often each limit was hit."""
+    return pool.stats()
+
+@app.get("/cache/stats/", response_model=schemas.CacheStats)
+def get_cache_stats(db: Session = Depends(get_db)):
+    return cache.stats(db)
+
+# List and stats routes select plain rows and encode them with services.serialize,
+# skipping per-row validation against the response model. `layout=columns`
+# returns {"columns": [...], "rows": [[...], ...]} instead of a list of objects.
+LAYOUT_QUERY = Query("records", enum=serialize.LAYOUTS)
+
 @app.get("/receipts/", response_model=List[schemas.Receipt])
-def read_receipts(skip: int = 0, limit: int = 100, sort_by: Optional[str] = Query(None, enum=["date", "vendor", "amount"]), sort_order: Optional[str] = Query("asc", enum=["asc", "desc"]), db: Session = Depends(get_db)):
-    return crud.get_receipts(db, skip=skip, limit=limit, sort_by=sort_by, sort_order=sort_order)
+def read_receipts(skip: int = 0, limit: int = 100, sort_by: Optional[str] = Query(None, enum=["date", "vendor", "amount"]), sort_order: Optional[str] = Query("asc", enum=["asc", "desc"]), layout: str = LAYOUT_QUERY, db: Session = Depends(get_db)):
+    rows = crud.get_receipt_rows(db, skip=skip, limit=limit, sort_by=sort_by, sort_order=sort_order)
+    return serialize.rows_response(schemas.Receipt, rows, layout, json_columns=["sub_categories"])
+
+@app.get("/receipts/page/", response_model=schemas.ReceiptPage)
+def read_receipts_page(limit: int = Query(100, ge=1, le=1000), cursor: Optional[str] = None, sort_by: Optional[str] = Query(None, enum=["date", "vendor", "amount"]), sort_order: Optional[str] = Query("asc", enum=["asc", "desc"]), db: Session = Depends(get_db)):
+    """Cursor-paginated receipts. Pass the returned next_cursor to get the following page."""
+    try:
+        items, next_cursor = crud.get_receipts_page(db, limit=limit, sort_by=sort_by, sort_order=sort_order, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return schemas.ReceiptPage(items=items, next_cursor=next_cursor)
+
+@app.get("/receipts/stream/")
+def stream_receipts(sort_by: Optional[str] = Query(None, enum=["date", "vendor", "amount"]), sort_order: Optional[str] = Query("asc", enum=["asc", "desc"])):
+    """Streams every receipt as newline-delimited JSON, in bounded memory."""
+    def generate():
+        # The generator outlives the request's dependencies, so it owns its session
+        with SessionLocal() as db:
+            for receipt in crud.iter_receipts(db, sort_by=sort_by, sort_order=sort_order):
+                yield schemas.Receipt.model_validate(receipt).model_dump_json() + "\n"
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
 
 @app.get("/receipts/search/", response_model=List[schemas.Receipt])
-def search_for_receipts(vendor: Optional[str] = None, start_date: Optional[date] = None, end_date: Optional[date] = None, db: Session = Depends(get_db)):
-    return crud.search_receipts(db, vendor=vendor, start_date=start_date, end_date=end_date)
+def search_for_receipts(vendor: Optional[str] = None, start_date: Optional[date] = None, end_date: Optional[date] = None, q: Optional[str] = None, limit: Optional[int] = Query(None, ge=1), layout: str = LAYOUT_QUERY, db: Session = Depends(get_db)):
+    """Search by part of the vendor name, date range and free text (`q`) over the receipt contents, best `q` matches first."""
+    rows = crud.search_receipt_rows(db, vendor=vendor, start_date=start_date, end_date=end_date, q=q, limit=limit)
+    return serialize.rows_response(schemas.Receipt, rows, layout, json_columns=["sub_categories"])
     
+def exported_rows(**filters):
+    # The generator outlives the request's dependencies, so it owns its session
+    with SessionLocal() as db:
+        yield from crud.iter_receipt_rows(db, **filters)
+
+@app.get("/export/csv/")
+def export_csv(vendor: Optional[str] = None, start_date: Optional[date] = None, end_date: Optional[date] = None, q: Optional[str] = None):
+    """Streams the receipts matching the search filters as CSV."""
+    rows = exported_rows(vendor=vendor, start_date=start_date, end_date=end_date, q=q)
+    return StreamingResponse(export.csv_chunks(rows), media_type="text/csv",
+                             headers={"Content-Disposition": 'attachment; filename="receipts.csv"'})
+
+@app.get("/export/ndjson/")
+def export_ndjson(vendor: Optional[str] = None, start_date: Optional[date] = None, end_date: Optional[date] = None, q: Optional[str] = None):
+    """Streams the receipts matching the search filters as newline-delimited JSON."""
+    rows = exported_rows(vendor=vendor, start_date=start_date, end_date=end_date, q=q)
+    return StreamingResponse(export.ndjson_chunks(rows), media_type="application/x-ndjson",
+                             headers={"Content-Disposition": 'attachment; filename="receipts.ndjson"'})
+
+@app.get("/export/parquet/")
+def export_parquet(vendor: Optional[str] = None, start_date: Optional[date] = None, end_date: Optional[date] = None, q: Optional[str] = None):
+    """The receipts matching the search filters as a Parquet file (requires pyarrow)."""
+    if not export.parquet_available():
+        raise HTTPException(status_code=501, detail="Parquet export requires pyarrow to be installed.")
+    path = export.write_parquet(exported_rows(vendor=vendor, start_date=start_date, end_date=end_date, q=q))
+    return FileResponse(path, media_type="application/vnd.apache.parquet", filename="receipts.parquet",
+                        background=BackgroundTask(os.remove, path))
+
 @app.get("/stats/summary/", response_model=schemas.SpendStats)
 def get_stats_summary(db: Session = Depends(get_db)):
     return crud.get_spend_statistics(db)
 
 # MODIFIED: Endpoint path, response_model, and function call are updated.
 @app.get("/stats/vendor_spend/", response_model=List[schemas.VendorSpend])
-def get_vendor_spend_stats(db: Session = Depends(get_db)):
-    return crud.get_vendor_spend(db)
+def get_vendor_spend_stats(layout: str = LAYOUT_QUERY, db: Session = Depends(get_db)):
+    return serialize.rows_response(schemas.VendorSpend, crud.get_vendor_spend(db), layout)
+
+@app.get("/stats/category_spend/", response_model=List[schemas.CategorySpend])
+def get_category_spend_stats(start_date: Optional[date] = None, end_date: Optional[date] = None, layout: str = LAYOUT_QUERY, db: Session = Depends(get_db)):
+    return serialize.rows_response(schemas.CategorySpend, crud.get_category_spend(db, start_date=start_date, end_date=end_date), layout)
 
 @app.get("/stats/monthly_spend/", response_model=List[schemas.MonthlySpend])
-def get_monthly_spend_stats(db: Session = Depends(get_db)):
-    return crud.get_monthly_spend(db)
+def get_monthly_spend_stats(layout: str = LAYOUT_QUERY, db: Session = Depends(get_db)):
+    return serialize.rows_response(schemas.MonthlySpend, crud.get_monthly_spend(db), layout)
+
+@app.get("/stats/timeseries/", response_model=List[schemas.TimeseriesPoint])
+def get_timeseries_stats(bucket: str = Query("month", enum=["day", "week", "month", "year"]), start_date: Optional[date] = None, end_date: Optional[date] = None, vendor: Optional[str] = None, layout: str = LAYOUT_QUERY, db: Session = Depends(get_db)):
+    """Spend per day, week (from Monday), month or year, labelled by the first day of each period."""
+    try:
+        rows = crud.get_spend_timeseries(db, bucket=bucket, start_date=start_date, end_date=end_date, vendor=vendor)
+        return serialize.rows_response(schemas.TimeseriesPoint, rows, layout)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/stats/top_items/", response_model=List[schemas.TopItem])
+def get_top_items_stats(start_date: Optional[date] = None, end_date: Optional[date] = None, order_by: str = Query("spend", enum=["spend", "quantity", "receipts"]), limit: int = Query(10, ge=1, le=1000), layout: str = LAYOUT_QUERY, db: Session = Depends(get_db)):
+    rows = crud.get_top_items(db, start_date=start_date, end_date=end_date, order_by=order_by, limit=limit)
+    return serialize.rows_response(schemas.TopItem, rows, layout)
+
+@app.get("/stats/item_price_history/", response_model=List[schemas.ItemPricePoint])
+def get_item_price_history_stats(description: Optional[str] = None, item_code: Optional[str] = None, start_date: Optional[date] = None, end_date: Optional[date] = None, layout: str = LAYOUT_QUERY, db: Session = Depends(get_db)):
+    """Unit price of an item on every receipt it appears on, by exact description and/or item code."""
+    try:
+        rows = crud.get_item_price_history(db, description=description, item_code=item_code, start_date=start_date, end_date=end_date)
+        return serialize.rows_response(schemas.ItemPricePoint, rows, layout)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 if __name__ == "__main__":
     import uvicorn
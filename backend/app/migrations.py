@@ -0,0 +1,146 @@
+# migrations.py
+#
+# Versioned schema migrations, tracked in SQLite's PRAGMA user_version.
+# A new database is created at the latest version directly; an existing one
+# runs every migration above its version, in order.
+#
+# To change the schema: update models.py, then append a migration here that
+# brings an existing database to the same shape. SQLite runs some DDL outside
+# the surrounding transaction, so each migration must be safe to run again.
+
+import logging
+from typing import Callable, List, Set, Tuple
+
+from sqlalchemy import delete, inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from . import crud, models
+
+logger = logging.getLogger(__name__)
+
+def get_version(conn: Connection) -> int:
+    return conn.exec_driver_sql("PRAGMA user_version").scalar()
+
+def _set_version(conn: Connection, version: int):
+    conn.exec_driver_sql(f"PRAGMA user_version = {int(version)}")
+
+def _columns(conn: Connection, table: str) -> Set[str]:
+    return {column["name"] for column in inspect(conn).get_columns(table)}
+
+def _add_column(conn: Connection, table: str, name: str, definition: str):
+    if name not in _columns(conn, table):
+        conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+
+# --- Migrations ---
+
+def _create_missing_tables(conn: Connection):
+    """Aggregates, category rows, parse cache and job tables for databases that predate them."""
+    models.Base.metadata.create_all(bind=conn)
+
+def _add_receipt_text_search(conn: Connection):
+    """Stores the extracted text and indexes it, with the vendor, in receipts_fts."""
+    _add_column(conn, "receipts", "raw_text", "TEXT")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_receipts_amount ON receipts (amount)")
+    for statement in models.RECEIPTS_FTS_DDL:
+        conn.exec_driver_sql(statement)
+    conn.execute(text("INSERT INTO receipts_fts(receipts_fts) VALUES ('rebuild')"))
+
+def _add_data_version(conn: Connection):
+    _add_column(conn, "spend_totals", "data_version", "INTEGER NOT NULL DEFAULT 0")
+
+def _backfill_aggregates(conn: Connection):
+    """Recomputes the spend aggregates and fills in missing category rows."""
+    # The session joins this connection's transaction; its commits stay inside it
+    with Session(bind=conn) as db:
+        crud.rebuild_spend_aggregates(db)
+        crud.backfill_receipt_categories(db)
+
+def _add_line_items(conn: Connection):
+    """Creates line_items and fills it from the stored text of existing receipts."""
+    models.Base.metadata.create_all(bind=conn, tables=[models.LineItem.__table__])
+    # Cached parse results predate line items; drop them so re-uploads pick items up
+    conn.execute(delete(models.ParseCacheEntry))
+    with Session(bind=conn) as db:
+        crud.backfill_line_items(db)
+
+def _add_daily_spend(conn: Connection):
+    """Creates the daily_spend rollups and fills them from the receipts."""
+    models.Base.metadata.create_all(bind=conn, tables=[models.DailySpend.__table__])
+    with Session(bind=conn) as db:
+        crud.rebuild_daily_spend(db)
+
+def _add_original_filename(conn: Connection):
+    _add_column(conn, "receipts", "original_filename", "VARCHAR")
+
+def _add_parser_fingerprint(conn: Connection):
+    """Existing cache entries get none, so they are parsed again on their next upload."""
+    _add_column(conn, "parse_cache", "parser_fingerprint", "VARCHAR")
+
+def _add_data_epoch(conn: Connection):
+    """
+    Recreates the one-row spend_totals table with its epoch column: SQLite
+    cannot add a column whose default is random. The kept row gets an epoch.
+    """
+    if "epoch" in _columns(conn, "spend_totals"):
+        return
+    rows = conn.exec_driver_sql("SELECT id, total, count, data_version FROM spend_totals").fetchall()
+    conn.exec_driver_sql("DROP TABLE spend_totals")
+    models.Base.metadata.create_all(bind=conn, tables=[models.SpendTotals.__table__])
+    for row in rows:
+        conn.exec_driver_sql("INSERT INTO spend_totals (id, total, count, data_version) VALUES (?, ?, ?, ?)", tuple(row))
+
+def _backfill_padded_line_items(conn: Connection):
+    """Receipts whose item rows were padded with no-break spaces got no line items; parse them again."""
+    with Session(bind=conn) as db:
+        crud.backfill_line_items(db)
+
+def _add_vendor_trigram_index(conn: Connection):
+    """Indexes vendor names in receipt_vendors_fts so the vendor filter matches any part of them."""
+    for statement in models.RECEIPT_VENDORS_FTS_DDL:
+        conn.exec_driver_sql(statement)
+    conn.execute(text("INSERT INTO receipt_vendors_fts(receipt_vendors_fts) VALUES ('rebuild')"))
+
+def _add_amount_buckets(conn: Connection):
+    """Creates amount_buckets and fills it from the per-amount counts."""
+    models.Base.metadata.create_all(bind=conn, tables=[models.AmountBucket.__table__])
+    with Session(bind=conn) as db:
+        crud.rebuild_amount_buckets(db)
+        db.commit()
+
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "create missing tables", _create_missing_tables),
+    (2, "receipt text and full-text index", _add_receipt_text_search),
+    (3, "data version on spend totals", _add_data_version),
+    (4, "backfill spend aggregates and category rows", _backfill_aggregates),
+    (5, "line items", _add_line_items),
+    (6, "daily spend rollups", _add_daily_spend),
+    (7, "original filename of receipts", _add_original_filename),
+    (8, "parser fingerprint on cached parse results", _add_parser_fingerprint),
+    (9, "data epoch on spend totals", _add_data_epoch),
+    (10, "line items of rows padded with no-break spaces", _backfill_padded_line_items),
+    (11, "trigram index of vendor names", _add_vendor_trigram_index),
+    (12, "amount buckets for the median", _add_amount_buckets),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+def upgrade(engine: Engine) -> Tuple[int, int]:
+    """Brings the database to LATEST_VERSION. Returns (version before, version after)."""
+    with engine.connect() as conn:
+        version = get_version(conn)
+        is_new = version == 0 and not inspect(conn).has_table(models.Receipt.__tablename__)
+
+    if is_new:
+        with engine.begin() as conn:
+            models.Base.metadata.create_all(bind=conn)
+            _set_version(conn, LATEST_VERSION)
+        return version, LATEST_VERSION
+
+    for number, description, migrate in MIGRATIONS:
+        if number <= version:
+            continue
+        logger.info("Migrating database to version %d: %s", number, description)
+        with engine.begin() as conn:
+            migrate(conn)
+            _set_version(conn, number)
+    return version, max(version, LATEST_VERSION)
@@ -1,6 +1,7 @@
 # models.py
 
-from sqlalchemy import Column, Integer, String, Float, Date, JSON
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, JSON, Text, ForeignKey, Index, DDL, event, text
+from sqlalchemy.orm import deferred
 from .database import Base
 
 class Receipt(Base):
@@ -9,8 +10,180 @@ class Receipt(Base):
     id = Column(Integer, primary_key=True, index=True)
     vendor = Column(String, index=True)
     date = Column(Date, index=True)
-    amount = Column(Float, nullable=False)
+    # Indexed so the median can be read off the index instead of sorting the table.
+    amount = Column(Float, nullable=False, index=True)
     category = Column(String, nullable=True)
     # ADDED: A JSON field to store the list of all found categories.
     sub_categories = Column(JSON, nullable=True)
-    file_path = Column(String, unique=True)
\ No newline at end of file
+    file_path = Column(String, unique=True)
+    # The name the file was uploaded under; file_path is named after its contents.
+    original_filename = Column(String, nullable=True)
+    # The extracted text, indexed together with the vendor in receipts_fts.
+    # Deferred so listing receipts does not load every receipt's full text.
+    raw_text = deferred(Column(Text, nullable=True))
+
+# --- Full-Text Search ---
+# An FTS5 index over vendor and raw_text that reads its content from the
+# receipts table. Triggers keep it in step with every insert, update and delete.
+RECEIPTS_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS receipts_fts USING fts5("
+    "vendor, raw_text, content='receipts', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS receipts_fts_ai AFTER INSERT ON receipts BEGIN "
+    "INSERT INTO receipts_fts(rowid, vendor, raw_text) VALUES (new.id, new.vendor, new.raw_text); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS receipts_fts_ad AFTER DELETE ON receipts BEGIN "
+    "INSERT INTO receipts_fts(receipts_fts, rowid, vendor, raw_text) VALUES ('delete', old.id, old.vendor, old.raw_text); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS receipts_fts_au AFTER UPDATE OF vendor, raw_text ON receipts BEGIN "
+    "INSERT INTO receipts_fts(receipts_fts, rowid, vendor, raw_text) VALUES ('delete', old.id, old.vendor, old.raw_text); "
+    "INSERT INTO receipts_fts(rowid, vendor, raw_text) VALUES (new.id, new.vendor, new.raw_text); "
+    "END",
+]
+
+# A trigram index of vendor names for the vendor filter, which matches any
+# part of a name ("mart" finds Walmart and MegaMart). Kept up to date the same way.
+RECEIPT_VENDORS_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS receipt_vendors_fts USING fts5("
+    "vendor, content='receipts', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS receipt_vendors_fts_ai AFTER INSERT ON receipts BEGIN "
+    "INSERT INTO receipt_vendors_fts(rowid, vendor) VALUES (new.id, new.vendor); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS receipt_vendors_fts_ad AFTER DELETE ON receipts BEGIN "
+    "INSERT INTO receipt_vendors_fts(receipt_vendors_fts, rowid, vendor) VALUES ('delete', old.id, old.vendor); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS receipt_vendors_fts_au AFTER UPDATE OF vendor ON receipts BEGIN "
+    "INSERT INTO receipt_vendors_fts(receipt_vendors_fts, rowid, vendor) VALUES ('delete', old.id, old.vendor); "
+    "INSERT INTO receipt_vendors_fts(rowid, vendor) VALUES (new.id, new.vendor); "
+    "END",
+]
+for statement in RECEIPTS_FTS_DDL + RECEIPT_VENDORS_FTS_DDL:
+    event.listen(Receipt.__table__, "after_create", DDL(statement))
+
+class ReceiptCategory(Base):
+    """
+    One category's share of a receipt: a sub-total, or the whole amount for
+    single-category receipts. The receipt date is copied here so date-ranged
+    rollups can be answered from this table's index alone.
+    """
+    __tablename__ = "receipt_categories"
+    __table_args__ = (
+        Index("ix_receipt_categories_date_category", "date", "category"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    receipt_id = Column(Integer, ForeignKey("receipts.id", ondelete="CASCADE"), index=True, nullable=False)
+    category = Column(String, index=True, nullable=False)
+    amount = Column(Float, nullable=False)
+    date = Column(Date, nullable=True)
+
+class LineItem(Base):
+    """
+    One item row of a receipt. The receipt's vendor and date are copied here
+    so item rankings and price history are answered from this table alone.
+    """
+    __tablename__ = "line_items"
+    __table_args__ = (
+        Index("ix_line_items_description_date", "description", "date"),
+        Index("ix_line_items_item_code_date", "item_code", "date"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    receipt_id = Column(Integer, ForeignKey("receipts.id", ondelete="CASCADE"), index=True, nullable=False)
+    # Row order on the receipt
+    position = Column(Integer, nullable=False)
+    item_code = Column(String, nullable=True)
+    description = Column(String, nullable=False)
+    quantity = Column(Float, nullable=False)
+    unit_price = Column(Float, nullable=False)
+    total = Column(Float, nullable=False)
+    vendor = Column(String, nullable=True)
+    date = Column(Date, nullable=True)
+
+class SpendTotals(Base):
+    """
+    Running total and count of all receipt amounts, kept in a single row (id = 1).
+    data_version is bumped by every write to the receipts; with epoch it makes the dashboard ETag.
+    """
+    __tablename__ = "spend_totals"
+
+    id = Column(Integer, primary_key=True)
+    total = Column(Float, nullable=False, default=0.0)
+    count = Column(Integer, nullable=False, default=0)
+    data_version = Column(Integer, nullable=False, default=0)
+    # Random token SQLite picks whenever the row is created, so a wiped or new
+    # database never repeats an ETag the old one handed out
+    epoch = Column(String, nullable=True, server_default=text("(lower(hex(randomblob(8))))"))
+
+class DailySpend(Base):
+    """
+    Total and count of receipt amounts per (day, vendor, category), kept in
+    step with every write. Time series, vendor and monthly spend are summed
+    from here instead of scanning the receipts.
+    """
+    __tablename__ = "daily_spend"
+
+    day = Column(Date, primary_key=True)
+    vendor = Column(String, primary_key=True)
+    category = Column(String, primary_key=True)
+    total = Column(Float, nullable=False, default=0.0)
+    count = Column(Integer, nullable=False, default=0)
+
+Index("ix_daily_spend_vendor_day", DailySpend.vendor, DailySpend.day)
+
+class AmountFrequency(Base):
+    """How many receipts have each amount; the most frequent one is the mode."""
+    __tablename__ = "amount_frequencies"
+
+    amount = Column(Float, primary_key=True)
+    count = Column(Integer, nullable=False)
+
+# Serves "highest count, then smallest amount" straight from the index.
+Index("ix_amount_frequencies_count_amount", AmountFrequency.count.desc(), AmountFrequency.amount)
+
+# Widths, in whole units of amount, of the amount_buckets levels. Each level
+# splits a bucket of the one before into at most 100.
+AMOUNT_BUCKET_WIDTHS = (10000, 100, 1)
+
+class AmountBucket(Base):
+    """
+    How many receipts have an amount in each bucket of each level: at level 2,
+    bucket 12 holds 12.00 to 12.99; at level 1, 0.00 to 99.99. The median
+    descends the levels instead of walking every distinct amount.
+    """
+    __tablename__ = "amount_buckets"
+
+    level = Column(Integer, primary_key=True)
+    bucket = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False)
+
+class ParseCacheEntry(Base):
+    """Extracted text and parse result of a file, keyed by the SHA-256 of its bytes."""
+    __tablename__ = "parse_cache"
+
+    content_hash = Column(String, primary_key=True)
+    text = Column(Text, nullable=False)
+    parsed = Column(JSON, nullable=False)
+    # parser.fingerprint() when the result was parsed; results of another one are stale
+    parser_fingerprint = Column(String, nullable=True)
+    size_bytes = Column(Integer, nullable=False)
+    last_used_at = Column(DateTime, index=True, nullable=False)
+
+
+class IngestJob(Base):
+    """An upload waiting for, or going through, background processing."""
+    __tablename__ = "ingest_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    status = Column(String, index=True, nullable=False, default="queued")
+    filename = Column(String, nullable=False)
+    file_path = Column(String, nullable=False)
+    file_extension = Column(String, nullable=False)
+    content_hash = Column(String, nullable=True)
+    timeout_seconds = Column(Float, nullable=False)
+    receipt_id = Column(Integer, ForeignKey("receipts.id"), nullable=True)
+    error = Column(Text, nullable=True)
+    # Milliseconds spent per stage, e.g. {"queued": 12.0, "extract": 850.3, "save": 4.1}
+    timings = Column(JSON, nullable=True)
+    created_at = Column(DateTime, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
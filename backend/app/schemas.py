@@ -1,9 +1,17 @@
 # schemas.py
 
 from pydantic import BaseModel
-from datetime import date
+from datetime import date, datetime
 from typing import Optional, Dict, List
 
+# Pydantic model for one item row of a receipt
+class LineItem(BaseModel):
+    item_code: Optional[str] = None
+    description: str
+    quantity: float
+    unit_price: float
+    total: float
+
 # Pydantic model for creating a receipt (input)
 class ReceiptBase(BaseModel):
     vendor: str
@@ -14,15 +22,26 @@ class ReceiptBase(BaseModel):
 
 class ReceiptCreate(ReceiptBase):
     file_path: str
+    original_filename: Optional[str] = None
+    # Extracted text, kept for full-text search. Not returned by the API.
+    raw_text: Optional[str] = None
+    # Stored in the line_items table, not on the receipt row.
+    line_items: List[LineItem] = []
 
 # Pydantic model for reading a receipt from the DB (output)
 class Receipt(ReceiptBase):
     id: int
     file_path: str
+    original_filename: Optional[str] = None
 
     class Config:
         from_attributes = True
 
+# Pydantic model for one page of keyset-paginated receipts
+class ReceiptPage(BaseModel):
+    items: List[Receipt]
+    next_cursor: Optional[str] = None
+
 # Pydantic model for summary statistics
 class SpendStats(BaseModel):
     total_spend: float
@@ -35,6 +54,104 @@ class VendorSpend(BaseModel):
     vendor: str
     total_spend: float
 
+class CategorySpend(BaseModel):
+    category: str
+    total_spend: float
+
 class MonthlySpend(BaseModel):
     month: str
-    total_spend: float
\ No newline at end of file
+    total_spend: float
+
+class TimeseriesPoint(BaseModel):
+    # First day of the bucket
+    period: date
+    total_spend: float
+    receipts: int
+
+class TopItem(BaseModel):
+    description: str
+    receipts: int
+    quantity: float
+    total_spend: float
+    average_unit_price: float
+
+class ItemPricePoint(BaseModel):
+    receipt_id: int
+    date: date
+    vendor: Optional[str] = None
+    item_code: Optional[str] = None
+    quantity: float
+    unit_price: float
+
+# Pydantic models for the batch upload endpoint
+class BatchFileResult(BaseModel):
+    filename: str
+    status: str
+    receipt: Optional[Receipt] = None
+    error: Optional[str] = None
+
+class BatchUploadResult(BaseModel):
+    results: List[BatchFileResult]
+    processed: int
+    failed: int
+    workers: int
+    wall_time_seconds: float
+
+# Pydantic model for the parse cache counters
+class CacheStats(BaseModel):
+    hits: int
+    misses: int
+    hit_rate: float
+    entries: int
+    size_bytes: int
+    max_bytes: int
+
+# Pydantic models for the extraction worker pool
+class WorkerStats(BaseModel):
+    slot: int
+    pid: Optional[int] = None
+    busy: bool
+    tasks: int
+    failures: int
+    timeouts: int
+    memory_kills: int
+    crashes: int
+    recycles: int
+    busy_seconds: float
+    # Share of the slot's lifetime spent running tasks
+    utilization: float
+    rss_bytes: Optional[int] = None
+
+class WorkerPoolStats(BaseModel):
+    workers: List[WorkerStats]
+    queued: int
+    # Inputs turned away before extraction, e.g. oversized images
+    rejected: int
+    timeout_seconds: Optional[float] = None
+    max_rss_bytes: Optional[int] = None
+    max_tasks: Optional[int] = None
+
+# Pydantic model for a background ingestion job
+class Job(BaseModel):
+    id: int
+    status: str
+    filename: str
+    receipt_id: Optional[int] = None
+    error: Optional[str] = None
+    timeout_seconds: float
+    timings: Optional[Dict[str, float]] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+# Pydantic model for everything the dashboard shows, in one payload
+class Dashboard(BaseModel):
+    data_version: int
+    receipts: List[Receipt]
+    summary: SpendStats
+    vendor_spend: List[VendorSpend]
+    category_spend: List[CategorySpend]
+    monthly_spend: List[MonthlySpend]
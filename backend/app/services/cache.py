@@ -0,0 +1,121 @@
+# cache.py
+
+import json
+import threading
+from datetime import date, datetime
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from .. import config, models
+from . import parser
+
+_counter_lock = threading.Lock()
+_hits = 0
+_misses = 0
+
+
+def _record(hit: bool):
+    global _hits, _misses
+    with _counter_lock:
+        if hit:
+            _hits += 1
+        else:
+            _misses += 1
+
+
+def _to_json(parsed: Dict[str, Any]) -> Dict[str, Any]:
+    """Makes a parse result JSON serializable (dates become ISO strings)."""
+    data = dict(parsed)
+    if isinstance(data.get("date"), date):
+        data["date"] = data["date"].isoformat()
+    return data
+
+
+def _from_json(data: Dict[str, Any]) -> Dict[str, Any]:
+    parsed = dict(data)
+    if isinstance(parsed.get("date"), str):
+        parsed["date"] = date.fromisoformat(parsed["date"])
+    return parsed
+
+
+def lookup(db: Session, content_hash: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """
+    Returns the cached (text, parse result) for the given content hash, or None.
+    Entries parsed with another engine version or dictionary count as misses.
+    A hit marks the entry as recently used.
+    """
+    entry = db.get(models.ParseCacheEntry, content_hash)
+    if entry is None or entry.parser_fingerprint != parser.fingerprint():
+        _record(hit=False)
+        return None
+
+    entry.last_used_at = datetime.utcnow()
+    db.commit()
+    _record(hit=True)
+    return entry.text, _from_json(entry.parsed)
+
+
+def store(db: Session, content_hash: str, text: str, parsed: Dict[str, Any], parser_fingerprint: str):
+    """
+    Adds a parse result to the cache and evicts old entries if it grew too large.
+    `parser_fingerprint` is the one the result was parsed with (ParseResult.fingerprint),
+    which differs from this process's when the dictionary changed mid-parse.
+    """
+    data = _to_json(parsed)
+    size_bytes = len(text.encode("utf-8")) + len(json.dumps(data))
+    if size_bytes > config.PARSE_CACHE_MAX_BYTES:
+        return
+
+    entry = db.get(models.ParseCacheEntry, content_hash)
+    if entry is None:
+        entry = models.ParseCacheEntry(content_hash=content_hash)
+        db.add(entry)
+    entry.text = text
+    entry.parsed = data
+    entry.parser_fingerprint = parser_fingerprint
+    entry.size_bytes = size_bytes
+    entry.last_used_at = datetime.utcnow()
+    db.flush()
+
+    _evict(db)
+    db.commit()
+
+
+def _evict(db: Session):
+    """Deletes least recently used entries until the cache fits its size budget."""
+    total = db.query(func.coalesce(func.sum(models.ParseCacheEntry.size_bytes), 0)).scalar()
+    if total <= config.PARSE_CACHE_MAX_BYTES:
+        return
+
+    oldest = db.query(models.ParseCacheEntry.content_hash, models.ParseCacheEntry.size_bytes)\
+        .order_by(models.ParseCacheEntry.last_used_at)
+    evict = []
+    for content_hash, size_bytes in oldest.yield_per(500):
+        if total <= config.PARSE_CACHE_MAX_BYTES:
+            break
+        evict.append(content_hash)
+        total -= size_bytes
+    db.query(models.ParseCacheEntry)\
+        .filter(models.ParseCacheEntry.content_hash.in_(evict))\
+        .delete(synchronize_session=False)
+
+
+def stats(db: Session) -> Dict[str, Any]:
+    """Hit/miss counters since startup plus the current size of the cache."""
+    entries, size_bytes = db.query(
+        func.count(models.ParseCacheEntry.content_hash),
+        func.coalesce(func.sum(models.ParseCacheEntry.size_bytes), 0),
+    ).one()
+    with _counter_lock:
+        hits, misses = _hits, _misses
+    lookups = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / lookups if lookups else 0.0,
+        "entries": entries,
+        "size_bytes": size_bytes,
+        "max_bytes": config.PARSE_CACHE_MAX_BYTES,
+    }
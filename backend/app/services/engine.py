@@ -0,0 +1,185 @@
+# engine.py
+
+import json
+import re
+import string
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Bump when a change to the engine changes what it finds in the same text;
+# cached parse results from another version are then ignored.
+ENGINE_VERSION = 4
+
+AMOUNT_PATTERN = r'[\d,]+\.\d{2}'
+DATE_PATTERN = r'\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|\d{4}-\d{2}-\d{2}'
+GRAND_TOTAL_PATTERN = rf'grand total\s*[:\w\s]*[\$€£₹]?\s*(?P<grand_amount>{AMOUNT_PATTERN})'
+# The amount a sub-total keyword refers to: the first one after it on its line.
+KEYWORD_AMOUNT_PATTERN = re.compile(rf'.*?({AMOUNT_PATTERN})')
+# A whole line of an item table: "ID | Description | Qty | Unit Price | Total",
+# or "SKU | Item | Price", where the quantity is 1 and the price is the total.
+# Fields may be padded with any whitespace but a newline (spaces, tabs, the
+# no-break spaces of copied receipts, a CR before the newline). Matched from
+# the newline before it, so line starts need no extra check. The row itself is
+# read in a lookahead and only the newline is consumed, so the dates and
+# amounts in its fields are still matched on their own.
+ROW_PADDING = r'[^\S\n]*'
+ITEM_ROW_PATTERN = (
+    rf'\n(?={ROW_PADDING}(?P<item_code>\w[\w./-]*){ROW_PADDING}\|{ROW_PADDING}(?P<item_description>[^|\n]*?){ROW_PADDING}\|'
+    rf'(?:{ROW_PADDING}(?P<item_quantity>\d+(?:\.\d+)?){ROW_PADDING}\|{ROW_PADDING}(?P<item_unit_price>{AMOUNT_PATTERN}){ROW_PADDING}\|)?'
+    rf'{ROW_PADDING}(?P<item_total>{AMOUNT_PATTERN}){ROW_PADDING}(?:\n|\Z))'
+)
+
+# (item code, description, quantity, unit price, line total)
+LineItem = Tuple[str, str, float, float, float]
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """
+    Builds a regex alternation shaped like a trie of the given words, so the
+    matcher follows one branch per character instead of trying every word.
+    Words are lowercased, so match the result against lowercased text.
+    """
+    trie: Dict = {}
+    for word in words:
+        node = trie
+        for char in word.lower():
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node: Dict) -> str:
+        end = '' in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        if len(branches) == 1 and not end:
+            return branches[0]
+        body = '(?:' + '|'.join(branches) + ')'
+        return body + '?' if end else body
+
+    return build(trie)
+
+
+def load_dictionary(path: str) -> Dict:
+    """Loads a vendor/category dictionary from a JSON file."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class ScanResult:
+    """Everything the engine found in a receipt's text."""
+
+    def __init__(self):
+        self.vendor: Optional[str] = None
+        self.subtotals: Dict[str, float] = {}
+        self.date: Optional[str] = None
+        self.grand_total: Optional[float] = None
+        self.max_amount: Optional[float] = None
+        self.items: List[LineItem] = []
+
+
+def _first_char_guard(words: Iterable[str]) -> str:
+    """
+    A lookahead that accepts only positions whose character can start one of
+    the words. It rejects every other position in one test.
+    """
+    return '(?=[' + ''.join(re.escape(char) for char in sorted({word[0] for word in words if word})) + '])'
+
+
+class ReceiptEngine:
+    """
+    Finds the vendor, category sub-totals, date, grand total and item rows of
+    a receipt in two regex passes: one for the dictionary terms and one for
+    everything else. Both are compiled once from the dictionary, so adding
+    vendors or categories does not add passes over the text.
+    """
+
+    def __init__(self, vendors: List[str], categories: Dict[str, List[str]]):
+        # Lowercased name -> (priority, canonical name). Earlier entries win.
+        self._vendors = {}
+        for rank, vendor in enumerate(vendors):
+            self._vendors.setdefault(vendor.lower(), (rank, vendor))
+        # Lowercased keyword -> (category, priority within the category)
+        self._keywords = {}
+        for category, keywords in categories.items():
+            for rank, keyword in enumerate(keywords):
+                self._keywords.setdefault(keyword.lower(), (category, rank))
+        self._categories = list(categories)
+
+        alternatives = [ITEM_ROW_PATTERN, GRAND_TOTAL_PATTERN, rf'(?P<date>{DATE_PATTERN})', rf'(?P<amount>{AMOUNT_PATTERN})']
+        guard = _first_char_guard(['\n', 'g', ','] + list(string.digits))
+        # Matching is case-insensitive because the text is lowercased before
+        # the scan. That keeps every branch a plain literal, which the regex
+        # engine can reject in one comparison, unlike re.IGNORECASE branches.
+        self.pattern = re.compile(f"{guard}(?:{'|'.join(alternatives)})")
+
+        # Vendors and keywords are found wherever they occur, even inside each
+        # other or inside the spans the pass above consumes: the match is a
+        # lookahead, so it consumes nothing and every position is tried.
+        terms = list(self._vendors) + list(self._keywords)
+        self.terms_pattern = re.compile(f"{_first_char_guard(terms)}(?=({_trie_pattern(terms)}))") if terms else None
+
+    @classmethod
+    def from_dictionary(cls, dictionary: Dict) -> "ReceiptEngine":
+        return cls(dictionary.get("vendors", []), dictionary.get("categories", {}))
+
+    @classmethod
+    def from_file(cls, path: str) -> "ReceiptEngine":
+        return cls.from_dictionary(load_dictionary(path))
+
+    def scan(self, text: str) -> ScanResult:
+        result = ScanResult()
+        vendor_rank = None
+        keyword_hits: Dict[str, Dict[int, float]] = {}
+        max_amount = None
+        lowered = text.lower()
+        # Item descriptions are reported in their original case when lowercasing kept the offsets
+        original = text if len(lowered) == len(text) else lowered
+
+        if self.terms_pattern:
+            for match in self.terms_pattern.finditer(lowered):
+                start, term = match.start(), match.group(1)
+                # The trie matches the longest term here; shorter ones here are its prefixes
+                for end in range(1, len(term) + 1):
+                    prefix = term[:end]
+                    if prefix in self._vendors:
+                        rank, vendor = self._vendors[prefix]
+                        if vendor_rank is None or rank < vendor_rank:
+                            vendor_rank, result.vendor = rank, vendor
+                    if prefix in self._keywords:
+                        amount_match = KEYWORD_AMOUNT_PATTERN.match(lowered, start + end)
+                        if amount_match:
+                            category, rank = self._keywords[prefix]
+                            amount = float(amount_match.group(1).replace(',', ''))
+                            keyword_hits.setdefault(category, {}).setdefault(rank, amount)
+
+        for match in self.pattern.finditer(lowered):
+            kind = match.lastgroup
+            if kind == 'item_total':
+                total = float(match.group('item_total').replace(',', ''))
+                unit_price = match.group('item_unit_price')
+                unit_price = float(unit_price.replace(',', '')) if unit_price else total
+                quantity = float(match.group('item_quantity') or 1)
+                code = original[match.start('item_code'):match.end('item_code')]
+                description = original[match.start('item_description'):match.end('item_description')]
+                result.items.append((code, description, quantity, unit_price, total))
+                # Its amounts are matched on their own
+                continue
+            elif kind == 'grand_amount':
+                amount = float(match.group('grand_amount').replace(',', ''))
+                if result.grand_total is None:
+                    result.grand_total = amount
+            elif kind == 'date':
+                if result.date is None:
+                    result.date = match.group('date')
+                continue
+            else:
+                amount = float(match.group('amount').replace(',', ''))
+            # Every amount on the receipt feeds the "largest number" fallback
+            if max_amount is None or amount > max_amount:
+                max_amount = amount
+
+        result.max_amount = max_amount
+        for category in self._categories:
+            hits = keyword_hits.get(category)
+            if hits:
+                result.subtotals[category] = hits[min(hits)]
+        return result
@@ -0,0 +1,98 @@
+# export.py
+#
+# Serializers for the /export/ endpoints. They consume rows from
+# crud.iter_receipt_rows (tuples in crud.EXPORT_COLUMNS order) and never hold
+# more than one batch of output in memory. Parquet needs pyarrow, which is
+# optional and imported on first use.
+
+import csv
+import io
+import json
+import os
+import tempfile
+from typing import Iterable, Iterator
+
+from .. import crud
+
+# Rows written per yielded chunk (CSV/NDJSON) and per Parquet row group.
+EXPORT_BATCH_ROWS = 1000
+
+def _record(row) -> dict:
+    record = dict(zip(crud.EXPORT_COLUMNS, row))
+    record["date"] = record["date"].isoformat() if record["date"] else None
+    return record
+
+def csv_chunks(rows: Iterable[tuple]) -> Iterator[str]:
+    """CSV with a header row; sub_categories is written as a JSON object."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(crud.EXPORT_COLUMNS)
+    for count, row in enumerate(rows, start=1):
+        record = _record(row)
+        record["sub_categories"] = json.dumps(record["sub_categories"] or {})
+        writer.writerow(record.values())
+        if count % EXPORT_BATCH_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def ndjson_chunks(rows: Iterable[tuple]) -> Iterator[str]:
+    """One JSON object per line."""
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(_record(row)))
+        if len(lines) == EXPORT_BATCH_ROWS:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def write_parquet(rows: Iterable[tuple]) -> str:
+    """
+    Writes the rows to a temporary Parquet file, one row group per batch, and
+    returns its path; the caller deletes it. sub_categories becomes a
+    map<string, double> column.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("id", pa.int64()),
+        ("vendor", pa.string()),
+        ("date", pa.date32()),
+        ("amount", pa.float64()),
+        ("category", pa.string()),
+        ("sub_categories", pa.map_(pa.string(), pa.float64())),
+        ("file_path", pa.string()),
+        ("original_filename", pa.string()),
+    ])
+
+    def write_batch(writer, batch):
+        columns = [list(column) for column in zip(*batch)]
+        columns[5] = [list((value or {}).items()) for value in columns[5]]
+        writer.write_table(pa.Table.from_arrays([pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema))
+
+    fd, path = tempfile.mkstemp(suffix=".parquet")
+    os.close(fd)
+    try:
+        with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+            batch = []
+            for row in rows:
+                batch.append(tuple(row))
+                if len(batch) == EXPORT_BATCH_ROWS:
+                    write_batch(writer, batch)
+                    batch = []
+            if batch:
+                write_batch(writer, batch)
+    except Exception:
+        os.remove(path)
+        raise
+    return path
@@ -0,0 +1,157 @@
+# jobs.py
+
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from .. import config, crud, models, schemas
+from ..database import SessionLocal
+from . import cache, metrics, parser, pool
+
+# How long an idle worker sleeps before checking the job table again.
+POLL_INTERVAL_SECONDS = 1.0
+
+
+def extract_with_timeout(file_path: str, file_extension: str, timeout: float) -> parser.ParseResult:
+    """
+    Runs parser.extract_and_parse on the shared worker pool. The worker is
+    killed and replaced if it does not finish within `timeout` seconds
+    (TimeoutError) or outgrows the memory limit (MemoryError).
+    """
+    return pool.extract(file_path, file_extension, timeout=timeout)
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 2)
+
+
+class JobQueue:
+    """
+    A SQLite-backed queue of ingestion jobs drained by a pool of background
+    threads. Each job's OCR runs on the shared worker pool, which kills it on timeout.
+    """
+
+    def __init__(self, session_factory=SessionLocal):
+        self._session_factory = session_factory
+        self._condition = threading.Condition()
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self, workers: int):
+        """Requeues jobs interrupted by a previous shutdown and starts the worker threads."""
+        with self._session_factory() as db:
+            db.query(models.IngestJob)\
+                .filter(models.IngestJob.status == "running")\
+                .update({"status": "queued", "started_at": None}, synchronize_session=False)
+            db.commit()
+
+        self._stopping.clear()
+        for index in range(max(1, workers)):
+            thread = threading.Thread(target=self._work, name=f"ingest-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """Signals the workers to exit and waits for their current jobs to end."""
+        self._stopping.set()
+        with self._condition:
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def enqueue(self, db: Session, filename: str, file_path: str, file_extension: str,
+                content_hash: Optional[str] = None, timeout_seconds: Optional[float] = None) -> models.IngestJob:
+        """Records a queued job and wakes one worker for it."""
+        job = models.IngestJob(
+            status="queued",
+            filename=filename,
+            file_path=file_path,
+            file_extension=file_extension,
+            content_hash=content_hash,
+            timeout_seconds=timeout_seconds or config.JOB_TIMEOUT_SECONDS,
+            created_at=datetime.utcnow(),
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        with self._condition:
+            self._condition.notify()
+        return job
+
+    def _claim(self, db: Session) -> Optional[int]:
+        """Moves the oldest queued job to running and returns its id."""
+        while True:
+            candidate = db.query(models.IngestJob.id)\
+                .filter(models.IngestJob.status == "queued")\
+                .order_by(models.IngestJob.id).first()
+            if candidate is None:
+                return None
+            # Only one worker can win the conditional update for a given job
+            claimed = db.query(models.IngestJob)\
+                .filter(models.IngestJob.id == candidate.id, models.IngestJob.status == "queued")\
+                .update({"status": "running", "started_at": datetime.utcnow()}, synchronize_session=False)
+            db.commit()
+            if claimed:
+                return candidate.id
+
+    def _work(self):
+        while not self._stopping.is_set():
+            try:
+                with self._session_factory() as db:
+                    job_id = self._claim(db)
+                    if job_id is not None:
+                        self._run(db, job_id)
+                        continue
+            except Exception as e:
+                print(f"Ingestion worker error: {e}")
+            with self._condition:
+                self._condition.wait(POLL_INTERVAL_SECONDS)
+
+    def _run(self, db: Session, job_id: int):
+        job = db.get(models.IngestJob, job_id)
+        timings: Dict[str, float] = {
+            "queued": round((job.started_at - job.created_at).total_seconds() * 1000, 2)
+        }
+        try:
+            started = time.perf_counter()
+            cached = cache.lookup(db, job.content_hash) if job.content_hash else None
+            if cached is not None:
+                text, extracted_data = cached
+            else:
+                result = extract_with_timeout(job.file_path, job.file_extension, job.timeout_seconds)
+                metrics.observe_stages(result.stages, job.file_extension)
+                text, extracted_data = result.text, result.parsed
+                if job.content_hash:
+                    cache.store(db, job.content_hash, text, extracted_data, result.fingerprint)
+            timings["extract"] = _elapsed_ms(started)
+
+            started = time.perf_counter()
+            receipt_data = schemas.ReceiptCreate(**extracted_data, file_path=str(job.file_path),
+                                                 original_filename=job.filename, raw_text=text)
+            with metrics.time_stage("commit", job.file_extension):
+                db_receipt = crud.create_receipt(db=db, receipt=receipt_data)
+            timings["save"] = _elapsed_ms(started)
+
+            job.status = "done"
+            job.receipt_id = db_receipt.id
+        except Exception as e:
+            db.rollback()
+            job.status = "failed"
+            if isinstance(e, ValueError):
+                job.error = f"Parsing error: {e}"
+            elif isinstance(e, TimeoutError):
+                job.error = f"Timed out: {e}"
+            elif isinstance(e, MemoryError):
+                job.error = f"Memory limit exceeded: {e}"
+            else:
+                job.error = f"An unexpected error occurred: {e}"
+        job.timings = timings
+        job.finished_at = datetime.utcnow()
+        db.commit()
+
+
+job_queue = JobQueue()
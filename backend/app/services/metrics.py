@@ -0,0 +1,128 @@
+# metrics.py
+#
+# In-process Prometheus metrics. Histograms live in memory for the lifetime of
+# the process and are rendered in the text exposition format by GET /metrics.
+# Stage timings observed during a request are also collected for its
+# Server-Timing header.
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(pairs: Sequence[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+class Histogram:
+    """A labelled histogram with fixed buckets, safe to observe from any thread."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str], buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts, sum, count]; bucket counts are made cumulative when rendered
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = sorted((key, list(counts), total, count) for key, (counts, total, count) in self._series.items())
+        for key, counts, total, count in snapshot:
+            pairs = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(pairs + [('le', repr(float(bound)))])} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(pairs + [('le', '+Inf')])} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(pairs)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(pairs)} {count}")
+        return lines
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+# --- Metrics ---
+
+STAGE_SECONDS = Histogram(
+    "receipt_stage_duration_seconds",
+    "Time spent in each receipt processing stage (copy, queue, extract, parse, commit).",
+    ("stage", "file_type"),
+)
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template.",
+    ("method", "route", "status"),
+)
+REGISTRY = [STAGE_SECONDS, REQUEST_SECONDS]
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+# --- Per-request stage timings (Server-Timing) ---
+
+_request_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_timings", default=None)
+
+def start_request() -> List[Tuple[str, float]]:
+    """
+    Starts collecting stage timings for the current request. The list is shared
+    with the request's endpoint, including sync endpoints run in the threadpool.
+    """
+    timings: List[Tuple[str, float]] = []
+    _request_timings.set(timings)
+    return timings
+
+def file_type_label(file_extension: str) -> str:
+    return file_extension.lstrip(".").lower() or "unknown"
+
+def observe_stage(stage: str, file_extension: str, seconds: float):
+    STAGE_SECONDS.observe(seconds, stage=stage, file_type=file_type_label(file_extension))
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((stage, seconds))
+
+def observe_stages(stages: Iterable[Tuple[str, float]], file_extension: str):
+    """Records (stage, seconds) timings measured in another process, such as a pool worker."""
+    for stage, seconds in stages:
+        observe_stage(stage, file_extension, seconds)
+
+@contextmanager
+def time_stage(stage: str, file_extension: str):
+    """Times the enclosed block as `stage` for the given file type, even when it raises."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, file_extension, time.perf_counter() - started)
+
+def server_timing_header(timings: List[Tuple[str, float]], total_seconds: float) -> str:
+    entries = [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in timings]
+    entries.append(f"total;dur={total_seconds * 1000:.2f}")
+    return ", ".join(entries)
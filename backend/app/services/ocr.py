@@ -0,0 +1,191 @@
+# ocr.py
+#
+# Image preprocessing and tesseract calls for the parser. PIL and pytesseract
+# are imported on first use, like in parser.py.
+#
+# Preprocessing steps (config.OCR_PREPROCESS), applied in this order:
+#   grayscale  drop colour
+#   downscale  scale images above config.OCR_TARGET_DPI down to it; images of
+#              unknown resolution down to a pixel size instead
+#   deskew     straighten text rotated by up to MAX_SKEW_DEGREES
+#   binarize   black and white with an Otsu threshold
+#
+# ocr_images sends many images to a single tesseract process (via a file that
+# lists their paths) and splits its output on the form feed it writes after
+# each page, saving a process start-up and language model load per image.
+
+import os
+import tempfile
+from typing import List, Optional, Sequence, Tuple
+
+from .. import config
+
+PREPROCESS_STEPS = ("grayscale", "downscale", "deskew", "binarize")
+# Recorded resolutions below this are not trusted: phone cameras tag their
+# photos 72 (or 96) DPI whatever they show, while scanners record the real one.
+MIN_RECORDED_DPI = 150
+# Images of unknown resolution are treated as a frame this many inches across
+# its longer side, about what a whole receipt photographed up close fills, and
+# scaled down to OCR_TARGET_DPI over it.
+UNKNOWN_FRAME_INCHES = 7
+MAX_SKEW_DEGREES = 5.0
+SKEW_STEP_DEGREES = 0.5
+# Width the skew search works at; plenty to see text lines and cheap to rotate.
+SKEW_SEARCH_WIDTH = 400
+
+def source_dpi(image) -> Optional[int]:
+    """The resolution recorded in the image, or None when it records none worth trusting."""
+    dpi = image.info.get("dpi")
+    try:
+        dpi = float(dpi[0]) if dpi else 0.0
+    except (TypeError, ValueError, IndexError):
+        return None
+    if dpi < MIN_RECORDED_DPI:
+        return None
+    return int(round(dpi))
+
+def _downscale(image, dpi: Optional[int], target_dpi: int):
+    """Scales to target_dpi; an image of unknown resolution to target_dpi over UNKNOWN_FRAME_INCHES."""
+    if dpi is None:
+        scale = target_dpi * UNKNOWN_FRAME_INCHES / max(image.width, image.height)
+    else:
+        scale = target_dpi / dpi
+    if scale >= 1:
+        return image, dpi
+    from PIL import Image
+
+    size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+    return image.resize(size, Image.LANCZOS), None if dpi is None else target_dpi
+
+def _line_contrast(image) -> float:
+    """Variance of the row means: highest when text lines are horizontal."""
+    from PIL import Image
+
+    rows = list(image.resize((1, image.height), Image.BOX).getdata())
+    mean = sum(rows) / len(rows)
+    return sum((row - mean) ** 2 for row in rows) / len(rows)
+
+def estimate_skew(image) -> float:
+    """The rotation, in degrees, that makes the text lines horizontal (projection profile search)."""
+    from PIL import Image, ImageOps
+
+    small = image.convert("L")
+    if small.width > SKEW_SEARCH_WIDTH:
+        small = small.resize((SKEW_SEARCH_WIDTH, max(1, round(small.height * SKEW_SEARCH_WIDTH / small.width))), Image.BILINEAR)
+    # Ink as bright pixels, so rotating in a black background adds nothing
+    small = ImageOps.invert(small)
+    steps = int(MAX_SKEW_DEGREES / SKEW_STEP_DEGREES)
+    best_angle, best_score = 0.0, _line_contrast(small)
+    for step in range(-steps, steps + 1):
+        angle = step * SKEW_STEP_DEGREES
+        if angle == 0:
+            continue
+        score = _line_contrast(small.rotate(angle, resample=Image.BILINEAR, expand=True, fillcolor=0))
+        if score > best_score:
+            best_angle, best_score = angle, score
+    return best_angle
+
+def _deskew(image):
+    from PIL import Image
+
+    angle = estimate_skew(image)
+    if angle == 0:
+        return image
+    return image.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=255 if image.mode == "L" else "white")
+
+def otsu_threshold(image) -> int:
+    """The grey level that best separates ink from paper."""
+    histogram = image.histogram()[:256]
+    total = sum(histogram)
+    weighted_total = sum(level * count for level, count in enumerate(histogram))
+    background, background_sum = 0, 0.0
+    best_level, best_variance = 127, -1.0
+    for level, count in enumerate(histogram):
+        background += count
+        if background == 0:
+            continue
+        foreground = total - background
+        if foreground == 0:
+            break
+        background_sum += level * count
+        mean_background = background_sum / background
+        mean_foreground = (weighted_total - background_sum) / foreground
+        variance = background * foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_level, best_variance = level, variance
+    return best_level
+
+def _binarize(image):
+    threshold = otsu_threshold(image)
+    return image.point(lambda level: 255 if level > threshold else 0)
+
+def preprocess_image(image, dpi: Optional[int] = None, steps: Optional[Sequence[str]] = None,
+                     target_dpi: Optional[int] = None) -> Tuple[object, Optional[int]]:
+    """
+    Prepares an image for OCR. `dpi` is its resolution when known (e.g. a
+    rendered PDF page). Returns the new image and its resolution, None when
+    unknown; tesseract then estimates it from the text.
+    """
+    steps = config.OCR_PREPROCESS if steps is None else steps
+    target_dpi = target_dpi or config.OCR_TARGET_DPI
+    dpi = dpi or source_dpi(image)
+
+    if image.mode not in ("L", "RGB"):
+        image = image.convert("RGB")
+    if "grayscale" in steps or "deskew" in steps or "binarize" in steps:
+        image = image.convert("L")
+    if "downscale" in steps:
+        image, dpi = _downscale(image, dpi, target_dpi)
+    if "deskew" in steps:
+        image = _deskew(image)
+    if "binarize" in steps:
+        image = _binarize(image)
+    return image, dpi
+
+def _tesseract_config(dpi: Optional[int] = None) -> str:
+    options = []
+    if dpi:
+        options.append(f"--dpi {int(dpi)}")
+    if config.OCR_PSM:
+        options.append(f"--psm {config.OCR_PSM}")
+    return " ".join(options)
+
+def ocr_image(image, dpi: Optional[int] = None) -> str:
+    """OCRs one (preprocessed) image."""
+    import pytesseract
+
+    return pytesseract.image_to_string(image, config=_tesseract_config(dpi))
+
+def ocr_images(images: List[Tuple[object, Optional[int]]]) -> List[str]:
+    """
+    OCRs (image, dpi) pairs with one tesseract run and returns one text per
+    image. Falls back to one run per image if the output can't be split
+    back into exactly one page per image.
+    """
+    if len(images) <= 1:
+        return [ocr_image(image, dpi) for image, dpi in images]
+
+    import pytesseract
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for index, (image, dpi) in enumerate(images):
+            path = os.path.join(tmp, f"{index:05d}.png")
+            # Each image carries its own resolution, as --dpi would apply to all of them
+            if dpi:
+                image.save(path, dpi=(dpi, dpi))
+            else:
+                image.save(path)
+            paths.append(path)
+        list_path = os.path.join(tmp, "images.txt")
+        with open(list_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(paths) + "\n")
+        output = pytesseract.image_to_string(list_path, config=_tesseract_config())
+
+    # Tesseract ends every page with a form feed
+    pages = output.split("\f")
+    if pages and not pages[-1].strip():
+        pages = pages[:-1]
+    if len(pages) != len(images):
+        return [ocr_image(image, dpi) for image, dpi in images]
+    return pages
@@ -1,49 +1,189 @@
 # parser.py
 
-import pytesseract
-from PIL import Image
-import fitz  # PyMuPDF
+# pytesseract, PIL and fitz are imported where they are used, so the API and
+# workers that only see text files never pay for loading them.
+import gzip
+import hashlib
+import os
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, Any, List, Set
+from typing import Dict, Any, List, NamedTuple, Set, Tuple, Optional, Union
+
+from .. import config
+from . import ocr
+from .engine import ENGINE_VERSION, ReceiptEngine
+
+# A "GRAND TOTAL" line that carries an amount; used to stop reading long PDFs early.
+GRAND_TOTAL_LINE_REGEX = re.compile(r'GRAND TOTAL[^\n]*?[\d,]+\.\d{2}', re.IGNORECASE)
+
+# File types extract_text knows how to read.
+SUPPORTED_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.pdf', '.txt'}
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg'}
+
+# (fingerprint, engine compiled from that dictionary)
+_engine: Optional[Tuple[str, ReceiptEngine]] = None
+# (dictionary path, mtime, size) -> fingerprint
+_fingerprint: Optional[Tuple[Tuple[str, int, int], str]] = None
+
+def _load_for_ocr(file_path: str):
+    """Opens an image file and preprocesses it. Returns (image, dpi)."""
+    from PIL import Image
+
+    image = Image.open(file_path)
+    image.load()
+    return ocr.preprocess_image(image)
+
+def check_image_dimensions(file_path: str, file_extension: str):
+    """
+    Raises ValueError for an image whose header declares more than
+    RECEIPT_MAX_IMAGE_PIXELS pixels, or that cannot be read. Only the header is decoded.
+    """
+    if file_extension not in IMAGE_EXTENSIONS:
+        return
+    from PIL import Image
+
+    try:
+        with Image.open(file_path) as image:
+            width, height = image.size
+    except Exception as e:
+        # Includes PIL's own DecompressionBombError for absurd sizes
+        raise ValueError(f"Could not read the image: {e}")
+    if width * height > config.MAX_IMAGE_PIXELS:
+        raise ValueError(f"Image is {width}x{height} pixels, over the {config.MAX_IMAGE_PIXELS} pixel limit.")
 
 def extract_text_from_image(file_path: str) -> str:
     """Extracts text from an image file."""
     try:
-        return pytesseract.image_to_string(Image.open(file_path))
+        return ocr.ocr_image(*_load_for_ocr(file_path))
     except Exception as e:
         print(f"Error processing image {file_path}: {e}")
         return ""
 
-def extract_text_from_pdf(file_path: str) -> str:
-    """Extracts text from a PDF file, attempting both text and OCR."""
-    text = ""
+def extract_text_from_images(file_paths: List[str]) -> List[str]:
+    """Extracts text from several image files with one tesseract run. Unreadable files get ""."""
+    texts = [""] * len(file_paths)
+    prepared, indexes = [], []
+    for index, file_path in enumerate(file_paths):
+        try:
+            prepared.append(_load_for_ocr(file_path))
+            indexes.append(index)
+        except Exception as e:
+            print(f"Error processing image {file_path}: {e}")
     try:
+        for index, text in zip(indexes, ocr.ocr_images(prepared)):
+            texts[index] = text
+    except Exception as e:
+        print(f"Error processing images {file_paths}: {e}")
+    return texts
+
+def _ocr_pixmap(pix, dpi: int) -> str:
+    from PIL import Image
+
+    img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+    return ocr.ocr_image(*ocr.preprocess_image(img, dpi=dpi))
+
+def extract_text_from_pdf(file_path: str, dpi: Optional[int] = None, stop_at_total: Optional[bool] = None) -> str:
+    """
+    Extracts text from a PDF file, deciding per page between the text layer and OCR.
+    Pages without a usable text layer are rendered at `dpi` and OCR'd in parallel.
+    With `stop_at_total`, pages after the one holding the grand total are skipped.
+    """
+    dpi = dpi or config.PDF_OCR_DPI
+    stop_at_total = config.PDF_STOP_AT_GRAND_TOTAL if stop_at_total is None else stop_at_total
+    workers = max(1, config.PDF_OCR_WORKERS)
+
+    page_texts: List[str] = []
+    try:
+        import fitz  # PyMuPDF
+
         doc = fitz.open(file_path)
-        for page in doc:
-            text += page.get_text()
-        
-        if len(text.strip()) < 100:
-            for i, page in enumerate(doc):
-                pix = page.get_pixmap()
-                img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-                text += pytesseract.image_to_string(img)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Work through the pages a window at a time, so an early stop
+            # never leaves more than one window of OCR behind it.
+            for window_start in range(0, doc.page_count, workers):
+                window = []
+                for page_number in range(window_start, min(window_start + workers, doc.page_count)):
+                    page = doc[page_number]
+                    layer_text = page.get_text()
+                    if len(layer_text.strip()) >= config.PDF_TEXT_LAYER_MIN_CHARS:
+                        window.append((layer_text, None))
+                    else:
+                        # Rendering stays on this thread (PyMuPDF is not thread-safe);
+                        # only the tesseract call runs in the pool.
+                        pix = page.get_pixmap(dpi=dpi)
+                        window.append((layer_text, executor.submit(_ocr_pixmap, pix, dpi)))
+
+                for layer_text, future in window:
+                    page_texts.append(layer_text + future.result() if future else layer_text)
+
+                if stop_at_total and GRAND_TOTAL_LINE_REGEX.search("".join(page_texts)):
+                    break
     except Exception as e:
         print(f"Error processing PDF {file_path}: {e}")
-    return text
+    return "".join(page_texts)
 
 def extract_text_from_txt(file_path: str) -> str:
-    """Extracts text from a plain text file."""
+    """Extracts text from a plain text file, gzip-compressed when its name ends in .gz."""
     try:
-        with open(file_path, 'r') as f:
+        with (gzip.open(file_path, 'rt') if file_path.endswith('.gz') else open(file_path, 'r')) as f:
             return f.read()
     except Exception as e:
         print(f"Error processing text file {file_path}: {e}")
         return ""
 
-def parse_receipt_text(text: str) -> Dict[str, Any]:
+class ParseResult(NamedTuple):
+    """The extracted text of a file, its parse, and the fingerprint() of the engine that parsed it."""
+    text: str
+    parsed: Dict[str, Any]
+    fingerprint: str
+    # (stage, seconds) as measured where the file was processed, usually a pool
+    # worker; the API process records them with metrics.observe_stages.
+    stages: Tuple[Tuple[str, float], ...] = ()
+
+def _current_engine() -> Tuple[str, ReceiptEngine]:
+    """
+    Returns (fingerprint, engine) for the configured dictionary. The engine is
+    compiled again whenever the fingerprint changes, so long-lived pool
+    workers pick up dictionary edits.
+    """
+    global _engine
+    current = fingerprint()
+    if _engine is None or _engine[0] != current:
+        _engine = (current, ReceiptEngine.from_file(config.RECEIPT_DICTIONARY_PATH))
+    return _engine
+
+def get_engine() -> ReceiptEngine:
+    """Returns the parsing engine for the configured dictionary."""
+    return _current_engine()[1]
+
+def fingerprint() -> str:
+    """
+    Identifies what parsing currently produces: the engine version and the
+    contents of the configured dictionary. Re-read only when the file changes.
+    """
+    global _fingerprint
+    path = config.RECEIPT_DICTIONARY_PATH
+    try:
+        stat = os.stat(path)
+        key = (path, stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        key = (path, 0, 0)
+    if _fingerprint is None or _fingerprint[0] != key:
+        digest = hashlib.sha256(f"engine-{ENGINE_VERSION}\n".encode())
+        try:
+            with open(path, "rb") as f:
+                digest.update(f.read())
+        except OSError:
+            pass
+        _fingerprint = (key, digest.hexdigest())
+    return _fingerprint[1]
+
+def parse_receipt_text(text: str, engine: Optional[ReceiptEngine] = None) -> Dict[str, Any]:
     """
     Parses raw text to extract structured data, now including category sub-totals.
+    Vendor, sub-totals, date, grand total and line items are all found in one pass by the engine.
     """
     extracted_data = {
         "vendor": "Unknown",
@@ -51,35 +191,18 @@ def parse_receipt_text(text: str) -> Dict[str, Any]:
         "amount": 0.0,
         "category": "Uncategorized",
         # This will now store a dictionary of {category: amount}
-        "sub_categories": {}
+        "sub_categories": {},
+        "line_items": []
     }
 
+    scan = (engine or get_engine()).scan(text)
+
     # --- VENDOR DETECTION ---
-    vendor_keywords = ["Target", "Walmart", "Costco", "Amazon", "BigBazaar", "Reliance Digital", "MegaMart"]
-    for vendor in vendor_keywords:
-        if re.search(vendor, text, re.IGNORECASE):
-            extracted_data["vendor"] = vendor
-            break
-
-    # --- CATEGORY AND SUB-TOTAL DETECTION ---
-    # This new logic finds category subtotals directly.
-    category_keywords_map = {
-        "Groceries": ["GROCERY SUBTOTAL"],
-        "Electronics": ["ELECTRONICS SUBTOTAL"],
-        "Apparel": ["APPAREL SUBTOTAL"],
-    }
-    
-    found_categories: Dict[str, float] = {}
-    for category, keywords in category_keywords_map.items():
-        for keyword in keywords:
-            # Regex to find the keyword and the number on the same line
-            match = re.search(rf"{keyword}.*?([\d,]+\.\d{{2}})", text, re.IGNORECASE)
-            if match:
-                amount_str = match.group(1).replace(',', '')
-                found_categories[category] = float(amount_str)
-                break 
+    if scan.vendor:
+        extracted_data["vendor"] = scan.vendor
 
     # --- CATEGORY ASSIGNMENT ---
+    found_categories = scan.subtotals
     if len(found_categories) > 1:
         extracted_data["category"] = "Mixed"
         extracted_data["sub_categories"] = found_categories
@@ -90,34 +213,33 @@ def parse_receipt_text(text: str) -> Dict[str, Any]:
         extracted_data["sub_categories"] = found_categories
             
     # --- DATE EXTRACTION ---
-    date_pattern = r'(\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|\d{4}-\d{2}-\d{2})'
-    date_match = re.search(date_pattern, text)
-    if date_match:
+    if scan.date:
         try:
-            extracted_data["date"] = datetime.strptime(re.sub(r'/', '-', date_match.group(0)), '%d-%m-%Y').date()
+            extracted_data["date"] = datetime.strptime(re.sub(r'/', '-', scan.date), '%d-%m-%Y').date()
         except ValueError:
             try:
-                extracted_data["date"] = datetime.strptime(re.sub(r'/', '-', date_match.group(0)), '%Y-%m-%d').date()
+                extracted_data["date"] = datetime.strptime(re.sub(r'/', '-', scan.date), '%Y-%m-%d').date()
             except ValueError:
                 extracted_data["date"] = datetime.now().date()
     else:
         extracted_data["date"] = datetime.now().date()
 
+    # --- LINE ITEMS ---
+    extracted_data["line_items"] = [
+        {"item_code": code, "description": description, "quantity": quantity, "unit_price": unit_price, "total": total}
+        for code, description, quantity, unit_price, total in scan.items
+    ]
+
     # --- FINAL AMOUNT EXTRACTION ---
-    amount_pattern = r'(?:GRAND TOTAL)\s*[:\w\s]*[\$€£₹]?\s*([\d,]+\.\d{2})'
-    amount_match = re.search(amount_pattern, text, re.IGNORECASE)
-    if amount_match:
-         extracted_data["amount"] = float(amount_match.group(1).replace(',', ''))
-    else: # Fallback to the largest number if "GRAND TOTAL" isn't found
-        all_floats = re.findall(r'[\d,]+\.\d{2}', text)
-        if all_floats:
-            cleaned_floats = [float(f.replace(',', '')) for f in all_floats]
-            extracted_data["amount"] = max(cleaned_floats) if cleaned_floats else 0.0
+    if scan.grand_total is not None:
+         extracted_data["amount"] = scan.grand_total
+    elif scan.max_amount is not None: # Fallback to the largest number if "GRAND TOTAL" isn't found
+        extracted_data["amount"] = scan.max_amount
 
     return extracted_data
 
-def process_file(file_path: str, file_extension: str) -> Dict[str, Any]:
-    """Main function to process an uploaded file."""
+def extract_text(file_path: str, file_extension: str) -> str:
+    """Runs the text extractor that matches the file type."""
     text = ""
     if file_extension in ['.png', '.jpg', '.jpeg']:
         text = extract_text_from_image(file_path)
@@ -125,8 +247,75 @@ def process_file(file_path: str, file_extension: str) -> Dict[str, Any]:
         text = extract_text_from_pdf(file_path)
     elif file_extension == '.txt':
         text = extract_text_from_txt(file_path)
+    return text
+
+def _parse(text: str, extract_seconds: float) -> ParseResult:
+    parser_fingerprint, engine = _current_engine()
+    started = time.perf_counter()
+    parsed = parse_receipt_text(text, engine)
+    return ParseResult(text, parsed, parser_fingerprint,
+                       (("extract", extract_seconds), ("parse", time.perf_counter() - started)))
+
+def extract_and_parse(file_path: str, file_extension: str) -> ParseResult:
+    """Extracts the text of a file and parses it, returning both with the time each took."""
+    started = time.perf_counter()
+    text = extract_text(file_path, file_extension)
     
     if not text:
         raise ValueError("Could not extract text from the file.")
 
-    return parse_receipt_text(text)
\ No newline at end of file
+    return _parse(text, time.perf_counter() - started)
+
+def extraction_tasks(file_extensions: List[str], batch_size: Optional[int] = None) -> List[List[int]]:
+    """
+    Groups files, given by extension, into extraction tasks for
+    extract_and_parse_many: images in runs of up to `batch_size`
+    (config.OCR_BATCH_SIZE), every other file on its own. Returns lists of indexes.
+    """
+    batch_size = max(1, batch_size or config.OCR_BATCH_SIZE)
+    tasks: List[List[int]] = []
+    images: List[int] = []
+    for index, file_extension in enumerate(file_extensions):
+        if file_extension not in IMAGE_EXTENSIONS:
+            tasks.append([index])
+            continue
+        images.append(index)
+        if len(images) == batch_size:
+            tasks.append(images)
+            images = []
+    if images:
+        tasks.append(images)
+    return tasks
+
+def extract_and_parse_many(files: List[Tuple[str, str]]) -> List[Union[ParseResult, Exception]]:
+    """
+    extract_and_parse for several (file_path, file_extension) pairs, with all
+    images OCR'd in one tesseract run. Returns, per file, its ParseResult
+    or the exception it raised. Each image of a shared run is given an even
+    share of its time as its extract stage.
+    """
+    image_indexes = [index for index, (_, file_extension) in enumerate(files) if file_extension in IMAGE_EXTENSIONS]
+    image_texts: Dict[int, str] = {}
+    image_seconds = 0.0
+    if len(image_indexes) > 1:
+        started = time.perf_counter()
+        texts = extract_text_from_images([files[index][0] for index in image_indexes])
+        image_seconds = (time.perf_counter() - started) / len(image_indexes)
+        image_texts = dict(zip(image_indexes, texts))
+
+    results: List[Union[ParseResult, Exception]] = []
+    for index, (file_path, file_extension) in enumerate(files):
+        try:
+            if index not in image_texts:
+                results.append(extract_and_parse(file_path, file_extension))
+                continue
+            if not image_texts[index]:
+                raise ValueError("Could not extract text from the file.")
+            results.append(_parse(image_texts[index], image_seconds))
+        except Exception as e:
+            results.append(e)
+    return results
+
+def process_file(file_path: str, file_extension: str) -> Dict[str, Any]:
+    """Main function to process an uploaded file."""
+    return extract_and_parse(file_path, file_extension).parsed
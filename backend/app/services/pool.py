@@ -0,0 +1,366 @@
+# pool.py
+#
+# Long-lived worker processes that run extraction (OCR, PDF rendering, parsing)
+# outside the API process. Each worker slot has a supervisor thread in the API
+# process that hands it one task at a time and enforces two limits while it
+# runs: a wall-clock timeout and a resident memory (RSS) cap. A worker that
+# breaks either, or crashes, is killed and replaced; workers are also replaced
+# after RECEIPT_WORKER_MAX_TASKS tasks so slow leaks cannot build up.
+#
+# The OCR itself runs in tesseract processes the worker starts. Each worker
+# leads its own process group, so killing it kills them too, and the RSS cap
+# counts the worker together with its descendants.
+
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .. import config
+from . import parser
+
+# How often a running task's worker is checked against the limits.
+POLL_INTERVAL_SECONDS = 0.05
+# How long a worker asked to exit gets before it is killed.
+STOP_GRACE_SECONDS = 2.0
+
+# Spawned, not forked: the API process runs threads (request handlers, job
+# workers) and a fork would copy whatever locks they hold at that moment.
+_context = multiprocessing.get_context("spawn")
+
+
+def _worker_main(conn):
+    """Runs (function, args) tasks from the pipe until told to stop."""
+    # A group of its own, which the tesseract processes it starts join, so the
+    # pool can kill them all together
+    if hasattr(os, "setpgrp"):
+        os.setpgrp()
+    # Shutdown is the parent's job, whoever sends the signal
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        func, args = task
+        try:
+            reply = ("ok", func(*args))
+        except Exception as e:
+            reply = ("error", e)
+        try:
+            conn.send(reply)
+        except Exception as e:
+            # The result or exception could not be pickled
+            conn.send(("error", RuntimeError(f"Could not return the result: {e!r}")))
+
+
+def _process_rss(pid: int) -> Optional[int]:
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+def _children(pid: int) -> List[int]:
+    children = []
+    try:
+        for thread in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{thread}/children") as f:
+                children.extend(int(child) for child in f.read().split())
+    except (OSError, ValueError):
+        pass
+    return children
+
+def rss_bytes(pid: int) -> Optional[int]:
+    """
+    Resident memory of a process and all its descendants, from /proc; None
+    where that is not available.
+    """
+    total = _process_rss(pid)
+    if total is None:
+        return None
+    pending = _children(pid)
+    while pending:
+        child = pending.pop()
+        total += _process_rss(child) or 0
+        pending.extend(_children(child))
+    return total
+
+def _kill_group(pid: int):
+    """SIGKILLs the process group a worker leads; its children stay in it after it exits."""
+    if not hasattr(os, "killpg"):
+        return
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        # Already gone, or killed before it could call setpgrp
+        pass
+
+
+class _Slot:
+    """One worker process and its counters. The counters survive the process being replaced."""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.process = None
+        self.conn = None
+        self.process_tasks = 0
+        self.created_at = time.monotonic()
+        self.busy_since: Optional[float] = None
+        self.busy_seconds = 0.0
+        self.tasks = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.memory_kills = 0
+        self.crashes = 0
+        self.recycles = 0
+
+
+class WorkerPool:
+    """
+    A fixed number of worker processes fed from one queue. submit() returns a
+    concurrent.futures.Future, like ProcessPoolExecutor, whose exception is
+    TimeoutError or MemoryError when the task broke a limit and its worker was killed.
+    """
+
+    def __init__(self, workers: int, timeout_seconds: Optional[float] = None,
+                 max_rss_bytes: Optional[int] = None, max_tasks: Optional[int] = None):
+        self.timeout_seconds = timeout_seconds
+        self.max_rss_bytes = max_rss_bytes
+        self.max_tasks = max_tasks
+        self._tasks: "queue.Queue[Optional[Tuple[Future, Callable, tuple, Optional[float]]]]" = queue.Queue()
+        self._slots = [_Slot(index) for index in range(max(1, workers))]
+        self._threads: List[threading.Thread] = []
+        for slot in self._slots:
+            self._spawn(slot)
+            thread = threading.Thread(target=self._supervise, args=(slot,), name=f"extract-worker-{slot.index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    @property
+    def size(self) -> int:
+        return len(self._slots)
+
+    def submit(self, func: Callable, *args: Any, timeout: Optional[float] = None) -> Future:
+        """Queues func(*args) for a worker; `timeout` overrides the pool's per-task limit."""
+        future: Future = Future()
+        self._tasks.put((future, func, args, timeout if timeout is not None else self.timeout_seconds))
+        return future
+
+    def shutdown(self):
+        """Cancels queued tasks, waits for running ones and stops the workers."""
+        while True:
+            try:
+                task = self._tasks.get_nowait()
+            except queue.Empty:
+                break
+            if task is not None:
+                task[0].cancel()
+        for _ in self._threads:
+            self._tasks.put(None)
+        for thread in self._threads:
+            thread.join()
+        for slot in self._slots:
+            self._stop(slot)
+
+    # --- Supervision ---
+
+    def _spawn(self, slot: _Slot):
+        receiver, sender = _context.Pipe()
+        process = _context.Process(target=_worker_main, args=(sender,), name=f"extract-worker-{slot.index}", daemon=True)
+        process.start()
+        sender.close()
+        slot.process, slot.conn, slot.process_tasks = process, receiver, 0
+
+    def _stop(self, slot: _Slot):
+        if slot.process is None:
+            return
+        try:
+            slot.conn.send(None)
+        except OSError:
+            pass
+        slot.process.join(STOP_GRACE_SECONDS)
+        self._kill(slot)
+
+    def _kill(self, slot: _Slot):
+        _kill_group(slot.process.pid)
+        if slot.process.is_alive():
+            slot.process.kill()
+        slot.process.join()
+        slot.conn.close()
+        slot.process = slot.conn = None
+
+    def _recycle(self, slot: _Slot, graceful: bool = False):
+        if graceful:
+            self._stop(slot)
+        else:
+            self._kill(slot)
+        slot.recycles += 1
+        self._spawn(slot)
+
+    def _supervise(self, slot: _Slot):
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                break
+            future, func, args, timeout = task
+            if not future.set_running_or_notify_cancel():
+                continue
+            slot.busy_since = time.monotonic()
+            try:
+                future.set_result(self._run(slot, func, args, timeout))
+            except BaseException as e:
+                slot.failures += 1
+                future.set_exception(e)
+            finally:
+                slot.busy_seconds += time.monotonic() - slot.busy_since
+                slot.busy_since = None
+                slot.tasks += 1
+
+    def _run(self, slot: _Slot, func: Callable, args: tuple, timeout: Optional[float]):
+        if slot.process is None:
+            self._spawn(slot)
+        elif not slot.process.is_alive():
+            slot.crashes += 1
+            self._recycle(slot)
+        try:
+            slot.conn.send((func, args))
+        except OSError:
+            slot.crashes += 1
+            self._recycle(slot)
+            raise RuntimeError("Extraction process could not be reached.")
+        started = time.monotonic()
+        while True:
+            waited = time.monotonic() - started
+            if timeout is not None and waited >= timeout:
+                slot.timeouts += 1
+                self._recycle(slot)
+                raise TimeoutError(f"Extraction did not finish within {timeout:g} seconds.")
+            if slot.conn.poll(POLL_INTERVAL_SECONDS if timeout is None else min(POLL_INTERVAL_SECONDS, timeout - waited)):
+                break
+            rss = rss_bytes(slot.process.pid)
+            if self.max_rss_bytes and rss and rss > self.max_rss_bytes:
+                slot.memory_kills += 1
+                self._recycle(slot)
+                raise MemoryError(f"Extraction used {rss // 2 ** 20} MB, over the {self.max_rss_bytes // 2 ** 20} MB limit.")
+            if not slot.process.is_alive() and not slot.conn.poll():
+                break
+
+        try:
+            status, payload = slot.conn.recv()
+        except (EOFError, OSError):
+            slot.process.join(STOP_GRACE_SECONDS)
+            exitcode = slot.process.exitcode
+            slot.crashes += 1
+            self._recycle(slot)
+            raise RuntimeError(f"Extraction process exited unexpectedly (exit code {exitcode}).")
+
+        slot.process_tasks += 1
+        rss = rss_bytes(slot.process.pid)
+        if (self.max_tasks and slot.process_tasks >= self.max_tasks) or \
+                (self.max_rss_bytes and rss and rss > self.max_rss_bytes):
+            self._recycle(slot, graceful=True)
+        if status == "error":
+            raise payload
+        return payload
+
+    # --- Reporting ---
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        workers = []
+        for slot in self._slots:
+            busy_since = slot.busy_since
+            busy = slot.busy_seconds + (now - busy_since if busy_since is not None else 0.0)
+            process = slot.process
+            workers.append({
+                "slot": slot.index,
+                "pid": process.pid if process is not None else None,
+                "busy": busy_since is not None,
+                "tasks": slot.tasks,
+                "failures": slot.failures,
+                "timeouts": slot.timeouts,
+                "memory_kills": slot.memory_kills,
+                "crashes": slot.crashes,
+                "recycles": slot.recycles,
+                "busy_seconds": round(busy, 3),
+                "utilization": round(busy / max(now - slot.created_at, 1e-9), 4),
+                "rss_bytes": rss_bytes(process.pid) if process is not None else None,
+            })
+        return {
+            "workers": workers,
+            "queued": self._tasks.qsize(),
+            "rejected": _rejected,
+            "timeout_seconds": self.timeout_seconds,
+            "max_rss_bytes": self.max_rss_bytes,
+            "max_tasks": self.max_tasks,
+        }
+
+
+_pool: Optional[WorkerPool] = None
+_pool_lock = threading.Lock()
+_rejected = 0
+
+
+def get_process_pool() -> WorkerPool:
+    """Returns the shared worker pool, starting it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = WorkerPool(
+                workers=pool_size(),
+                timeout_seconds=config.WORKER_TIMEOUT_SECONDS or None,
+                max_rss_bytes=config.WORKER_MAX_RSS_MB * 2 ** 20 or None,
+                max_tasks=config.WORKER_MAX_TASKS or None,
+            )
+        return _pool
+
+
+def pool_size() -> int:
+    """Number of worker processes the shared pool runs with."""
+    return max(1, config.BATCH_WORKERS)
+
+
+def shutdown_process_pool():
+    """Stops the shared worker pool, if it was started."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+
+def admit(file_path: str, file_extension: str):
+    """
+    Rejects, with ValueError, inputs that must not reach a worker: images whose
+    header declares more than RECEIPT_MAX_IMAGE_PIXELS pixels.
+    """
+    global _rejected
+    try:
+        parser.check_image_dimensions(file_path, file_extension)
+    except ValueError:
+        with _pool_lock:
+            _rejected += 1
+        raise
+
+
+def task_timeout(files: int = 1) -> Optional[float]:
+    """Wall-clock limit for a task extracting `files` files: RECEIPT_WORKER_TIMEOUT_SECONDS each."""
+    return config.WORKER_TIMEOUT_SECONDS * files if config.WORKER_TIMEOUT_SECONDS else None
+
+
+def extract(file_path: str, file_extension: str, timeout: Optional[float] = None):
+    """parser.extract_and_parse on the shared pool. Returns its parser.ParseResult."""
+    admit(file_path, file_extension)
+    return get_process_pool().submit(parser.extract_and_parse, file_path, file_extension, timeout=timeout).result()
+
+
+def stats() -> Dict[str, Any]:
+    """Per-worker utilization and limit counters of the shared pool."""
+    return get_process_pool().stats()
@@ -0,0 +1,75 @@
+# serialize.py
+#
+# Fast JSON path for the list and stats endpoints. They select plain rows
+# instead of ORM objects, and the rows are encoded here directly, without
+# validating each one through its Pydantic model. The output matches what the
+# response model would produce. orjson is used when it is installed
+# (optional) and the standard json module otherwise.
+
+import json
+from datetime import date, datetime
+from operator import itemgetter
+from typing import Any, Collection, List, Sequence, Type
+
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Response layouts: a list of objects, or {"columns": [...], "rows": [[...], ...]}
+LAYOUTS = ["records", "columns"]
+
+def _default(value: Any):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(payload: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, default=_default, separators=(",", ":")).encode("utf-8")
+
+def _embed_json(document: str):
+    """Stored JSON text as a value of the payload; orjson copies it through without parsing."""
+    if orjson is not None and hasattr(orjson, "Fragment"):
+        return orjson.Fragment(document)
+    return json.loads(document)
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+def fields(model: Type[BaseModel]) -> List[str]:
+    return list(model.model_fields)
+
+def rows_payload(model: Type[BaseModel], rows: Sequence, layout: str = "records",
+                 json_columns: Collection[str] = ()):
+    """
+    `model`'s fields from each SQLAlchemy row, matched by column label, as a
+    list of objects or column-oriented. Columns in `json_columns` hold JSON
+    text and are embedded as documents.
+    """
+    columns = fields(model)
+    if not rows:
+        values = []
+    elif list(rows[0]._fields) == columns:
+        values = [list(row) for row in rows]
+    else:
+        getter = itemgetter(*[rows[0]._fields.index(name) for name in columns])
+        values = [list(getter(row)) if len(columns) > 1 else [getter(row)] for row in rows]
+    for position in [columns.index(name) for name in json_columns]:
+        for row in values:
+            if row[position] is not None:
+                row[position] = _embed_json(row[position])
+    if layout == "columns":
+        return {"columns": columns, "rows": values}
+    return [dict(zip(columns, row)) for row in values]
+
+def rows_response(model: Type[BaseModel], rows: Sequence, layout: str = "records",
+                  json_columns: Collection[str] = ()) -> FastJSONResponse:
+    return FastJSONResponse(rows_payload(model, rows, layout, json_columns))
@@ -0,0 +1,97 @@
+# storage.py
+#
+# Content-addressed store for uploaded files. A file is named after the SHA-256
+# of its bytes and placed two shard levels deep (ab/cd/abcd...ef.pdf), so
+# identical uploads share one file on disk, different files with the same
+# client name never collide, and no directory grows past a few hundred entries.
+# Text files can be stored gzip-compressed (name ending in .gz).
+
+import gzip
+import hashlib
+import os
+import uuid
+from typing import Awaitable, Callable, NamedTuple, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+# In-progress writes go here, on the same filesystem, so finishing one is a rename.
+TMP_DIR_NAME = ".tmp"
+COMPRESSED_SUFFIX = ".gz"
+COMPRESSIBLE_EXTENSIONS = {".txt"}
+GZIP_LEVEL = 6
+
+
+class UploadTooLarge(Exception):
+    """The upload went past the size cap; nothing was stored."""
+
+
+class StoredFile(NamedTuple):
+    path: str
+    extension: str
+    content_hash: str
+    size_bytes: int
+    # True when identical bytes were already stored and the upload was discarded
+    deduplicated: bool
+
+
+def object_path(root: str, content_hash: str, extension: str, compressed: bool = False) -> str:
+    name = content_hash + extension + (COMPRESSED_SUFFIX if compressed else "")
+    return os.path.join(root, content_hash[:2], content_hash[2:4], name)
+
+def find_stored(root: str, content_hash: str, extension: str) -> Optional[str]:
+    """The stored copy of these bytes, compressed or not, if there is one."""
+    for compressed in (False, True):
+        path = object_path(root, content_hash, extension, compressed)
+        if os.path.exists(path):
+            return path
+    return None
+
+def _open_temp(root: str, compress: bool):
+    tmp_dir = os.path.join(root, TMP_DIR_NAME)
+    os.makedirs(tmp_dir, exist_ok=True)
+    tmp_path = os.path.join(tmp_dir, uuid.uuid4().hex)
+    if compress:
+        return tmp_path, gzip.open(tmp_path, "wb", compresslevel=GZIP_LEVEL)
+    return tmp_path, open(tmp_path, "wb")
+
+def _finish(tmp_path: str, root: str, content_hash: str, extension: str, compress: bool, size: int) -> StoredFile:
+    existing = find_stored(root, content_hash, extension)
+    if existing is not None:
+        os.remove(tmp_path)
+        return StoredFile(existing, extension, content_hash, size, True)
+    path = object_path(root, content_hash, extension, compress)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Atomic; two concurrent uploads of the same bytes just replace each other
+    os.replace(tmp_path, path)
+    return StoredFile(path, extension, content_hash, size, False)
+
+def _discard(buffer, tmp_path: str):
+    buffer.close()
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+async def store(read: Callable[[int], Awaitable[bytes]], root: str, extension: str, max_bytes: int,
+                compress_text: bool = False, chunk_size: int = 1024 * 1024) -> StoredFile:
+    """
+    Streams an upload into the store chunk by chunk, hashing it on the way.
+    `read` is an async reader such as UploadFile.read. Disk writes run in the
+    threadpool so the event loop is never blocked. Raises UploadTooLarge once
+    more than `max_bytes` have been read; that caps what is stored, not what
+    the caller has already buffered.
+    """
+    compress = compress_text and extension in COMPRESSIBLE_EXTENSIONS
+    tmp_path, buffer = await run_in_threadpool(_open_temp, root, compress)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        while chunk := await read(chunk_size):
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLarge(f"Upload is larger than the {max_bytes} byte limit.")
+            digest.update(chunk)
+            await run_in_threadpool(buffer.write, chunk)
+        await run_in_threadpool(buffer.close)
+        return await run_in_threadpool(_finish, tmp_path, root, digest.hexdigest(), extension, compress, size)
+    except BaseException:
+        await run_in_threadpool(_discard, buffer, tmp_path)
+        raise
@@ -0,0 +1,71 @@
+# bench_bulk_upsert.py
+#
+# Write throughput of crud.bulk_upsert_receipts against the one-row-at-a-time
+# crud.create_receipt loop, for inserts and for re-upserts of existing rows.
+# Uses a throwaway database per run, so it never touches receipts.db.
+#
+# Run from the backend directory:
+#     python -m benchmarks.bench_bulk_upsert --rows 10000,100000
+
+import argparse
+import os
+import tempfile
+import time
+
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, models
+from app.database import make_engine
+from . import synth
+
+
+def make_receipts(rows: int, seed: int):
+    return [synth.to_receipt_create(receipt, f"bench/{i}.txt") for i, receipt in enumerate(synth.generate_receipts(rows, seed=seed))]
+
+
+def timed_run(write, receipts):
+    """Writes `receipts` twice into a fresh database: once as inserts, once as updates."""
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        models.Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        timings = []
+        with Session() as db:
+            crud.ensure_spend_aggregates(db)
+            for _ in range(2):
+                started = time.perf_counter()
+                write(db, receipts)
+                timings.append(time.perf_counter() - started)
+        engine.dispose()
+    return timings
+
+
+def loop_write(db, receipts):
+    for receipt in receipts:
+        crud.create_receipt(db, receipt)
+
+
+def bulk_write(db, receipts):
+    crud.bulk_upsert_receipts(db, receipts)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Bulk upsert throughput")
+    arg_parser.add_argument("--rows", default="10000,100000")
+    arg_parser.add_argument("--loop-max", type=int, default=100000,
+                            help="Skip the per-row loop above this many rows")
+    args = arg_parser.parse_args()
+
+    print(f"{'rows':>8} {'path':<6} {'insert rows/s':>14} {'update rows/s':>14}")
+    for rows in [int(r) for r in args.rows.split(",")]:
+        receipts = make_receipts(rows, seed=rows)
+        for name, write in (("loop", loop_write), ("bulk", bulk_write)):
+            if name == "loop" and rows > args.loop_max:
+                print(f"{rows:>8} {name:<6} {'skipped':>14} {'skipped':>14}")
+                continue
+            insert_s, update_s = timed_run(write, receipts)
+            print(f"{rows:>8} {name:<6} {rows / insert_s:>14,.0f} {rows / update_s:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
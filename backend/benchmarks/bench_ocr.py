@@ -0,0 +1,168 @@
+# bench_ocr.py
+#
+# OCR benchmark on synthetic image receipts (see synth.py), high resolution and
+# slightly rotated. Compares preprocessing settings and per-image against
+# batched tesseract runs, reporting time per image and how many receipts still
+# parse to their ground truth. Each kind of image is measured separately:
+#   scan      PNG recording its real resolution
+#   camera    the receipt in a 4032x3024 phone-camera frame, a JPEG tagged 72 DPI
+#   untagged  the same frame with no resolution recorded
+#
+# Needs the tesseract binary; without it only the preprocessing cost is measured.
+# Batching is off by default (RECEIPT_OCR_BATCH_SIZE=1) until a run with
+# tesseract shows it is faster and parses as many receipts as per-image OCR.
+#
+# Run from the backend directory:
+#     python -m benchmarks.bench_ocr --count 20
+
+import argparse
+import io
+import os
+import random
+import tempfile
+import time
+from typing import Dict, List, Sequence
+
+from app.services import ocr, parser
+from . import synth
+
+# name -> (preprocessing steps, batched)
+SETTINGS = {
+    "raw": ([], False),
+    "grayscale+downscale": (["grayscale", "downscale"], False),
+    "all steps": (list(ocr.PREPROCESS_STEPS), False),
+    "all steps, batched": (list(ocr.PREPROCESS_STEPS), True),
+}
+FIELDS = ("vendor", "date", "amount", "sub_categories")
+KINDS = ("scan", "camera", "untagged")
+# Portrait frame of a 12 MP phone camera; the receipt fills most of its height
+CAMERA_FRAME = (3024, 4032)
+CAMERA_FILL = 0.85
+CAMERA_DPI = 72
+
+
+def _in_camera_frame(image):
+    from PIL import Image
+
+    scale = CAMERA_FILL * min(CAMERA_FRAME[0] / image.width, CAMERA_FRAME[1] / image.height)
+    image = image.resize((round(image.width * scale), round(image.height * scale)), Image.LANCZOS)
+    # Grey table top around the paper
+    frame = Image.new("L", CAMERA_FRAME, 170)
+    frame.paste(image, ((CAMERA_FRAME[0] - image.width) // 2, (CAMERA_FRAME[1] - image.height) // 2))
+    return frame.convert("RGB")
+
+
+def make_photos(out_dir: str, count: int, dpi: int, max_skew: float, kind: str = "scan", seed: int = 0):
+    """
+    Renders `count` receipts at `dpi`, each rotated by up to `max_skew`
+    degrees, and saves them as images of the given kind (see KINDS).
+    """
+    from PIL import Image
+
+    rng = random.Random(seed)
+    written = []
+    for index, receipt in enumerate(synth.generate_receipts(count, seed=seed)):
+        image = Image.open(io.BytesIO(synth.render_png_bytes(receipt, dpi=dpi)))
+        image = image.rotate(rng.uniform(-max_skew, max_skew), resample=Image.BICUBIC, expand=True, fillcolor=255)
+        if kind == "scan":
+            path = os.path.join(out_dir, f"{kind}-{index:04d}.png")
+            image.save(path, dpi=(dpi, dpi))
+        else:
+            path = os.path.join(out_dir, f"{kind}-{index:04d}.jpg")
+            options = {"dpi": (CAMERA_DPI, CAMERA_DPI)} if kind == "camera" else {}
+            _in_camera_frame(image).save(path, quality=90, **options)
+        written.append((path, receipt))
+    return written
+
+
+def correct_fields(parsed: Dict, receipt: synth.SyntheticReceipt) -> Dict[str, bool]:
+    return {
+        "vendor": parsed["vendor"] == receipt.vendor,
+        "date": str(parsed["date"]) == str(receipt.date),
+        "amount": abs(parsed["amount"] - receipt.amount) < 0.005,
+        "sub_categories": parsed["sub_categories"] == receipt.sub_categories,
+    }
+
+
+def load(path: str, steps: Sequence[str]):
+    from PIL import Image
+
+    image = Image.open(path)
+    image.load()
+    return ocr.preprocess_image(image, steps=steps)
+
+
+def tesseract_available() -> bool:
+    try:
+        import pytesseract
+
+        pytesseract.get_tesseract_version()
+        return True
+    except Exception:
+        return False
+
+
+def run_setting(photos, steps: List[str], batched: bool, batch_size: int, with_ocr: bool) -> Dict[str, float]:
+    started = time.perf_counter()
+    prepared = [load(path, steps) for path, _ in photos]
+    preprocess_seconds = time.perf_counter() - started
+    result = {"preprocess_ms": preprocess_seconds * 1000 / len(photos)}
+    if not with_ocr:
+        return result
+
+    started = time.perf_counter()
+    if batched:
+        texts = []
+        for start in range(0, len(prepared), batch_size):
+            texts.extend(ocr.ocr_images(prepared[start:start + batch_size]))
+    else:
+        texts = [ocr.ocr_image(image, dpi) for image, dpi in prepared]
+    result["ocr_ms"] = (time.perf_counter() - started) * 1000 / len(photos)
+
+    totals = dict.fromkeys(FIELDS, 0)
+    fully_correct = 0
+    for text, (_, receipt) in zip(texts, photos):
+        fields = correct_fields(parser.parse_receipt_text(text), receipt)
+        for name, ok in fields.items():
+            totals[name] += ok
+        fully_correct += all(fields.values())
+    result.update({f"{name}_accuracy": totals[name] / len(photos) for name in FIELDS})
+    result["receipt_accuracy"] = fully_correct / len(photos)
+    return result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="OCR preprocessing and batching benchmark")
+    arg_parser.add_argument("--count", type=int, default=20)
+    arg_parser.add_argument("--dpi", type=int, default=600, help="Resolution the receipts are rendered at")
+    arg_parser.add_argument("--max-skew", type=float, default=3.0, help="Largest rotation applied, in degrees")
+    arg_parser.add_argument("--batch-size", type=int, default=16)
+    arg_parser.add_argument("--kinds", default=",".join(KINDS), help="comma-separated image kinds to measure")
+    args = arg_parser.parse_args()
+
+    with_ocr = tesseract_available()
+    if not with_ocr:
+        print("tesseract not found: measuring preprocessing only")
+
+    print(f"{args.count} receipts rendered at {args.dpi} DPI, skewed up to {args.max_skew} degrees")
+    header = f"{'kind':<9} {'setting':<22} {'prep ms':>9}"
+    if with_ocr:
+        header += f" {'ocr ms':>9} {'total ms':>9} {'vendor':>7} {'date':>7} {'amount':>7} {'subtot':>7} {'receipt':>8}"
+    print(header)
+    for kind in [k.strip() for k in args.kinds.split(",") if k.strip()]:
+        with tempfile.TemporaryDirectory() as tmp:
+            photos = make_photos(tmp, args.count, args.dpi, args.max_skew, kind)
+            for name, (steps, batched) in SETTINGS.items():
+                if batched and not with_ocr:
+                    continue
+                result = run_setting(photos, steps, batched, args.batch_size, with_ocr)
+                line = f"{kind:<9} {name:<22} {result['preprocess_ms']:>9.1f}"
+                if with_ocr:
+                    line += (f" {result['ocr_ms']:>9.1f} {result['preprocess_ms'] + result['ocr_ms']:>9.1f}"
+                             + "".join(f" {result[f'{field}_accuracy']:>7.0%}" for field in FIELDS)
+                             + f" {result['receipt_accuracy']:>8.0%}")
+                print(line)
+
+
+if __name__ == "__main__":
+    main()
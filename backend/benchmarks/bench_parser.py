@@ -0,0 +1,117 @@
+# bench_parser.py
+#
+# Micro-benchmark for parse_receipt_text: compares the compiled
+# engine with the previous one-search-per-keyword loop as the dictionary grows.
+#
+# Run from the backend directory:
+#     python -m benchmarks.bench_parser
+
+import argparse
+import glob
+import os
+import random
+import re
+import string
+import time
+from typing import Dict, List
+
+from app import config
+from app.services import parser
+from app.services.engine import ReceiptEngine, load_dictionary
+
+SAMPLES_GLOB = os.path.join(os.path.dirname(__file__), "..", "uploads", "*.txt")
+# Texts where dictionary terms, item rows, dates and amounts overlap or sit inside each other
+OVERLAP_TEXTS = [
+    "GROCERY SUBTOTAL (Walmart) 12.00\nGRAND TOTAL 12.00",
+    "ELECTRONICS SUBTOTAL 2024-01-02 Target 40.00\nAPPAREL SUBTOTAL\nAPPAREL SUBTOTAL 5.00",
+    "MegaMart\n1 | Walmart gift card | 25.00\n2 | GROCERY SUBTOTAL | 10.00\nGRAND TOTAL: Costco 35.00",
+    "Walmart GROCERY SUBTOTAL 12.00 SUBTOTAL 3.00 Reliance Digital",
+    "Shop\nITEM | 2024-01-02 | 3.00\n1 | Paid 05/01/2024 | 2 | 1.50 | 3.00\nGRAND TOTAL 6.00",
+]
+# Terms that are prefixes or substrings of other terms
+NESTED_DICTIONARY = {
+    "vendors": ["Mart", "MegaMart", "Wal", "Walmart", "Reliance Digital", "Reliance"],
+    "categories": {"Other": ["SUBTOTAL"], "Groceries": ["GROCERY SUBTOTAL", "GROCERY"]},
+}
+
+
+def legacy_scan(text: str, vendors: List[str], categories: Dict[str, List[str]]):
+    """The pre-engine parser: one re.search per vendor and per keyword, then date/amount scans."""
+    vendor = None
+    for name in vendors:
+        if re.search(re.escape(name), text, re.IGNORECASE):
+            vendor = name
+            break
+    found = {}
+    for category, keywords in categories.items():
+        for keyword in keywords:
+            match = re.search(rf"{re.escape(keyword)}.*?([\d,]+\.\d{{2}})", text, re.IGNORECASE)
+            if match:
+                found[category] = float(match.group(1).replace(',', ''))
+                break
+    date = re.search(r'(\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|\d{4}-\d{2}-\d{2})', text)
+    if not re.search(r'(?:GRAND TOTAL)\s*[:\w\s]*[\$€£₹]?\s*([\d,]+\.\d{2})', text, re.IGNORECASE):
+        re.findall(r'[\d,]+\.\d{2}', text)
+    return vendor, found, date.group(0) if date else None
+
+
+def grow_dictionary(base: Dict, size: int, seed: int = 7) -> Dict:
+    """Pads the dictionary with `size` synthetic vendors and `size // 10` synthetic categories."""
+    rng = random.Random(seed)
+
+    def word():
+        return "".join(rng.choice(string.ascii_uppercase) for _ in range(rng.randint(6, 12)))
+
+    # Synthetic entries go first, so the real vendors are found last by the legacy loop.
+    vendors = [f"{word()} {word()}" for _ in range(size)] + list(base["vendors"])
+    categories = {f"Category {word()}": [f"{word()} SUBTOTAL"] for _ in range(size // 10)}
+    categories.update(base["categories"])
+    return {"vendors": vendors, "categories": categories}
+
+
+def time_per_receipt(func, texts: List[str], repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            func(text)
+    return (time.perf_counter() - started) / (repeat * len(texts))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--sizes", default="0,100,1000,5000", help="Comma separated dictionary sizes")
+    arg_parser.add_argument("--repeat", type=int, default=20)
+    args = arg_parser.parse_args()
+
+    samples = [open(path, encoding="utf-8").read() for path in sorted(glob.glob(SAMPLES_GLOB))]
+    texts = samples + OVERLAP_TEXTS
+    base = load_dictionary(config.RECEIPT_DICTIONARY_PATH)
+
+    nested = ReceiptEngine.from_dictionary(NESTED_DICTIONARY)
+    for text in texts:
+        scan = nested.scan(text)
+        assert (scan.vendor, scan.subtotals, scan.date) == legacy_scan(text, NESTED_DICTIONARY["vendors"], NESTED_DICTIONARY["categories"]), text
+
+    print(f"{'vendors':>8} {'categories':>10} {'engine us':>10} {'legacy us':>10} {'build ms':>9}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        dictionary = grow_dictionary(base, size)
+        started = time.perf_counter()
+        engine = ReceiptEngine.from_dictionary(dictionary)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        # The engine must agree with the legacy loop on every sample
+        for text in texts:
+            scan = engine.scan(text)
+            assert (scan.vendor, scan.subtotals, scan.date) == legacy_scan(text, dictionary["vendors"], dictionary["categories"])
+
+        engine_s = time_per_receipt(lambda t: parser.parse_receipt_text(t, engine=engine), samples, args.repeat)
+        legacy_s = time_per_receipt(
+            lambda t: legacy_scan(t, dictionary["vendors"], dictionary["categories"]),
+            samples, max(1, args.repeat // 10),
+        )
+        print(f"{len(dictionary['vendors']):>8} {len(dictionary['categories']):>10} "
+              f"{engine_s * 1e6:>10.1f} {legacy_s * 1e6:>10.1f} {build_ms:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# bench_search.py
+#
+# Compares receipt search through the receipts_fts and receipt_vendors_fts
+# indexes with LIKE scans.
+# Builds a throwaway database of synthetic receipts, so it never touches receipts.db.
+#
+# Run from the backend directory:
+#     python -m benchmarks.bench_search --rows 100000
+
+import argparse
+import datetime
+import os
+import random
+import re
+import tempfile
+import time
+
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, models
+from . import synth
+
+
+def build_database(path: str, rows: int, seed: int = 11):
+    """Fills a new database with `rows` synthetic receipts. Returns the engine and one receipt's invoice number."""
+    engine = create_engine(f"sqlite:///{path}")
+    models.Base.metadata.create_all(bind=engine)
+    rng = random.Random(seed)
+
+    batch = []
+    invoice = None
+    with engine.begin() as conn:
+        for i in range(rows):
+            receipt = synth.generate_receipt(rng)
+            if i == rows // 2:
+                invoice = re.search(r"INVOICE: (\S+)", receipt.text).group(1)
+            batch.append(synth.to_receipt_create(receipt, f"synthetic/{i}.txt").model_dump(exclude={"line_items"}))
+            if len(batch) == 5000:
+                conn.execute(insert(models.Receipt), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(models.Receipt), batch)
+    return engine, invoice
+
+
+def timed(func, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - started) / repeat * 1000, len(result)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Full-text search benchmark")
+    arg_parser.add_argument("--rows", type=int, default=100000)
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        started = time.perf_counter()
+        engine, invoice = build_database(path, args.rows)
+        print(f"Built {args.rows} receipts (with FTS triggers) in {time.perf_counter() - started:.1f}s")
+        db = sessionmaker(bind=engine)()
+
+        cases = [
+            ("vendor 'Costco'",
+             lambda: db.query(models.Receipt).filter(models.Receipt.vendor.like("%Costco%")).all(),
+             lambda: crud.search_receipts(db, vendor="Costco")),
+            ("vendor part 'mart'",
+             lambda: db.query(models.Receipt).filter(models.Receipt.vendor.like("%mart%")).all(),
+             lambda: crud.search_receipts(db, vendor="mart")),
+            (f"invoice {invoice}",
+             lambda: db.query(models.Receipt).filter(models.Receipt.raw_text.like(f"%{invoice}%")).all(),
+             lambda: crud.search_receipts(db, q=invoice)),
+            ("item 'earbuds', top 20",
+             lambda: db.query(models.Receipt).filter(models.Receipt.raw_text.like("%earbuds%")).limit(20).all(),
+             lambda: crud.search_receipts(db, q="earbuds", limit=20)),
+            ("item 'earbuds' in 2025",
+             lambda: db.query(models.Receipt).filter(models.Receipt.raw_text.like("%earbuds%"),
+                                                     models.Receipt.date >= datetime.date(2025, 1, 1)).all(),
+             lambda: crud.search_receipts(db, q="earbuds", start_date=datetime.date(2025, 1, 1))),
+        ]
+        print(f"{'query':<30} {'LIKE ms':>10} {'FTS ms':>10} {'rows':>8}")
+        for name, like_query, fts_query in cases:
+            like_ms, _ = timed(like_query, args.repeat)
+            fts_ms, count = timed(fts_query, args.repeat)
+            print(f"{name:<30} {like_ms:>10.1f} {fts_ms:>10.1f} {count:>8}")
+
+        size = db.execute(text("SELECT SUM(pgsize) FROM dbstat WHERE name LIKE 'receipts_fts%'")).scalar() \
+            if db.execute(text("SELECT 1 FROM pragma_module_list WHERE name = 'dbstat'")).scalar() else None
+        if size:
+            print(f"FTS index size: {size / 1024 / 1024:.1f} MiB")
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# bench_serialization.py
+#
+# Compares the fast serialization path of the list and stats endpoints (plain
+# rows encoded by services.serialize) with the previous one (ORM objects or
+# rows validated through the response model by FastAPI), end to end over HTTP.
+# The previous path is rebuilt here on a separate app against the same database.
+#
+# Run from the backend directory:
+#     python -m benchmarks.bench_serialization --rows 1000,10000
+
+import argparse
+import tempfile
+from typing import List, Optional
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app import crud, schemas
+from app.database import get_db
+from app.services import serialize
+from .run import _client_for, percentiles, seed_receipts, temp_database, timed_ms
+
+
+def legacy_app(session_factory) -> FastAPI:
+    """The routes as they were: crud results validated against response_model."""
+    app = FastAPI()
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @app.get("/receipts/", response_model=List[schemas.Receipt])
+    def read_receipts(limit: int = 100, db: Session = Depends(get_db)):
+        return crud.get_receipts(db, limit=limit)
+
+    @app.get("/receipts/search/", response_model=List[schemas.Receipt])
+    def search_for_receipts(start_date: Optional[str] = None, limit: Optional[int] = None, db: Session = Depends(get_db)):
+        return crud.search_receipts(db, start_date=start_date, limit=limit)
+
+    @app.get("/stats/timeseries/", response_model=List[schemas.TimeseriesPoint])
+    def get_timeseries_stats(bucket: str = "month", db: Session = Depends(get_db)):
+        return crud.get_spend_timeseries(db, bucket=bucket)
+
+    app.dependency_overrides[get_db] = override_get_db
+    return app
+
+
+def measure(client: TestClient, url: str, requests: int) -> List[float]:
+    client.get(url).raise_for_status()  # warm up
+    return [timed_ms(lambda: client.get(url).raise_for_status()) for _ in range(requests)]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="List/stats serialization benchmark")
+    arg_parser.add_argument("--rows", default="1000,10000", help="comma-separated page sizes")
+    arg_parser.add_argument("--requests", type=int, default=20)
+    args = arg_parser.parse_args()
+
+    sizes = [int(r) for r in args.rows.split(",")]
+    orjson = serialize.orjson
+    print(f"orjson installed: {orjson is not None}")
+    with tempfile.TemporaryDirectory() as tmp:
+        engine, session_factory = temp_database(tmp)
+        seed_receipts(session_factory, max(sizes))
+        app, client = _client_for(session_factory)
+        legacy = TestClient(legacy_app(session_factory))
+        try:
+            routes = [
+                (f"{rows}.{name}", url)
+                for rows in sizes
+                for name, url in [("receipts", f"/receipts/?limit={rows}"),
+                                  ("search", f"/receipts/search/?start_date=2023-01-01&limit={rows}")]
+            ]
+            # One row per day of the seeded three years, whatever the page size
+            routes.append(("timeseries_day", "/stats/timeseries/?bucket=day"))
+            for name, url in routes:
+                variants = {"legacy": (legacy, url, orjson), "fast": (client, url, orjson),
+                            "fast_stdlib_json": (client, url, None),
+                            "columns": (client, url + ("&" if "?" in url else "?") + "layout=columns", orjson)}
+                for variant, (variant_client, variant_url, encoder) in variants.items():
+                    serialize.orjson = encoder
+                    results = percentiles(measure(variant_client, variant_url, args.requests), f"{name}.{variant}")
+                    print("  ".join(f"{key} {value:9.2f}" for key, value in results.items()))
+                serialize.orjson = orjson
+        finally:
+            serialize.orjson = orjson
+            app.dependency_overrides.clear()
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
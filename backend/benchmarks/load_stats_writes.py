@@ -0,0 +1,134 @@
+# load_stats_writes.py
+#
+# Load test: concurrent readers of the /stats/* endpoints alongside a stream of
+# writes through crud.create_receipt, against each database engine mode.
+# Uses a throwaway database, so it never touches receipts.db.
+#
+# Run from the backend directory:
+#     python -m benchmarks.load_stats_writes --readers 8 --writers 2 --seconds 10
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, models, schemas
+from app.database import get_db, make_engine
+from app.main import app
+from . import synth
+
+STATS_ROUTES = ["/stats/summary/", "/stats/vendor_spend/", "/stats/monthly_spend/", "/stats/category_spend/"]
+
+
+def random_receipt(rng: random.Random, key: str) -> schemas.ReceiptCreate:
+    return synth.to_receipt_create(synth.generate_receipt(rng), f"load/{key}.txt")
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def run(mode: str, readers: int, writers: int, seconds: float, seed_rows: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(f"sqlite:///{os.path.join(tmp, 'load.db')}", mode=mode)
+        models.Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        rng = random.Random(3)
+        with Session() as db:
+            crud.ensure_spend_aggregates(db)
+            crud.create_receipts(db, [random_receipt(rng, f"seed-{i}") for i in range(seed_rows)])
+
+        def override_get_db():
+            db = Session()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_db] = override_get_db
+        stop = threading.Event()
+        lock = threading.Lock()
+        read_ms, write_ms = [], []
+        errors = {"read": 0, "write": 0, "locked": 0}
+
+        def reader(index: int):
+            client = TestClient(app)
+            local_rng = random.Random(index)
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    ok = client.get(local_rng.choice(STATS_ROUTES)).status_code == 200
+                except Exception as e:
+                    ok = False
+                    if "locked" in str(e):
+                        with lock:
+                            errors["locked"] += 1
+                with lock:
+                    if ok:
+                        read_ms.append((time.perf_counter() - started) * 1000)
+                    else:
+                        errors["read"] += 1
+
+        def writer(index: int):
+            local_rng = random.Random(100 + index)
+            count = 0
+            while not stop.is_set():
+                started = time.perf_counter()
+                with Session() as db:
+                    try:
+                        crud.create_receipt(db, random_receipt(local_rng, f"w{index}-{count}"))
+                        ok = True
+                    except Exception as e:
+                        ok = False
+                        if "locked" in str(e):
+                            with lock:
+                                errors["locked"] += 1
+                count += 1
+                with lock:
+                    if ok:
+                        write_ms.append((time.perf_counter() - started) * 1000)
+                    else:
+                        errors["write"] += 1
+
+        threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+        threads += [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        app.dependency_overrides.clear()
+        engine.dispose()
+
+    print(f"{mode:<11} reads/s {len(read_ms) / seconds:>7.1f}  p50 {statistics.median(read_ms) if read_ms else 0:>6.1f}ms"
+          f"  p99 {percentile(read_ms, 99):>7.1f}ms | writes/s {len(write_ms) / seconds:>6.1f}"
+          f"  p50 {statistics.median(write_ms) if write_ms else 0:>6.1f}ms  p99 {percentile(write_ms, 99):>7.1f}ms"
+          f" | failed reads {errors['read']}, writes {errors['write']} ('locked': {errors['locked']})")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Concurrent stats reads + receipt writes")
+    arg_parser.add_argument("--readers", type=int, default=8)
+    arg_parser.add_argument("--writers", type=int, default=2)
+    arg_parser.add_argument("--seconds", type=float, default=10)
+    arg_parser.add_argument("--seed-rows", type=int, default=5000)
+    arg_parser.add_argument("--modes", default="basic,production")
+    args = arg_parser.parse_args()
+
+    for mode in args.modes.split(","):
+        run(mode, args.readers, args.writers, args.seconds, args.seed_rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+# run.py
+#
+# Benchmark harness. Runs the suites below on synthetic receipts (see synth.py),
+# prints the results and can save them as a baseline or compare against one:
+#
+#   parse         parse_receipt_text throughput
+#   process_file  per-format extraction + parsing latency (txt, pdf, scanned_pdf, png)
+#   upload        POST /upload/ end-to-end latency percentiles
+#   stats         /stats/* latency at each --stats-rows table size
+#
+# Every suite uses throwaway databases and upload directories, never receipts.db.
+#
+# Run from the backend directory:
+#     python -m benchmarks.run --save-baseline local
+#     python -m benchmarks.run --compare local          # exits 1 on a regression
+#     python -m benchmarks.run --suites stats --stats-rows 1000,100000,1000000
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import statistics
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, models
+from app.database import get_db, make_engine
+from app.services import parser
+from . import synth
+
+BASELINES_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+STATS_ROUTES = ["/stats/summary/", "/stats/vendor_spend/", "/stats/monthly_spend/", "/stats/category_spend/"]
+FILE_FORMATS = ["txt", "pdf", "scanned_pdf", "png"]
+
+
+def percentiles(samples_ms: List[float], prefix: str) -> Dict[str, float]:
+    ordered = sorted(samples_ms)
+
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+    return {
+        f"{prefix}.p50_ms": round(statistics.median(ordered), 3),
+        f"{prefix}.p95_ms": round(pct(95), 3),
+        f"{prefix}.p99_ms": round(pct(99), 3),
+    }
+
+
+def timed_ms(func: Callable) -> float:
+    started = time.perf_counter()
+    func()
+    return (time.perf_counter() - started) * 1000
+
+
+def temp_database(tmp: str):
+    engine = make_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+    models.Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with Session() as db:
+        crud.ensure_spend_aggregates(db)
+    return engine, Session
+
+
+# --- Suites ---
+
+def bench_parse(args) -> Dict[str, float]:
+    texts = [receipt.text for receipt in synth.generate_receipts(args.parse_receipts, seed=1)]
+    parser.parse_receipt_text(texts[0])  # compile the engine outside the timing
+    started = time.perf_counter()
+    for text in texts:
+        parser.parse_receipt_text(text)
+    elapsed = time.perf_counter() - started
+    return {"parse.receipts_per_s": round(len(texts) / elapsed, 1)}
+
+
+def bench_process_file(args) -> Dict[str, float]:
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in FILE_FORMATS:
+            corpus = synth.write_corpus(os.path.join(tmp, fmt), args.files_per_format, [fmt], seed=2)
+            extension = os.path.splitext(corpus[0][1])[1]
+            samples = []
+            try:
+                for _, path, _ in corpus:
+                    samples.append(timed_ms(lambda: parser.process_file(path, extension)))
+            except Exception as e:
+                # OCR formats need the tesseract binary
+                print(f"  process_file[{fmt}] skipped: {e}")
+                continue
+            results.update(percentiles(samples, f"process_file.{fmt}"))
+    return results
+
+
+def _client_for(Session):
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    def override_get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    # Not used as a context manager, so the startup reset never runs
+    return app, TestClient(app)
+
+
+def bench_upload(args) -> Dict[str, float]:
+    from app import main
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine, Session = temp_database(tmp)
+        uploads_dir = os.path.join(tmp, "uploads")
+        os.makedirs(uploads_dir)
+        original_uploads_dir, main.UPLOADS_DIR = main.UPLOADS_DIR, uploads_dir
+        app, client = _client_for(Session)
+        try:
+            samples = []
+            for index, receipt in enumerate(synth.generate_receipts(args.uploads, seed=3)):
+                files = {"file": (f"upload-{index}.txt", receipt.text.encode("utf-8"), "text/plain")}
+                samples.append(timed_ms(lambda: client.post("/upload/", files=files).raise_for_status()))
+        finally:
+            main.UPLOADS_DIR = original_uploads_dir
+            app.dependency_overrides.clear()
+            engine.dispose()
+    return percentiles(samples, "upload.txt")
+
+
+def seed_receipts(Session, rows: int, seed: int = 4):
+    """Inserts `rows` receipts and their category rows directly, then rebuilds the aggregates and rollups."""
+    rng = random.Random(seed)
+    vendors = [vendor for vendor, _, _ in synth.VENDORS]
+    categories = list(synth.CATEGORIES)
+    start = datetime.date(2023, 1, 1)
+    batch_size = 10000
+    with Session() as db:
+        for offset in range(0, rows, batch_size):
+            receipts, category_rows = [], []
+            for receipt_id in range(offset + 1, min(rows, offset + batch_size) + 1):
+                amount = round(rng.uniform(50, 5000), 2)
+                category = rng.choice(categories)
+                day = start + datetime.timedelta(days=rng.randint(0, 1095))
+                receipts.append({
+                    "id": receipt_id, "vendor": rng.choice(vendors), "date": day, "amount": amount,
+                    "category": category, "sub_categories": {category: amount},
+                    "file_path": f"seed/{receipt_id}.txt",
+                })
+                category_rows.append({"receipt_id": receipt_id, "category": category, "amount": amount, "date": day})
+            db.execute(insert(models.Receipt), receipts)
+            db.execute(insert(models.ReceiptCategory), category_rows)
+            db.commit()
+        crud.rebuild_spend_aggregates(db)
+        crud.rebuild_daily_spend(db)
+
+
+def bench_stats(args) -> Dict[str, float]:
+    results = {}
+    for rows in [int(r) for r in args.stats_rows.split(",")]:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine, Session = temp_database(tmp)
+            started = time.perf_counter()
+            seed_receipts(Session, rows)
+            print(f"  seeded {rows} receipts in {time.perf_counter() - started:.1f}s")
+            app, client = _client_for(Session)
+            try:
+                for route in STATS_ROUTES:
+                    client.get(route).raise_for_status()  # warm up
+                    samples = [timed_ms(lambda: client.get(route).raise_for_status()) for _ in range(args.stats_requests)]
+                    results.update(percentiles(samples, f"stats.{rows}.{route.strip('/').replace('/', '.')}"))
+            finally:
+                app.dependency_overrides.clear()
+                engine.dispose()
+    return results
+
+
+SUITES = {
+    "parse": bench_parse,
+    "process_file": bench_process_file,
+    "upload": bench_upload,
+    "stats": bench_stats,
+}
+
+
+# --- Baselines ---
+
+def machine_info() -> Dict[str, str]:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpus": str(os.cpu_count()),
+    }
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], threshold: float) -> List[str]:
+    """Returns a description of every metric that got worse than the baseline by more than `threshold`."""
+    regressions = []
+    for name, value in sorted(results.items()):
+        reference = baseline.get(name)
+        if not reference:
+            continue
+        # Latencies (_ms) should not grow; throughputs (_per_s) should not shrink
+        change = (value - reference) / reference if name.endswith("_ms") else (reference - value) / reference
+        marker = ""
+        if change > threshold:
+            marker = "  <-- REGRESSION"
+            regressions.append(f"{name}: {reference} -> {value}")
+        print(f"  {name:<55} {reference:>12} {value:>12} {change:>+8.1%}{marker}")
+    return regressions
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Receipt processor benchmark suite")
+    arg_parser.add_argument("--suites", default=",".join(SUITES))
+    arg_parser.add_argument("--parse-receipts", type=int, default=2000)
+    arg_parser.add_argument("--files-per-format", type=int, default=20)
+    arg_parser.add_argument("--uploads", type=int, default=200)
+    arg_parser.add_argument("--stats-rows", default="1000,100000")
+    arg_parser.add_argument("--stats-requests", type=int, default=50)
+    arg_parser.add_argument("--save-baseline", metavar="NAME")
+    arg_parser.add_argument("--compare", metavar="NAME")
+    arg_parser.add_argument("--threshold", type=float, default=0.25,
+                            help="Relative change counted as a regression (default 0.25)")
+    args = arg_parser.parse_args()
+
+    results: Dict[str, float] = {}
+    for suite in args.suites.split(","):
+        print(f"Running {suite}...")
+        suite_results = SUITES[suite](args)
+        for name, value in sorted(suite_results.items()):
+            print(f"  {name:<55} {value:>12}")
+        results.update(suite_results)
+
+    if args.save_baseline:
+        os.makedirs(BASELINES_DIR, exist_ok=True)
+        path = os.path.join(BASELINES_DIR, f"{args.save_baseline}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"machine": machine_info(), "results": results}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Saved baseline to {path}")
+
+    if args.compare:
+        with open(os.path.join(BASELINES_DIR, f"{args.compare}.json"), encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"Comparing against '{args.compare}' ({baseline['machine'].get('platform')}):")
+        regressions = compare(results, baseline["results"], args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) over {args.threshold:.0%}")
+            raise SystemExit(1)
+        print("No regressions.")
+
+
+if __name__ == "__main__":
+    main()
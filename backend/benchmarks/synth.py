@@ -0,0 +1,267 @@
+# synth.py
+#
+# Synthetic receipt generator for benchmarks. Produces receipts in the layout
+# of the samples in uploads/ (header box, invoice/date lines, item tables per
+# category with SUBTOTAL lines, billing summary and GRAND TOTAL) and renders
+# them as TXT, PNG, text-layer PDF or scanned (image-only) PDF. Every receipt
+# carries its ground truth so extraction accuracy can be measured.
+#
+# Run from the backend directory:
+#     python -m benchmarks.synth --count 1000 --formats txt,png,pdf --out /tmp/receipts
+
+import argparse
+import datetime
+import io
+import os
+import random
+from typing import Dict, List, Tuple
+
+from app import schemas
+
+WIDTH = 60
+
+VENDORS = [
+    ("MegaMart", "MegaMart Hypermarket", "Your One-Stop Shopping Destination"),
+    ("Reliance Digital", "RELIANCE DIGITAL", "Innovative Tech Solutions"),
+    ("BigBazaar", "BigBazaar Superstore", "Is Se Sasta Aur Achha Kahin Nahi"),
+    ("Walmart", "Walmart Supercenter", "Save Money. Live Better."),
+    ("Costco", "Costco Wholesale", "Members Only Warehouse"),
+    ("Target", "Target Store #1182", "Expect More. Pay Less."),
+    ("Amazon", "Amazon Fresh", "Groceries Delivered"),
+    # Vendors outside the parser dictionary, expected to parse as "Unknown"
+    ("Unknown", "Corner Kirana Stores", "Daily Needs & Provisions"),
+    ("Unknown", "Fashion Hub Outlet", "Style For Everyone"),
+]
+
+ADDRESSES = [
+    "Prestige Tech Park, Outer Ring Road, Bengaluru",
+    "Forum Mall, Koramangala, Bengaluru",
+    "Phoenix Marketcity, Whitefield, Bengaluru",
+    "Linking Road, Bandra West, Mumbai",
+    "Select Citywalk, Saket, New Delhi",
+]
+
+# Category -> (section header, SUBTOTAL label, item id prefix, [(description, unit price)])
+CATEGORIES = {
+    "Groceries": (">> GROCERIES", "GROCERY SUBTOTAL", "G", [
+        ("Toor Dal (1kg)", 160.00), ("Basmati Rice (1kg)", 220.00), ("Sunflower Oil (1L)", 185.00),
+        ("Atta Flour (5kg)", 265.00), ("Amul Butter (500g)", 275.00), ("Tata Salt (1kg)", 28.00),
+        ("Green Tea (100 bags)", 350.00), ("Almonds (250g)", 310.00), ("Sugar (1kg)", 48.00),
+    ]),
+    "Electronics": (">> ELECTRONICS", "ELECTRONICS SUBTOTAL", "E", [
+        ("Bluetooth Earbuds", 2299.00), ("Wireless Mouse", 999.00), ("Electric Kettle 1.5L", 1299.00),
+        ("USB-C Charger 65W", 1899.00), ("Smart LED Bulb", 649.00), ("Power Bank 20000mAh", 1799.00),
+        ("HDMI Cable 2m", 399.00), ("Mechanical Keyboard", 3499.00),
+    ]),
+    "Apparel": (">> APPAREL", "APPAREL SUBTOTAL", "A", [
+        ("Cotton T-Shirt", 599.00), ("Denim Jeans", 1799.00), ("Running Shoes", 2999.00),
+        ("Formal Shirt", 1299.00), ("Woollen Socks (3 pack)", 399.00), ("Rain Jacket", 2499.00),
+    ]),
+}
+
+
+class SyntheticReceipt:
+    """A generated receipt's text plus the values a perfect parser would extract."""
+
+    def __init__(self, text: str, vendor: str, date: datetime.date, amount: float,
+                 sub_categories: Dict[str, float], items: List[Tuple[str, str, int, float, float]]):
+        self.text = text
+        self.vendor = vendor
+        self.date = date
+        self.amount = amount
+        self.sub_categories = sub_categories
+        # (item id, description, quantity, unit price, line total)
+        self.items = items
+
+    @property
+    def category(self) -> str:
+        if len(self.sub_categories) > 1:
+            return "Mixed"
+        if self.sub_categories:
+            return next(iter(self.sub_categories))
+        return "Uncategorized"
+
+
+def _money(value: float) -> str:
+    return f"{value:.2f}"
+
+
+def generate_receipt(rng: random.Random) -> SyntheticReceipt:
+    vendor, title, tagline = rng.choice(VENDORS)
+    date = datetime.date(2024, 1, 1) + datetime.timedelta(days=rng.randint(0, 730))
+    lines = [
+        "*" * WIDTH,
+        title.center(WIDTH).rstrip(),
+        tagline.center(WIDTH).rstrip(),
+        rng.choice(ADDRESSES).center(WIDTH).rstrip(),
+        "*" * WIDTH,
+        "",
+        f"INVOICE: {vendor[:2].upper()}-{rng.randint(2020, 2026)}-{rng.randint(0, 999999):06d}",
+        f"DATE: {date.isoformat()}   TIME: {rng.randint(8, 22):02d}:{rng.randint(0, 59):02d}",
+        f"CASHIER: {rng.choice(['Sandeep G.', 'Priya R.', 'Arjun K.', 'Meera S.'])}",
+        "",
+    ]
+
+    sub_categories: Dict[str, float] = {}
+    items = []
+    chosen = rng.sample(list(CATEGORIES), rng.randint(1, len(CATEGORIES)))
+    for category in chosen:
+        header, label, prefix, catalog = CATEGORIES[category]
+        lines += [
+            "-" * WIDTH,
+            header,
+            "-" * WIDTH,
+            "ID    | Description              | Qty | Unit Price | Total",
+            "-" * WIDTH,
+        ]
+        subtotal = 0.0
+        for description, price in rng.sample(catalog, rng.randint(1, min(4, len(catalog)))):
+            quantity = rng.randint(1, 5)
+            total = round(quantity * price, 2)
+            item_id = f"{prefix}-{rng.randint(1, 999):03d}"
+            items.append((item_id, description, quantity, price, total))
+            subtotal += total
+            lines.append(f"{item_id} | {description:<24} | {quantity:^3} | {_money(price):>10} | {_money(total):>7}")
+        subtotal = round(subtotal, 2)
+        sub_categories[category] = subtotal
+        lines += [
+            "-" * WIDTH,
+            f"{label + ':':<40}{_money(subtotal):>20}",
+            "",
+        ]
+
+    gross = round(sum(sub_categories.values()), 2)
+    tax = round(gross * rng.choice([0.05, 0.12, 0.18]), 2)
+    grand_total = round(gross + tax, 2)
+    currency = rng.choice(["₹ ", "Rs. "])
+    grand_label = rng.choice(["GRAND TOTAL:", "GRAND TOTAL (PAY THIS AMOUNT):"])
+    lines += [
+        "=" * WIDTH,
+        "BILLING SUMMARY".center(WIDTH).rstrip(),
+        "=" * WIDTH,
+        "",
+        f"GROSS AMOUNT: {'.' * 33} {_money(gross):>10}",
+        f"GST (Calculated): {'.' * 29} {_money(tax):>10}",
+        "-" * WIDTH,
+        "",
+        f"{grand_label:<44}{currency}{_money(grand_total)}",
+        "*" * WIDTH,
+    ]
+    return SyntheticReceipt("\n".join(lines), vendor, date, grand_total, sub_categories, items)
+
+
+def generate_receipts(count: int, seed: int = 0) -> List[SyntheticReceipt]:
+    rng = random.Random(seed)
+    return [generate_receipt(rng) for _ in range(count)]
+
+
+def to_receipt_create(receipt: SyntheticReceipt, file_path: str) -> schemas.ReceiptCreate:
+    """What a perfect parse of the receipt would save, for benchmarks that write receipts directly."""
+    return schemas.ReceiptCreate(
+        vendor=receipt.vendor,
+        amount=receipt.amount,
+        date=receipt.date,
+        category=receipt.category,
+        sub_categories=receipt.sub_categories,
+        file_path=file_path,
+        raw_text=receipt.text,
+        line_items=[
+            schemas.LineItem(item_code=item_code, description=description, quantity=quantity, unit_price=unit_price, total=total)
+            for item_code, description, quantity, unit_price, total in receipt.items
+        ],
+    )
+
+
+# --- Rendering ---
+
+def _printable(text: str) -> str:
+    # The built-in fonts have no rupee glyph
+    return text.replace("₹", "Rs.")
+
+
+def render_txt(receipt: SyntheticReceipt, path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(receipt.text)
+
+
+def render_png_bytes(receipt: SyntheticReceipt, dpi: int = 300) -> bytes:
+    """Renders the receipt as a white PNG, monospaced at roughly 10pt for the given DPI."""
+    from PIL import Image, ImageDraw, ImageFont
+
+    font_px = max(8, round(10 * dpi / 72))
+    try:
+        font = ImageFont.truetype("DejaVuSansMono.ttf", font_px)
+    except OSError:
+        font = ImageFont.load_default(size=font_px)
+    lines = _printable(receipt.text).split("\n")
+    left, top, right, bottom = font.getbbox("M" * WIDTH)
+    line_height = int(font_px * 1.35)
+    margin = font_px * 2
+    image = Image.new("L", (right + 2 * margin, line_height * len(lines) + 2 * margin), 255)
+    draw = ImageDraw.Draw(image)
+    for index, line in enumerate(lines):
+        draw.text((margin, margin + index * line_height), line, fill=0, font=font)
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", dpi=(dpi, dpi))
+    return buffer.getvalue()
+
+
+def render_png(receipt: SyntheticReceipt, path: str, dpi: int = 300):
+    with open(path, "wb") as f:
+        f.write(render_png_bytes(receipt, dpi=dpi))
+
+
+def render_pdf(receipt: SyntheticReceipt, path: str, scanned: bool = False):
+    """
+    Renders the receipt as a one-page PDF: with a text layer (Courier), or
+    with `scanned`, as an image-only page that needs OCR.
+    """
+    import fitz  # PyMuPDF
+
+    doc = fitz.open()
+    lines = _printable(receipt.text).split("\n")
+    fontsize = 9
+    page = doc.new_page(width=595, height=max(842, 40 + len(lines) * fontsize * 1.3))
+    if scanned:
+        page.insert_image(page.rect, stream=render_png_bytes(receipt, dpi=200))
+    else:
+        page.insert_text((36, 36), "\n".join(lines), fontname="cour", fontsize=fontsize)
+    doc.save(path)
+    doc.close()
+
+
+RENDERERS = {
+    "txt": (".txt", render_txt),
+    "png": (".png", render_png),
+    "pdf": (".pdf", render_pdf),
+    "scanned_pdf": (".pdf", lambda receipt, path: render_pdf(receipt, path, scanned=True)),
+}
+
+
+def write_corpus(out_dir: str, count: int, formats: List[str], seed: int = 0) -> List[Tuple[str, str, SyntheticReceipt]]:
+    """Writes `count` receipts in each format to `out_dir`. Returns (format, path, receipt) tuples."""
+    os.makedirs(out_dir, exist_ok=True)
+    written = []
+    for index, receipt in enumerate(generate_receipts(count, seed=seed)):
+        for fmt in formats:
+            extension, render = RENDERERS[fmt]
+            path = os.path.join(out_dir, f"synthetic-{index:06d}-{fmt}{extension}")
+            render(receipt, path)
+            written.append((fmt, path, receipt))
+    return written
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Generate synthetic receipts")
+    arg_parser.add_argument("--count", type=int, default=100)
+    arg_parser.add_argument("--formats", default="txt", help=f"Comma separated: {', '.join(RENDERERS)}")
+    arg_parser.add_argument("--out", required=True)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    written = write_corpus(args.out, args.count, args.formats.split(","), seed=args.seed)
+    print(f"Wrote {len(written)} files to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
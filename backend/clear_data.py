@@ -24,6 +24,15 @@ def clear_data():
     else:
         print("Database file not found, skipping.")
 
+    # Delete the WAL side files left next to the database in WAL mode
+    for side_file in (f"{DB_FILE}-wal", f"{DB_FILE}-shm"):
+        if os.path.exists(side_file):
+            try:
+                os.remove(side_file)
+                print(f"Successfully deleted: {side_file}")
+            except Exception as e:
+                print(f"Error deleting {side_file}: {e}")
+
     # Delete the uploads directory if it exists
     if os.path.exists(UPLOADS_DIR):
         try:
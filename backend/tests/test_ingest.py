@@ -0,0 +1,65 @@
+# test_ingest.py
+#
+# Bulk ingest stores files like API uploads do, so the same bytes give one
+# receipt whichever way, and however often, they come in.
+
+import asyncio
+import io
+
+import pytest
+from sqlalchemy.orm import Session, sessionmaker
+
+from app import config, crud, ingest, schemas
+from app.database import make_engine
+from app.services import storage
+
+RECEIPT = b"Walmart\nDate: 2024-01-02\nGRAND TOTAL: 12.50\n"
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    engine = make_engine(f"sqlite:///{tmp_path / 'receipts.db'}")
+    monkeypatch.setattr(ingest, "engine", engine)
+    monkeypatch.setattr(ingest, "SessionLocal", sessionmaker(autocommit=False, autoflush=False, bind=engine))
+    monkeypatch.setattr(config, "UPLOADS_DIR", str(tmp_path / "uploads"))
+    yield engine
+    engine.dispose()
+
+
+def run_ingest(directory):
+    return ingest.run(str(directory), workers=1, chunk_size=10, manifest_path=str(directory / ingest.MANIFEST_NAME))
+
+
+def test_same_bytes_give_one_receipt(tmp_path, database):
+    for name in ("first", "second"):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / f"{name}.txt").write_bytes(RECEIPT)
+    run_ingest(tmp_path / "first")
+    run_ingest(tmp_path / "second")
+
+    with Session(database) as db:
+        receipts = crud.get_receipts(db)
+    assert len(receipts) == 1
+    assert receipts[0].file_path.startswith(config.UPLOADS_DIR)
+    assert receipts[0].original_filename == "second.txt"
+
+
+def test_ingest_and_upload_share_a_receipt(tmp_path, database):
+    (tmp_path / "archive").mkdir()
+    (tmp_path / "archive" / "a.txt").write_bytes(RECEIPT)
+    run_ingest(tmp_path / "archive")
+
+    # What the upload endpoint stores and saves for the same bytes
+    upload = io.BytesIO(RECEIPT)
+
+    async def read(size):
+        return upload.read(size)
+
+    stored = asyncio.run(storage.store(read, config.UPLOADS_DIR, ".txt", max_bytes=2 ** 20))
+    with Session(database) as db:
+        crud.create_receipt(db, schemas.ReceiptCreate(vendor="Walmart", date="2024-01-02", amount=12.5,
+                                                      category="Groceries", file_path=stored.path,
+                                                      original_filename="upload.txt", raw_text=RECEIPT.decode()))
+        receipts = crud.get_receipts(db)
+    assert stored.deduplicated
+    assert [receipt.original_filename for receipt in receipts] == ["upload.txt"]
@@ -0,0 +1,42 @@
+# test_metrics.py
+#
+# Extraction and parsing run in pool workers; their stage timings must still
+# reach the API process's /metrics and the upload's Server-Timing header.
+
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, main, migrations
+from app.database import get_db, make_engine
+from app.services import pool
+
+
+def test_upload_reports_worker_stages(tmp_path, monkeypatch):
+    engine = make_engine(f"sqlite:///{tmp_path / 'receipts.db'}")
+    migrations.upgrade(engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with session_factory() as db:
+        crud.ensure_spend_aggregates(db)
+
+    def get_test_db():
+        with session_factory() as db:
+            yield db
+
+    monkeypatch.setattr(main, "UPLOADS_DIR", tmp_path / "uploads")
+    (tmp_path / "uploads").mkdir()
+    main.app.dependency_overrides[get_db] = get_test_db
+    try:
+        # Without the lifespan, so the test's database and upload folder are the only ones touched
+        client = TestClient(main.app)
+        response = client.post("/upload/", files={"file": ("a.txt", b"Walmart\nDate: 2024-01-02\nGRAND TOTAL: 12.50\n")})
+        exposition = client.get("/metrics").text
+    finally:
+        main.app.dependency_overrides.pop(get_db)
+        pool.shutdown_process_pool()
+        engine.dispose()
+
+    assert response.status_code == 200
+    stages = [entry.split(";")[0] for entry in response.headers["Server-Timing"].split(", ")]
+    assert {"copy", "queue", "extract", "parse", "commit", "total"} <= set(stages)
+    for stage in ("extract", "parse"):
+        assert f'receipt_stage_duration_seconds_count{{stage="{stage}",file_type="txt"}}' in exposition
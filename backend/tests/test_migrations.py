@@ -0,0 +1,127 @@
+# test_migrations.py
+#
+# Upgrades a database created by the first release of the app, before any
+# migration existed, to the latest schema.
+#
+# Run from the backend directory:
+#     python -m pytest tests
+
+import logging
+
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.orm import Session
+
+from app import crud, migrations, models
+
+# The receipts table as the first release created it
+BASELINE_SCHEMA = [
+    """
+    CREATE TABLE receipts (
+        id INTEGER NOT NULL,
+        vendor VARCHAR,
+        date DATE,
+        amount FLOAT NOT NULL,
+        category VARCHAR,
+        sub_categories JSON,
+        file_path VARCHAR,
+        PRIMARY KEY (id),
+        UNIQUE (file_path)
+    )
+    """,
+    "CREATE INDEX ix_receipts_id ON receipts (id)",
+    "CREATE INDEX ix_receipts_vendor ON receipts (vendor)",
+    "CREATE INDEX ix_receipts_date ON receipts (date)",
+]
+
+BASELINE_ROWS = [
+    "INSERT INTO receipts (vendor, date, amount, category, sub_categories, file_path) "
+    "VALUES ('Walmart', '2024-01-02', 12.5, 'Groceries', NULL, 'uploads/a.txt')",
+    "INSERT INTO receipts (vendor, date, amount, category, sub_categories, file_path) "
+    "VALUES ('Target', '2024-02-03', 30.0, 'Mixed', '{\"Groceries\": 10.0, \"Household\": 20.0}', 'uploads/b.txt')",
+]
+
+
+def baseline_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'receipts.db'}")
+    with engine.begin() as conn:
+        for statement in BASELINE_SCHEMA + BASELINE_ROWS:
+            conn.exec_driver_sql(statement)
+    return engine
+
+
+def test_upgrade_baseline_database(tmp_path):
+    engine = baseline_engine(tmp_path)
+    try:
+        assert migrations.upgrade(engine) == (0, migrations.LATEST_VERSION)
+        with engine.connect() as conn:
+            assert migrations.get_version(conn) == migrations.LATEST_VERSION
+            receipt_columns = {column["name"] for column in inspect(conn).get_columns("receipts")}
+        assert set(models.Receipt.__table__.columns.keys()) <= receipt_columns
+
+        with Session(engine) as db:
+            assert crud.get_spend_statistics(db).total_spend == 42.5
+            categories = {row.category: row.total_spend for row in crud.get_category_spend(db)}
+            assert categories == {"Groceries": 22.5, "Household": 20.0}
+            assert len(crud.get_receipts(db)) == 2
+            assert [receipt.vendor for receipt in crud.search_receipts(db, vendor="mart")] == ["Walmart"]
+    finally:
+        engine.dispose()
+
+
+def test_upgrade_is_a_no_op_on_restart(tmp_path):
+    engine = baseline_engine(tmp_path)
+    try:
+        migrations.upgrade(engine)
+        latest = migrations.LATEST_VERSION
+        assert migrations.upgrade(engine) == (latest, latest)
+    finally:
+        engine.dispose()
+
+
+def test_data_epoch_added_to_existing_totals(tmp_path):
+    engine = baseline_engine(tmp_path)
+    try:
+        migrations.upgrade(engine)
+        # spend_totals as it was before it had an epoch
+        with engine.begin() as conn:
+            conn.exec_driver_sql("DROP TABLE spend_totals")
+            conn.exec_driver_sql("CREATE TABLE spend_totals (id INTEGER PRIMARY KEY, total FLOAT NOT NULL, "
+                                 "count INTEGER NOT NULL, data_version INTEGER NOT NULL DEFAULT 0)")
+            conn.exec_driver_sql("INSERT INTO spend_totals VALUES (1, 42.5, 2, 7)")
+            conn.exec_driver_sql("PRAGMA user_version = 8")
+        migrations.upgrade(engine)
+
+        with Session(engine) as db:
+            epoch, data_version = crud.get_data_stamp(db)
+            assert epoch and data_version == 7
+            assert crud.get_spend_statistics(db).total_spend == 42.5
+    finally:
+        engine.dispose()
+
+
+def test_upgrade_backfills_line_items(tmp_path):
+    engine = baseline_engine(tmp_path)
+    try:
+        with engine.begin() as conn:
+            # The first release did not keep the text; give one receipt the stored text of a sample
+            conn.exec_driver_sql("ALTER TABLE receipts ADD COLUMN raw_text TEXT")
+            conn.exec_driver_sql("UPDATE receipts SET raw_text = ? WHERE file_path = 'uploads/a.txt'",
+                                 ("Walmart\r\nG-025 | Toor Dal (1kg)\xa0 \xa0|\xa0 2\xa0 |\xa0 160.00 |\xa0 320.00\r\n",))
+        migrations.upgrade(engine)
+        with engine.connect() as conn:
+            items = conn.exec_driver_sql("SELECT description, quantity, total FROM line_items").fetchall()
+        assert [tuple(item) for item in items] == [("Toor Dal (1kg)", 2.0, 320.0)]
+    finally:
+        engine.dispose()
+
+
+def test_upgrade_logs_each_migration(tmp_path, caplog):
+    engine = baseline_engine(tmp_path)
+    try:
+        with caplog.at_level(logging.INFO, logger=migrations.__name__):
+            migrations.upgrade(engine)
+    finally:
+        engine.dispose()
+    assert [record.getMessage() for record in caplog.records] == [
+        f"Migrating database to version {number}: {description}" for number, description, _ in migrations.MIGRATIONS
+    ]
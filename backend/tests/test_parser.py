@@ -0,0 +1,68 @@
+# test_parser.py
+#
+# Parses the sample receipts in uploads/ as they are stored (CRLF line
+# endings, item rows padded with no-break spaces), and checks that pool
+# workers parse with the current dictionary.
+
+import json
+import os
+
+import pytest
+
+from app.services import parser, pool
+
+UPLOADS_DIR = os.path.join(os.path.dirname(__file__), "..", "uploads")
+
+# File name -> number of item rows
+EXPECTED_ITEMS = {
+    "JULY.txt": 3,
+    "JUNE.txt": 3,
+    "MegaMart-Hypermarket - NEW.txt": 9,
+    "R1.txt": 3,
+    "R2.txt": 4,
+    "R3.txt": 2,
+    "R4.txt": 4,
+    "R5.txt": 3,
+}
+
+
+def test_every_sample_is_covered():
+    samples = {name for name in os.listdir(UPLOADS_DIR) if name.endswith(".txt")}
+    assert samples == set(EXPECTED_ITEMS)
+
+
+@pytest.mark.parametrize("name", sorted(EXPECTED_ITEMS))
+@pytest.mark.parametrize("newline", [None, ""], ids=["translated", "crlf"])
+def test_sample_line_items(name, newline):
+    with open(os.path.join(UPLOADS_DIR, name), encoding="utf-8", newline=newline) as f:
+        items = parser.parse_receipt_text(f.read())["line_items"]
+    assert len(items) == EXPECTED_ITEMS[name]
+    for item in items:
+        assert item["description"] == item["description"].strip()
+        assert item["total"] > 0
+
+
+def write_dictionary(path, vendors):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"vendors": vendors, "categories": {"Groceries": ["GROCERY SUBTOTAL"]}}, f)
+
+
+def test_worker_picks_up_dictionary_edits(tmp_path, monkeypatch):
+    dictionary = tmp_path / "dictionary.json"
+    receipt = tmp_path / "receipt.txt"
+    receipt.write_text("Corner Shop\nGRAND TOTAL: 12.50\n")
+    write_dictionary(dictionary, ["Walmart"])
+    # Spawned workers read the configuration from the environment
+    monkeypatch.setenv("RECEIPT_DICTIONARY_PATH", str(dictionary))
+
+    workers = pool.WorkerPool(1)
+    try:
+        before = workers.submit(parser.extract_and_parse, str(receipt), ".txt").result()
+        write_dictionary(dictionary, ["Walmart", "Corner Shop"])
+        after = workers.submit(parser.extract_and_parse, str(receipt), ".txt").result()
+    finally:
+        workers.shutdown()
+
+    assert before.parsed["vendor"] == "Unknown"
+    assert after.parsed["vendor"] == "Corner Shop"
+    assert before.fingerprint != after.fingerprint
@@ -0,0 +1,56 @@
+# test_pool.py
+#
+# The worker pool's limits cover the processes a task starts, as tesseract
+# runs in a child process of the worker.
+
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from app.services import pool
+
+pytestmark = pytest.mark.skipif(not os.path.exists("/proc/self/statm"), reason="needs /proc")
+
+
+def start_child_and_wait(pid_file: str, code: str = "import time; time.sleep(60)"):
+    child = subprocess.Popen([sys.executable, "-c", code])
+    with open(pid_file, "w") as f:
+        f.write(str(child.pid))
+    time.sleep(60)
+
+
+def running(pid: int) -> bool:
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except OSError:
+        return False
+
+
+def test_timeout_kills_the_task_children(tmp_path):
+    pid_file = str(tmp_path / "child.pid")
+    workers = pool.WorkerPool(1, timeout_seconds=2)
+    try:
+        with pytest.raises(TimeoutError):
+            workers.submit(start_child_and_wait, pid_file).result()
+        child = int(open(pid_file).read())
+        deadline = time.monotonic() + 2
+        while running(child) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert not running(child)
+    finally:
+        workers.shutdown()
+
+
+def test_memory_cap_counts_the_task_children(tmp_path):
+    pid_file = str(tmp_path / "child.pid")
+    hog = "import time; data = bytearray(200 * 2 ** 20); time.sleep(60)"
+    workers = pool.WorkerPool(1, timeout_seconds=30, max_rss_bytes=150 * 2 ** 20)
+    try:
+        with pytest.raises(MemoryError):
+            workers.submit(start_child_and_wait, pid_file, hog).result()
+    finally:
+        workers.shutdown()
@@ -0,0 +1,59 @@
+# test_search.py
+#
+# The vendor filter matches any part of a vendor name; the q search matches
+# whole words and word prefixes.
+
+from datetime import date
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app import crud, migrations, schemas
+from app.database import make_engine
+
+VENDORS = ["Walmart", "MegaMart", "BigBazaar", "Target", "Reliance Digital"]
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'receipts.db'}")
+    migrations.upgrade(engine)
+    with Session(engine) as session:
+        for index, vendor in enumerate(VENDORS):
+            crud.create_receipt(session, schemas.ReceiptCreate(
+                vendor=vendor, date=date(2024, 1, index + 1), amount=10.0 + index, category="Groceries",
+                file_path=f"uploads/{index}.txt", raw_text=f"{vendor}\nGRAND TOTAL: {10 + index}.00",
+            ))
+        yield session
+    engine.dispose()
+
+
+def vendors(receipts):
+    return sorted(receipt.vendor for receipt in receipts)
+
+
+@pytest.mark.parametrize("vendor, expected", [
+    ("mart", ["MegaMart", "Walmart"]),
+    ("Bazaar", ["BigBazaar"]),
+    ("almar", ["Walmart"]),
+    ("ce Di", ["Reliance Digital"]),
+    ("ar", ["BigBazaar", "MegaMart", "Target", "Walmart"]),
+    ("Costco", []),
+])
+def test_vendor_matches_any_part_of_the_name(db, vendor, expected):
+    assert vendors(crud.search_receipts(db, vendor=vendor)) == expected
+    assert sorted(row.vendor for row in crud.search_receipt_rows(db, vendor=vendor)) == expected
+    assert sorted(row.vendor for row in crud.iter_receipt_rows(db, vendor=vendor)) == expected
+
+
+def test_vendor_follows_renames(db):
+    receipt = crud.search_receipts(db, vendor="Target")[0]
+    receipt.vendor = "Targetmart"
+    db.commit()
+    assert vendors(crud.search_receipts(db, vendor="mart")) == ["MegaMart", "Targetmart", "Walmart"]
+
+
+def test_q_matches_word_prefixes(db):
+    assert vendors(crud.search_receipts(db, q="mart")) == []
+    assert vendors(crud.search_receipts(db, q="Wal")) == ["Walmart"]
+    assert vendors(crud.search_receipts(db, vendor="mart", q="Mega")) == ["MegaMart"]
@@ -0,0 +1,59 @@
+# test_statistics.py
+#
+# The summary statistics are read from the maintained aggregates; they must
+# agree with computing them from every receipt.
+
+import statistics
+from datetime import date
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app import crud, migrations, schemas
+from app.database import make_engine
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'receipts.db'}")
+    migrations.upgrade(engine)
+    with Session(engine) as session:
+        crud.ensure_spend_aggregates(session)
+        yield session
+    engine.dispose()
+
+
+def add_receipts(db, amounts):
+    crud.create_receipts(db, [
+        schemas.ReceiptCreate(vendor="Walmart", date=date(2024, 1, 1), amount=amount, category="Groceries",
+                              file_path=f"uploads/{index}.txt")
+        for index, amount in enumerate(amounts)
+    ])
+
+
+@pytest.mark.parametrize("amounts", [
+    [7.5],
+    [5.0, 9.0],
+    [5.0, 5.0],
+    [3.0, 1.0, 2.0],
+    # The two middle receipts share an amount, then fall on either side of a run
+    [1.0, 2.0, 2.0, 3.0],
+    [1.0, 1.0, 2.0, 3.0],
+    [1.0, 1.0, 1.0, 2.0, 3.0, 3.0],
+    [12.5, 7.25, 7.25, 7.25, 99.0, 0.5, 30.0, 30.0, 18.75],
+])
+def test_median_matches_all_amounts(db, amounts):
+    add_receipts(db, amounts)
+    assert crud.get_spend_statistics(db).median_spend == pytest.approx(statistics.median(amounts))
+
+
+def test_median_after_amount_changes(db):
+    add_receipts(db, [1.0, 2.0, 3.0, 4.0, 250.5])
+    # Re-uploading a receipt moves its amount to another unit and another amount
+    crud.create_receipt(db, schemas.ReceiptCreate(vendor="Walmart", date=date(2024, 1, 1), amount=0.25,
+                                                  category="Groceries", file_path="uploads/4.txt"))
+    crud.create_receipt(db, schemas.ReceiptCreate(vendor="Walmart", date=date(2024, 1, 1), amount=2.75,
+                                                  category="Groceries", file_path="uploads/2.txt"))
+    amounts = [receipt.amount for receipt in crud.get_receipts(db)]
+    assert sorted(amounts) == [0.25, 1.0, 2.0, 2.75, 4.0]
+    assert crud.get_spend_statistics(db).median_spend == 2.0
@@ -51,94 +51,102 @@ st.divider()
 # --- Data Display and Visualization ---
 st.header("2. View and Analyze Receipts")
 
+@st.cache_data(max_entries=8)
+def build_dashboard(etag, _payload):
+    """
+    Turns the /dashboard/ payload into DataFrames. Cached by ETag only (the
+    underscore keeps the payload out of the cache key), so an unchanged
+    dataset is never rebuilt.
+    """
+    if _payload is None:
+        # A 304 for a version this process has not cached yet; raising keeps it out of the cache
+        raise LookupError(etag)
+    frames = {
+        'receipts': pd.DataFrame(_payload['receipts']),
+        'vendor_spend': pd.DataFrame(_payload['vendor_spend']),
+        'category_spend': pd.DataFrame(_payload['category_spend']),
+        'monthly_spend': pd.DataFrame(_payload['monthly_spend']),
+    }
+    if not frames['receipts'].empty:
+        frames['receipts']['sub_categories'] = frames['receipts']['sub_categories'].apply(
+            lambda x: ', '.join(x.keys()) if isinstance(x, dict) and x else str(x)
+        )
+    if not frames['monthly_spend'].empty:
+        frames['monthly_spend']['month'] = pd.to_datetime(frames['monthly_spend']['month'])
+    return frames
+
+def fetch_dashboard():
+    """
+    Fetches /dashboard/ with the last ETag seen, so reruns with unchanged
+    data get a bodyless 304 and reuse the cached DataFrames.
+    """
+    etag = st.session_state.get('dashboard_etag')
+    headers = {'If-None-Match': etag} if etag else {}
+    response = requests.get(f"{API_URL}/dashboard/?limit=1000", headers=headers)
+    if response.status_code == 304:
+        try:
+            return build_dashboard(etag, None)
+        except LookupError:
+            response = requests.get(f"{API_URL}/dashboard/?limit=1000")
+    response.raise_for_status()
+    st.session_state.dashboard_etag = response.headers.get('ETag')
+    return build_dashboard(st.session_state.dashboard_etag, response.json())
+
 try:
-    response = requests.get(f"{API_URL}/receipts/?limit=1000")
-    if response.status_code == 200:
-        receipts_data = response.json()
-        df = pd.DataFrame(receipts_data)
+    dashboard = fetch_dashboard()
+    df = dashboard['receipts']
+
+    if not df.empty:
+        st.subheader("All Uploaded Receipts")
+        st.dataframe(df[['vendor', 'date', 'amount', 'category', 'sub_categories']])
+
+        st.subheader("Spending Insights")
+        col1, col2 = st.columns(2)
+
+        with col1:
+            st.write("#### Spend by Vendor")
+            vendor_df = dashboard['vendor_spend']
+            if not vendor_df.empty:
+                # Create a bar chart with total_spend on y-axis and color by vendor
+                fig_vendor = px.bar(
+                    vendor_df,
+                    x='vendor',
+                    y='total_spend',
+                    color='vendor',  # This assigns a different color to each vendor
+                    title="Total Spend per Vendor",
+                    labels={'total_spend': 'Total Spend', 'vendor': 'Vendor'}
+                )
+                st.plotly_chart(fig_vendor, use_container_width=True)
+            else:
+                st.info("No vendor data to display yet. Upload a receipt.")
 
-        if not df.empty:
-            st.subheader("All Uploaded Receipts")
-            
-            df_display = df.copy()
-            df_display['sub_categories'] = df_display['sub_categories'].apply(
-                lambda x: ', '.join(x.keys()) if isinstance(x, dict) and x else str(x)
-            )
-            st.dataframe(df_display[['vendor', 'date', 'amount', 'category', 'sub_categories']])
-
-            st.subheader("Spending Insights")
-            col1, col2 = st.columns(2)
-
-            with col1:
-                # --- MODIFIED: This entire block is updated for the new chart ---
-                st.write("#### Spend by Vendor")
-                # Call the new endpoint for vendor spend
-                vendor_spend_resp = requests.get(f"{API_URL}/stats/vendor_spend/")
-                if vendor_spend_resp.status_code == 200 and vendor_spend_resp.text:
-                    vendor_data = vendor_spend_resp.json()
-                    if vendor_data:
-                        # Create DataFrame from the new data structure
-                        vendor_df = pd.DataFrame(vendor_data)
-                        # Create a bar chart with total_spend on y-axis and color by vendor
-                        fig_vendor = px.bar(
-                            vendor_df,
-                            x='vendor',
-                            y='total_spend',
-                            color='vendor',  # This assigns a different color to each vendor
-                            title="Total Spend per Vendor",
-                            labels={'total_spend': 'Total Spend', 'vendor': 'Vendor'}
-                        )
-                        st.plotly_chart(fig_vendor, use_container_width=True)
-                    else:
-                        st.info("No vendor data to display yet. Upload a receipt.")
-                else:
-                    st.info("Could not retrieve vendor spend data.")
-                # --- End of modification ---
-
-            with col2:
-                st.write("#### Spend by Category")
-                
-                category_totals = {}
-                for index, row in df.iterrows():
-                    sub_categories = row.get('sub_categories', {})
-                    if isinstance(sub_categories, dict) and sub_categories:
-                        for cat, amount in sub_categories.items():
-                            category_totals[cat] = category_totals.get(cat, 0) + amount
-                    elif row['category'] != 'Mixed':
-                         cat_to_use = row['category'] if row['category'] else "Uncategorized"
-                         category_totals[cat_to_use] = category_totals.get(cat_to_use, 0) + row['amount']
-
-                if category_totals:
-                    category_df = pd.DataFrame(list(category_totals.items()), columns=['Category', 'Amount'])
-                    fig_cat = px.pie(category_df, names='Category', values='Amount', title="Total Spend by Category")
-                    st.plotly_chart(fig_cat, use_container_width=True)
-                else:
-                    st.info("No category data to display.")
+        with col2:
+            st.write("#### Spend by Category")
             
-            st.write("#### Monthly Spending Trend")
-            monthly_spend_resp = requests.get(f"{API_URL}/stats/monthly_spend/")
-            if monthly_spend_resp.status_code == 200 and monthly_spend_resp.text:
-                monthly_data = monthly_spend_resp.json()
-                if monthly_data:
-                    monthly_df = pd.DataFrame(monthly_data)
-                    if not monthly_df.empty and 'month' in monthly_df.columns:
-                        monthly_df['month'] = pd.to_datetime(monthly_df['month'])
-                        fig_monthly = px.line(monthly_df, x='month', y='total_spend', markers=True, title="Total Spend Over Time")
-                        fig_monthly.update_layout(xaxis_title="Month", yaxis_title="Total Spend")
-                        st.plotly_chart(fig_monthly, use_container_width=True)
-                else:
-                    st.info("No monthly spend data to display yet.")
+            # Aggregated on the backend with GROUP BY over the category table
+            category_df = dashboard['category_spend']
+            if not category_df.empty:
+                category_df = category_df.rename(columns={'category': 'Category', 'total_spend': 'Amount'})
+                fig_cat = px.pie(category_df, names='Category', values='Amount', title="Total Spend by Category")
+                st.plotly_chart(fig_cat, use_container_width=True)
             else:
-                st.info("Could not retrieve monthly spend data.")
-
+                st.info("No category data to display.")
+        
+        st.write("#### Monthly Spending Trend")
+        monthly_df = dashboard['monthly_spend']
+        if not monthly_df.empty:
+            fig_monthly = px.line(monthly_df, x='month', y='total_spend', markers=True, title="Total Spend Over Time")
+            fig_monthly.update_layout(xaxis_title="Month", yaxis_title="Total Spend")
+            st.plotly_chart(fig_monthly, use_container_width=True)
         else:
-            st.info("No receipts found. Please upload a receipt to get started.")
+            st.info("No monthly spend data to display yet.")
 
     else:
-        st.error(f"Could not fetch receipt data from the backend. Status Code: {response.status_code}")
+        st.info("No receipts found. Please upload a receipt to get started.")
 
 except requests.exceptions.ConnectionError:
     st.warning(f"Could not connect to the backend to fetch data.")
+except requests.exceptions.HTTPError as e:
+    st.error(f"Could not fetch dashboard data from the backend. Status Code: {e.response.status_code}")
 except Exception as e:
     st.error(f"An unexpected error occurred: {e}")
-